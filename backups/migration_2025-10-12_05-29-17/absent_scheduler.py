@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Absent Scheduler for QR Code Attendance System
+Runs each shift's absent-marking pass once per working day at its deadline
+(shift start plus absent_after_minutes), with persisted last-run markers and
+catch-up of passes missed while the system was down, and notifies
+shift-start listeners shortly before each shift's check-in window opens
+"""
+
+import heapq
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Callable, List, Optional, Tuple
+import pytz
+from settings_snapshot import get_settings
+from sync_state import get_sync_state
+from time_validator import TimeValidator, WEEKDAYS
+
+# Monday to Friday; override with the 'working_days' setting
+DEFAULT_WORKING_DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday')
+# Give up looking for the next working day after this many days
+MAX_DAYS_AHEAD = 366
+
+
+def _working_calendar(settings):
+    """
+    Parse the working-day settings once per settings version.
+
+    'working_days' lists weekdays (0=Monday or 'monday') and 'holidays'
+    lists dates as YYYY-MM-DD.
+    """
+    weekdays = set()
+    for weekday in settings.get('working_days', DEFAULT_WORKING_DAYS) or ():
+        if isinstance(weekday, int) or str(weekday).isdigit():
+            weekdays.add(int(weekday) % 7)
+        elif str(weekday).lower() in WEEKDAYS:
+            weekdays.add(WEEKDAYS.index(str(weekday).lower()))
+    holidays = {str(day) for day in settings.get('holidays', []) or ()}
+    return frozenset(weekdays), frozenset(holidays)
+
+
+class AbsentScheduler:
+    """Timer-heap scheduler for per-shift absent marking"""
+
+    def __init__(self, mark_function: Callable[[str, date], int], timezone=None,
+                 state_file="absent_state.json"):
+        """
+        Args:
+            mark_function (callable): Marks absentees for (shift, date) and
+                returns the number marked
+            timezone (str, optional): Defaults to the 'timezone' setting
+            state_file (str): Where last-run markers are persisted
+        """
+        self.mark_function = mark_function
+        # Defaults to the 'timezone' setting, read at use time
+        self._timezone = timezone
+        self.state = get_sync_state(state_file)
+
+        self._run_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._heap = []
+        self._shift_start_listeners = []
+        # Next pending shift start per shift (starts are not caught up)
+        self._shift_starts = None
+
+    # Settings are read from the current snapshot on every use so
+    # settings.json edits apply to the next pass without a restart
+
+    @property
+    def timezone(self):
+        return pytz.timezone(self._timezone or get_settings().get('timezone', 'Asia/Karachi'))
+
+    @property
+    def absent_after_minutes(self) -> int:
+        return get_settings().get('absent_after_minutes', 120)
+
+    @property
+    def catchup_days(self) -> int:
+        return get_settings().get('absent_catchup_days', 3)
+
+    @property
+    def shift_start_lead_minutes(self) -> float:
+        # Shift-start listeners run this long before the check-in window opens
+        return get_settings().get('status_warm_up_lead_minutes', 5)
+
+    @property
+    def max_sleep_seconds(self) -> float:
+        # Re-check at least this often so settings changes and clock jumps are picked up
+        return get_settings().get('absent_scheduler_max_sleep_seconds', 3600)
+
+    # ------------------------------------------------------------------
+    # Deadlines and markers
+    # ------------------------------------------------------------------
+
+    def now(self) -> datetime:
+        return datetime.now(self.timezone)
+
+    def shifts(self) -> Tuple[str, ...]:
+        """Shifts defined in the compiled timetable."""
+        return TimeValidator(self.timezone.zone).timetable.shifts
+
+    def checkin_start(self, shift: str, day: date) -> datetime:
+        """Get the time a shift's check-in window opens on a day."""
+        timetable = TimeValidator(self.timezone.zone).timetable
+        checkin_start = timetable.get_bounds(timetable.shift_code(shift), day.weekday())[0]
+        midnight = self.timezone.localize(datetime.combine(day, time()))
+        return midnight + timedelta(seconds=checkin_start)
+
+    def deadline(self, shift: str, day: date) -> datetime:
+        """Get the absent-marking deadline of a shift on a day."""
+        return self.checkin_start(shift, day) + timedelta(minutes=self.absent_after_minutes)
+
+    def shift_start(self, shift: str, day: date) -> datetime:
+        """Get when shift-start listeners run for a shift on a day."""
+        return self.checkin_start(shift, day) - timedelta(minutes=self.shift_start_lead_minutes)
+
+    def is_working_day(self, day: date) -> bool:
+        """Check whether absentees are marked on a day (not a weekend or holiday)."""
+        weekdays, holidays = get_settings().derived('working_calendar', _working_calendar)
+        return day.weekday() in weekdays and day.strftime('%Y-%m-%d') not in holidays
+
+    def last_run(self, shift: str) -> Optional[date]:
+        """Get the last day a shift's pass completed."""
+        value = self.state.get(f'absent_last_run_{shift.lower()}')
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+    def _set_last_run(self, shift: str, day: date):
+        self.state.update(**{f'absent_last_run_{shift.lower()}': day.strftime('%Y-%m-%d')})
+
+    def due_passes(self, now: Optional[datetime] = None) -> List[Tuple[datetime, str, date]]:
+        """
+        Get passes whose deadline has passed but which have not run.
+
+        Missed days are caught up at most 'absent_catchup_days' back; a
+        shift that has never run starts from today. Days that are not
+        working days are skipped.
+        """
+        now = now or self.now()
+        today = now.date()
+        due = []
+        for shift in self.shifts():
+            last = self.last_run(shift)
+            first = last + timedelta(days=1) if last else today
+            first = max(first, today - timedelta(days=self.catchup_days))
+            day = first
+            while day <= today:
+                if self.is_working_day(day):
+                    deadline = self.deadline(shift, day)
+                    if deadline <= now:
+                        due.append((deadline, shift, day))
+                day += timedelta(days=1)
+        due.sort()
+        return due
+
+    def _next_deadlines(self, now: datetime) -> List[Tuple[datetime, str, date]]:
+        """Build the timer heap of each shift's next pending deadline on a working day."""
+        heap = []
+        today = now.date()
+        for shift in self.shifts():
+            last = self.last_run(shift)
+            day = today if last is None or last < today else today + timedelta(days=1)
+            for _ in range(MAX_DAYS_AHEAD):
+                if self.is_working_day(day):
+                    deadline = self.deadline(shift, day)
+                    if deadline > now:
+                        heapq.heappush(heap, (deadline, shift, day))
+                        break
+                day += timedelta(days=1)
+        return heap
+
+    def _next_shift_start(self, shift: str, now: datetime) -> Optional[Tuple[datetime, str, date]]:
+        """Get a shift's first shift-start time after now on a working day."""
+        day = now.date()
+        for _ in range(MAX_DAYS_AHEAD):
+            if self.is_working_day(day):
+                start = self.shift_start(shift, day)
+                if start > now:
+                    return start, shift, day
+            day += timedelta(days=1)
+        return None
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+
+    def add_shift_start_listener(self, callback: Callable[[str, date], None]):
+        """
+        Register a callback for shift starts.
+
+        Args:
+            callback (callable): Called with (shift, day) 'status_warm_up_lead_minutes'
+                before the shift's check-in window opens on each working day
+        """
+        with self._lock:
+            self._shift_start_listeners.append(callback)
+
+    def run_shift_starts(self, now: Optional[datetime] = None) -> int:
+        """
+        Notify listeners of every shift start reached since the last check.
+
+        Starts that passed before the first check are not caught up (the
+        caller warms up at startup instead).
+
+        Returns:
+            int: Shift starts notified
+        """
+        now = now or self.now()
+        with self._lock:
+            listeners = list(self._shift_start_listeners)
+            if self._shift_starts is None:
+                self._shift_starts = {shift: self._next_shift_start(shift, now) for shift in self.shifts()}
+                return 0
+            due = [entry for entry in self._shift_starts.values() if entry and entry[0] <= now]
+            for _, shift, _ in due:
+                self._shift_starts[shift] = self._next_shift_start(shift, now)
+
+        for _, shift, day in sorted(due):
+            for listener in listeners:
+                try:
+                    listener(shift, day)
+                except Exception as e:
+                    print(f"Shift start listener error ({shift}, {day}): {e}")
+        return len(due)
+
+    def run_due(self, now: Optional[datetime] = None) -> int:
+        """
+        Run every due pass once, oldest first.
+
+        Returns:
+            int: Total students marked absent
+        """
+        total = 0
+        with self._run_lock:
+            for deadline, shift, day in self.due_passes(now):
+                last = self.last_run(shift)
+                if last is not None and last >= day:
+                    continue
+                late = (now or self.now()) - deadline
+                if late > timedelta(minutes=1):
+                    print(f"Catching up {shift} absent pass for {day} (deadline {deadline.strftime('%Y-%m-%d %H:%M')})")
+                try:
+                    total += self.mark_function(shift, day)
+                except Exception as e:
+                    # Leave the marker so the pass is retried on the next check
+                    print(f"Absent pass error ({shift}, {day}): {e}")
+                    break
+                self._set_last_run(shift, day)
+        return total
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_due()
+                self.run_shift_starts()
+                now = self.now()
+                with self._lock:
+                    self._heap = self._next_deadlines(now)
+                    for entry in (self._shift_starts or {}).values():
+                        if entry:
+                            heapq.heappush(self._heap, entry)
+                    next_deadline = self._heap[0][0] if self._heap else None
+                wait = self.max_sleep_seconds
+                if next_deadline is not None:
+                    wait = min(wait, max(0.0, (next_deadline - now).total_seconds()))
+            except Exception as e:
+                print(f"Absent scheduler error: {e}")
+                wait = 60
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def start(self):
+        """Start the scheduler thread (runs missed passes first)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Re-check deadlines now."""
+        self._wake.set()
+
+    def get_status(self) -> List[dict]:
+        """Next deadline and last run per shift."""
+        now = self.now()
+        return [
+            {
+                'shift': shift,
+                'next_deadline': deadline.strftime('%Y-%m-%d %H:%M:%S'),
+                'last_run': self.last_run(shift).strftime('%Y-%m-%d') if self.last_run(shift) else None
+            }
+            for deadline, shift, _ in sorted(self._next_deadlines(now))
+        ]
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_absent_scheduler(mark_function: Optional[Callable[[str, date], int]] = None) -> Optional[AbsentScheduler]:
+    """Get the process-wide absent scheduler, creating it with mark_function on first use"""
+    global _scheduler
+    if _scheduler is None and mark_function is not None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = AbsentScheduler(mark_function)
+    return _scheduler
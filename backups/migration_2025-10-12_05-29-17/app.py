@@ -1,33 +1,47 @@
-import pandas as pd
 from datetime import datetime, timedelta
 import os
 import sys
-import json
-import requests
 import time
 import threading
 from urllib.parse import urljoin
 import urllib3
 from sync_manager import SyncManager
 import pytz
-from roll_parser import parse_roll_number, get_shift, get_program, get_academic_year_info
+from roll_parser import get_program, get_academic_year_info
+from roll_cache import parse_roll_number, parse_roll_numbers
 from time_validator import TimeValidator, validate_checkin_time
 from year_progression import YearProgression, check_and_update_years
+from student_directory import get_student_directory
+from scan_journal import get_scan_journal
+from journal_uploader import upload_journal
+from sync_scheduler import start_sync_scheduler
+from absent_scheduler import get_absent_scheduler
+from attendance_archive import get_archive_compactor
+from attendance_reports import AttendanceReport, export_report
+from offline_checkin import get_offline_checkin
+from status_table import CHECKED_IN
+from attendance_store import get_attendance_store
+from attendance_writer import get_attendance_writer, CSV_COLUMNS
+from scan_pipeline import ScanPipeline
+from connectivity import get_connectivity_monitor
+from http_client import get_http_client
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-# Import settings manager
-from settings import SettingsManager
+# Import shared settings snapshot
+from settings_snapshot import get_settings, start_settings_watcher, add_settings_listener
 
-# Initialize settings manager
-settings = SettingsManager()
+# Shared settings snapshot (replaced, with the values below, on every reload)
+settings = get_settings()
 
 # Configuration - Load from settings with fallbacks
-CSV_FILE = "attendance.csv"
+CSV_FILE = "attendance.csv"  # Export only; LOCAL_DB is the source of truth
+LOCAL_DB = "attendance_local.db"
 STUDENTS_FILE = "students.json"
-OFFLINE_FILE = "offline_data.json"
-HEADERS = ["ID", "Name", "Timestamp", "Status"]
+OFFLINE_FILE = "offline_data.json"  # Legacy offline store, imported into the journal
+OFFLINE_JOURNAL_FILE = "offline_journal.jsonl"
+HEADERS = CSV_COLUMNS
 
 # Timezone Configuration
 TIMEZONE = pytz.timezone(settings.get('timezone', 'Asia/Karachi'))
@@ -38,6 +52,18 @@ API_ENDPOINT = settings.get('api_endpoint_attendance', '/api/api_attendance.php'
 API_KEY = settings.get('api_key', 'attendance_2025_xyz789_secure')
 SYNC_INTERVAL = settings.get('sync_interval_seconds', 30)  # Sync interval from settings
 
+def _apply_settings(snapshot):
+    """Refresh the module configuration from a reloaded settings snapshot."""
+    global settings, TIMEZONE, WEBSITE_URL, API_ENDPOINT, API_KEY, SYNC_INTERVAL
+    settings = snapshot
+    TIMEZONE = pytz.timezone(snapshot.get('timezone', 'Asia/Karachi'))
+    WEBSITE_URL = snapshot.get('website_url', 'http://localhost/qr_attendance/public')
+    API_ENDPOINT = snapshot.get('api_endpoint_attendance', '/api/api_attendance.php')
+    API_KEY = snapshot.get('api_key', 'attendance_2025_xyz789_secure')
+    SYNC_INTERVAL = snapshot.get('sync_interval_seconds', 30)
+
+add_settings_listener(_apply_settings)
+
 def get_current_time():
     """Get current time in Asia/Karachi timezone."""
     return datetime.now(TIMEZONE)
@@ -58,75 +84,53 @@ def initialize_students():
             "24-SWT-04": {"name": "Sarah Wilson"},
             "24-SWT-05": {"name": "David Brown"}
         }
-        with open(STUDENTS_FILE, 'w') as f:
-            json.dump(students, f, indent=2)
+        get_student_directory(STUDENTS_FILE).save(students)
         print(f"Created student database: {STUDENTS_FILE}")
     else:
         print(f"Using existing student database: {STUDENTS_FILE}")
 
 def initialize_csv():
-    """Create CSV file with headers if it doesn't exist."""
-    if not os.path.exists(CSV_FILE):
-        df = pd.DataFrame(columns=HEADERS)
-        df.to_csv(CSV_FILE, index=False)
+    """Open the local attendance store and create the CSV export if it doesn't exist."""
+    # Opening the store imports an existing attendance.csv on first run
+    store = get_attendance_store(LOCAL_DB, CSV_FILE)
+    print(f"Using attendance store: {LOCAL_DB} ({store.count()} records)")
+    
+    csv_exists = os.path.exists(CSV_FILE)
+    get_attendance_writer(CSV_FILE).initialize()
+    if not csv_exists:
         print(f"Created new attendance file: {CSV_FILE}")
     else:
         print(f"Using existing attendance file: {CSV_FILE}")
 
+def get_store():
+    """Get the local attendance store."""
+    return get_attendance_store(LOCAL_DB, CSV_FILE)
+
+def save_attendance_records(records):
+    """Save attendance records to the local store and append them to the CSV export."""
+    get_store().add_records(records)
+    get_attendance_writer(CSV_FILE).append_many(records)
+
 def load_students():
-    """Load student data from JSON file."""
-    with open(STUDENTS_FILE, 'r') as f:
-        return json.load(f)
+    """Load student data from the shared in-memory student directory."""
+    return get_student_directory(STUDENTS_FILE).get_all()
 
 def check_internet_connection():
-    """Check if internet connection is available."""
-    try:
-        # Try to connect to a reliable server
-        response = requests.get("https://www.google.com", timeout=3, verify=False)
-        return response.status_code == 200
-    except:
-        return False
+    """Check if internet connection is available (cached by the connectivity monitor)."""
+    return get_connectivity_monitor().is_internet_online()
 
 def check_website_connection():
-    """Check if the website is accessible."""
-    try:
-        # Try the main website first
-        response = requests.get(WEBSITE_URL, timeout=10, verify=False)
-        if response.status_code == 200:
-            return True
-        
-        # Try the API endpoint directly
-        api_url = urljoin(WEBSITE_URL, API_ENDPOINT)
-        response = requests.get(api_url, timeout=10, verify=False)
-        return response.status_code in [200, 404, 405]  # 404/405 means server is running but endpoint might not exist
-    except Exception as e:
-        # Don't print error messages during normal operation
-        return False
+    """Check if the website is accessible (cached by the connectivity monitor)."""
+    return get_connectivity_monitor().is_website_online()
 
 def is_offline_mode():
     """Check if system should run in offline mode."""
     return not check_website_connection()
 
 def save_offline_data(attendance_data):
-    """Save attendance data to offline storage."""
-    try:
-        # Load existing offline data
-        if os.path.exists(OFFLINE_FILE):
-            with open(OFFLINE_FILE, 'r') as f:
-                offline_data = json.load(f)
-        else:
-            offline_data = []
-        
-        # Add new data
-        offline_data.append(attendance_data)
-        
-        # Save back to file
-        with open(OFFLINE_FILE, 'w') as f:
-            json.dump(offline_data, f, indent=2)
-        
+    """Append attendance data to the offline scan journal."""
+    if get_scan_journal(OFFLINE_JOURNAL_FILE).append(attendance_data):
         print(f"Data saved offline for sync later")
-    except Exception as e:
-        print(f"Error saving offline data: {e}")
 
 def sync_to_website():
     """Sync offline data to website when connection is available."""
@@ -137,94 +141,110 @@ def sync_to_website():
         return False
     
     try:
-        # Load offline data
-        if not os.path.exists(OFFLINE_FILE):
+        # Upload in acknowledged chunks so a long backlog drains over cycles
+        journal = get_scan_journal(OFFLINE_JOURNAL_FILE)
+        if not journal.pending_count():
             return True
         
-        with open(OFFLINE_FILE, 'r') as f:
-            offline_data = json.load(f)
-        
-        if not offline_data:
-            return True
-        
-        # Prepare data for API
-        api_data = {
-            "api_key": API_KEY,
-            "attendance_data": offline_data
-        }
-        
-        # Send to website
         url = urljoin(WEBSITE_URL, API_ENDPOINT)
-        response = requests.post(url, json=api_data, timeout=5, verify=False)
+        result = upload_journal(journal, url, API_KEY)
         
-        if response.status_code == 200:
-            # Clear offline data after successful sync
-            os.remove(OFFLINE_FILE)
-            print(f"Successfully synced {len(offline_data)} records to website")
-            return True
-        else:
-            print(f"Sync failed: {response.status_code} - {response.text}")
-            return False
+        if result['uploaded']:
+            print(f"Successfully synced {result['uploaded']} records to website in {result['chunks']} chunks")
+        if not result['success']:
+            print(f"Sync failed: {result['error']} ({result['remaining']} records still pending)")
+        return result['success']
             
     except Exception as e:
         print(f"Sync error: {e}")
         return False
 
-def background_sync():
-    """Background thread for automatic syncing and absent marking."""
-    while True:
-        try:
-            # Check for automatic absent marking
-            check_and_mark_automatic_absent()
-            
-            # Sync to website if online
-            if check_internet_connection() and check_website_connection():
-                sync_to_website()
-            time.sleep(SYNC_INTERVAL)
-        except Exception as e:
-            time.sleep(60)  # Wait 1 minute before retrying
-
 def start_background_sync():
-    """Start background sync thread."""
-    sync_thread = threading.Thread(target=background_sync, daemon=True)
-    sync_thread.start()
-    print(f"Background sync started (every {SYNC_INTERVAL} seconds)")
+    """Start the event-driven sync scheduler for offline uploads."""
+    journal = get_scan_journal(OFFLINE_JOURNAL_FILE)
+    scheduler = start_sync_scheduler(sync_to_website, journal=journal)
+    print(f"Background sync started (on new scans, idle check every {scheduler.idle_interval} seconds)")
+    return scheduler
 
-def log_attendance(student_id, sync_manager=None):
-    """Log attendance entry using enhanced check-in/check-out system with roll number parsing and time validation."""
+def warm_up_status_table():
+    """Pull today's check-in status for all students into the local status table."""
     from checkin_manager import CheckInManager
     
+    try:
+        if not check_website_connection():
+            return 0
+        students = load_students()
+        return CheckInManager().warm_up_status(list(students.keys()))
+    except Exception as e:
+        print(f"Status warm-up error: {e}")
+        return 0
+
+def start_status_warm_up():
+    """Start status table warm-up in the background (at startup and at each shift start)."""
+    warm_up_thread = threading.Thread(target=warm_up_status_table, daemon=True)
+    warm_up_thread.start()
+
+def validate_scan(student_id):
+    """Validate a scan locally (roll number, student database, check-in window) without any network I/O."""
     timestamp = format_time()
-    students = load_students()
     
     # Parse roll number to get student metadata
     roll_data = parse_roll_number(student_id)
     if not roll_data['valid']:
         print(f"INVALID ROLL NUMBER: {student_id} - {roll_data['error']}")
-        return False
+        return None
     
-    if student_id not in students:
+    student = get_student_directory(STUDENTS_FILE).get(student_id)
+    if student is None:
         print(f"Student {student_id} not found in database!")
-        return False
+        return None
     
-    student_name = students[student_id]["name"]
+    student_name = student["name"]
     
-    # Validate check-in time based on shift
-    time_validator = TimeValidator()
-    time_validation = time_validator.validate_checkin_time(student_id, None, roll_data['shift'])
+    # Validate check-in time based on shift, unless this scan checks a
+    # checked-in student out (the check-out window is checked when the
+    # scan is completed, by the server or by the offline decision)
+    if get_offline_checkin().local_status(student_id, timestamp[:10]) != CHECKED_IN:
+        time_validator = TimeValidator()
+        time_validation = time_validator.validate_checkin_time(student_id, None, roll_data['shift'])
+        
+        if not time_validation['valid']:
+            print(f"CHECK-IN DENIED: {student_name} ({student_id}) - {time_validation['error']}")
+            print(f"  Shift: {roll_data['shift']}")
+            print(f"  Allowed Window: {time_validation['checkin_start']} - {time_validation['checkin_end']}")
+            print(f"  Current Time: {time_validation['current_time']}")
+            return None
+    
+    return {
+        'student_id': student_id,
+        'student_name': student_name,
+        'timestamp': timestamp,
+        'roll_data': roll_data
+    }
+
+def complete_scan(scan, sync_manager=None):
+    """Complete a locally validated scan with the server and save the result."""
+    from checkin_manager import CheckInManager
     
-    if not time_validation['valid']:
-        print(f"CHECK-IN DENIED: {student_name} ({student_id}) - {time_validation['error']}")
-        print(f"  Shift: {roll_data['shift']}")
-        print(f"  Allowed Window: {time_validation['checkin_start']} - {time_validation['checkin_end']}")
-        print(f"  Current Time: {time_validation['current_time']}")
-        return False
+    student_id = scan['student_id']
+    student_name = scan['student_name']
+    timestamp = scan['timestamp']
+    roll_data = scan['roll_data']
     
     # Initialize check-in manager
     checkin_manager = CheckInManager()
     
-    # Process QR scan (handles check-in/check-out logic)
-    success, result = checkin_manager.process_qr_scan(student_id)
+    # Process QR scan (handles check-in/check-out logic); decide locally
+    # with the same rules when checkin_api.php cannot be reached
+    offline_decision = not check_website_connection()
+    if not offline_decision:
+        success, result = checkin_manager.process_qr_scan(student_id)
+        if not success and checkin_manager.server_unreachable:
+            print(f"Server unreachable, deciding locally for {student_id}...")
+            offline_decision = True
+    if offline_decision:
+        scanned_at = TIMEZONE.localize(datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S"))
+        success, result = get_offline_checkin().decide(student_id, scanned_at, student_name)
     
     if success:
         # Get the action performed
@@ -244,12 +264,12 @@ def log_attendance(student_id, sync_manager=None):
             "Admission_Year": roll_data['admission_year']
         }
         
-        # Save to CSV
-        new_entry = pd.DataFrame([attendance_record])
-        new_entry.to_csv(CSV_FILE, mode='a', header=False, index=False)
+        # Save to local store
+        save_attendance_records([attendance_record])
         
-        # If offline, save to offline data
-        if not check_internet_connection():
+        # If offline, save to offline data (offline decisions are
+        # reconciled with checkin_api.php instead)
+        if not offline_decision and not check_internet_connection():
             if sync_manager:
                 sync_manager.save_offline_data(attendance_record)
             else:
@@ -261,182 +281,180 @@ def log_attendance(student_id, sync_manager=None):
         print(f"FAILED: {student_name} ({student_id}) - {result}")
         return False
 
+def log_attendance(student_id, sync_manager=None):
+    """Log attendance entry using enhanced check-in/check-out system with roll number parsing and time validation."""
+    scan = validate_scan(student_id)
+    if scan is None:
+        return False
+    return complete_scan(scan, sync_manager)
+
+def submit_scan(pipeline, student_id, sync_manager=None):
+    """Accept a scan after local validation and complete the server call in the background."""
+    scan = validate_scan(student_id)
+    if scan is None:
+        return False
+    
+    print(f"ACCEPTED: {scan['student_name']} ({student_id}) at {scan['timestamp']} - confirming with server...")
+    pipeline.submit(student_id, complete_scan, scan, sync_manager)
+    return True
+
 def mark_absent_students():
     """Mark all students as absent for current date."""
     students = load_students()
     current_date = get_current_time().strftime("%Y-%m-%d")
+    store = get_store()
     
-    # Get students who attended today
-    df = pd.read_csv(CSV_FILE)
-    if not df.empty:
-        today_attended = df[
-            (df['Timestamp'].str.startswith(current_date)) & 
-            (df['Status'] == 'Present')
-        ]['ID'].unique()
-    else:
-        today_attended = []
+    # Get students who attended or were already marked absent today
+    # (a check-in without check-out yet still counts as attended)
+    today_attended = store.student_ids_with_status(current_date, ('Present', 'Check-in'))
+    already_absent = store.student_ids_with_status(current_date, 'Absent')
     
-    # Mark absent students
-    absent_count = 0
+    # Mark absent students (timestamp in the same timezone as current_date)
+    timestamp = format_time()
+    absent_records = []
     for student_id, student_info in students.items():
-        if student_id not in today_attended:
-            # Check if already marked absent today
-            if not df.empty:
-                already_absent = df[
-                    (df['ID'] == student_id) & 
-                    (df['Timestamp'].str.startswith(current_date)) & 
-                    (df['Status'] == 'Absent')
-                ]
-                if not already_absent.empty:
-                    continue
-            
-            # Mark as absent
-            absent_entry = pd.DataFrame({
-                "ID": [student_id],
-                "Name": [student_info["name"]],
-                "Timestamp": [datetime.now().strftime("%Y-%m-%d %H:%M:%S")],
-                "Status": ["Absent"]
-            })
-            absent_entry.to_csv(CSV_FILE, mode='a', header=False, index=False)
-            absent_count += 1
+        if student_id in today_attended or student_id in already_absent:
+            continue
+        
+        absent_records.append({
+            "ID": student_id,
+            "Name": student_info["name"],
+            "Timestamp": timestamp,
+            "Status": "Absent"
+        })
+    
+    save_attendance_records(absent_records)
+    absent_count = len(absent_records)
     
     if absent_count > 0:
         print(f"Marked {absent_count} students as absent")
     return absent_count
 
-def mark_absent_for_shift(shift):
-    """Mark absent students for a specific shift based on 2-hour rule."""
+# Phase timings of the last absent pass per shift
+ABSENT_PASS_TIMINGS = {}
+
+def mark_absent_for_shift(shift, for_date=None):
+    """
+    Mark absent students for a specific shift based on 2-hour rule.
+    
+    Args:
+        shift (str): Shift name
+        for_date (date, optional): Day to mark; defaults to today. Past days
+            (scheduler catch-up) are stamped with that day's deadline.
+    """
     from time_validator import TimeValidator
-    from roll_parser import parse_roll_number
     
     students = load_students()
     current_time = get_current_time()
-    current_date = current_time.strftime("%Y-%m-%d")
+    target_date = for_date or current_time.date()
+    current_date = target_date.strftime("%Y-%m-%d")
     
-    # Get shift timings
+    # Get shift timings for that weekday
     time_validator = TimeValidator()
-    shift_timings = time_validator.get_shift_timings(shift)
+    shift_timings = time_validator.get_shift_timings(shift, target_date.weekday())
     
-    # Calculate 2 hours after shift start
+    # Calculate the deadline after shift start
     shift_start = shift_timings['checkin_start']
-    absent_deadline = datetime.combine(current_time.date(), shift_start) + timedelta(hours=2)
+    absent_after = timedelta(minutes=settings.get('absent_after_minutes', 120))
+    absent_deadline = TIMEZONE.localize(datetime.combine(target_date, shift_start)) + absent_after
     
-    # Make timezone-aware for comparison
-    if absent_deadline.tzinfo is None:
-        absent_deadline = TIMEZONE.localize(absent_deadline)
-    
-    # Only proceed if we're past the 2-hour deadline
+    # Only proceed if we're past the deadline
     if current_time < absent_deadline:
         return 0
     
-    print(f"\nAUTOMATIC ABSENT MARKING - {shift.upper()} SHIFT")
+    print(f"\nAUTOMATIC ABSENT MARKING - {shift.upper()} SHIFT ({current_date})")
     print(f"Shift Start: {shift_start}")
     print(f"Absent Deadline: {absent_deadline.strftime('%H:%M:%S')}")
     print(f"Current Time: {current_time.strftime('%H:%M:%S')}")
     
-    # Load attendance data
-    df = pd.read_csv(CSV_FILE) if os.path.exists(CSV_FILE) else pd.DataFrame()
+    timings = {}
+    pass_started = time.perf_counter()
+    
+    # Shift roster: students whose roll number puts them in this shift
+    phase_started = time.perf_counter()
+    roster = parse_roll_numbers(list(students))
+    shift_roster = set(roster.students_in_shift(shift))
+    timings['roster_ms'] = (time.perf_counter() - phase_started) * 1000
+    
+    # Today's present and absent sets from the indexed store
+    # (a check-in without check-out yet still counts as present)
+    phase_started = time.perf_counter()
+    store = get_store()
+    shift_attended = store.student_ids_with_status(
+        current_date, ('Present', 'Check-in'),
+        shift_start.strftime('%H:%M:%S'),
+        shift_timings['checkin_end'].strftime('%H:%M:%S')
+    )
+    already_absent = store.student_ids_with_status(current_date, 'Absent')
+    timings['query_ms'] = (time.perf_counter() - phase_started) * 1000
+    
+    # Students for this shift who didn't check in and aren't marked yet
+    absent_ids = sorted(shift_roster - shift_attended - already_absent)
+    
+    marked_at = current_time if target_date == current_time.date() else absent_deadline
+    timestamp = marked_at.strftime("%Y-%m-%d %H:%M:%S")
+    absent_records = [
+        {
+            "ID": student_id,
+            "Name": students[student_id]["name"],
+            "Timestamp": timestamp,
+            "Status": "Absent",
+            "Shift": shift,
+            "Auto_Marked": "Yes"
+        }
+        for student_id in absent_ids
+    ]
     
-    # Get students who checked in for this shift today
-    shift_attended = []
-    if not df.empty:
-        # Get students who checked in during the shift window
-        shift_start_time = datetime.combine(current_time.date(), shift_start)
-        shift_end_time = datetime.combine(current_time.date(), shift_timings['checkin_end'])
-        
-        shift_attended = df[
-            (df['Timestamp'].str.startswith(current_date)) & 
-            (df['Status'] == 'Present') &
-            (pd.to_datetime(df['Timestamp']).dt.time >= shift_start) &
-            (pd.to_datetime(df['Timestamp']).dt.time <= shift_timings['checkin_end'])
-        ]['ID'].unique()
-    
-    # Find students for this shift who didn't check in
-    absent_count = 0
-    for student_id, student_info in students.items():
-        # Parse roll number to determine shift
-        roll_data = parse_roll_number(student_id)
-        if not roll_data['valid']:
-            continue
-            
-        student_shift = roll_data['shift']
-        
-        # Only process students for the specified shift
-        if student_shift.lower() != shift.lower():
-            continue
-            
-        # Skip if student already checked in for this shift
-        if student_id in shift_attended:
-            continue
-            
-        # Check if already marked absent for this shift today
-        if not df.empty:
-            already_absent = df[
-                (df['ID'] == student_id) & 
-                (df['Timestamp'].str.startswith(current_date)) & 
-                (df['Status'] == 'Absent')
-            ]
-            if not already_absent.empty:
-                continue
-        
-        # Mark as absent
-        absent_entry = pd.DataFrame({
-            "ID": [student_id],
-            "Name": [student_info["name"]],
-            "Timestamp": [current_time.strftime("%Y-%m-%d %H:%M:%S")],
-            "Status": ["Absent"],
-            "Shift": [shift],
-            "Auto_Marked": ["Yes"]
-        })
-        absent_entry.to_csv(CSV_FILE, mode='a', header=False, index=False)
-        absent_count += 1
-        
-        print(f"  AUTO-ABSENT: {student_info['name']} ({student_id}) - {shift} shift")
+    # Write all absent rows in one batch
+    phase_started = time.perf_counter()
+    save_attendance_records(absent_records)
+    timings['write_ms'] = (time.perf_counter() - phase_started) * 1000
+    timings['total_ms'] = (time.perf_counter() - pass_started) * 1000
+    ABSENT_PASS_TIMINGS[shift.capitalize()] = timings
+    
+    for record in absent_records:
+        print(f"  AUTO-ABSENT: {record['Name']} ({record['ID']}) - {shift} shift")
     
+    absent_count = len(absent_records)
     if absent_count > 0:
         print(f"\nMarked {absent_count} students as absent for {shift} shift")
     else:
         print(f"No students to mark absent for {shift} shift")
     
+    print(f"Timings ({shift}): roster {timings['roster_ms']:.1f} ms, "
+          f"query {timings['query_ms']:.1f} ms, write {timings['write_ms']:.1f} ms, "
+          f"total {timings['total_ms']:.1f} ms "
+          f"({len(shift_roster)} on roster, {len(shift_attended)} present)")
+    
     return absent_count
 
 def check_and_mark_automatic_absent():
-    """Check if it's time to automatically mark absent students for any shift."""
-    current_time = get_current_time()
-    current_hour = current_time.hour
-    
-    # Morning shift: Check at 11:00 AM (2 hours after 9:00 AM start)
-    if current_hour == 11 and current_time.minute < 5:  # Within 5 minutes of 11:00 AM
-        return mark_absent_for_shift('Morning')
-    
-    # Evening shift: Check at 5:00 PM (2 hours after 3:00 PM start)  
-    elif current_hour == 17 and current_time.minute < 5:  # Within 5 minutes of 5:00 PM
-        return mark_absent_for_shift('Evening')
-    
-    return 0
+    """Run any absent-marking pass whose shift deadline has passed and that has not run yet."""
+    return get_absent_scheduler(mark_absent_for_shift).run_due()
+
+def start_absent_scheduler():
+    """Start marking absentees at each shift's deadline, catching up missed passes, and warming up the status table at each shift start."""
+    scheduler = get_absent_scheduler(mark_absent_for_shift)
+    scheduler.add_shift_start_listener(lambda shift, day: start_status_warm_up())
+    scheduler.start()
+    return scheduler
 
 def calculate_attendance_percentage(student_id=None):
     """Calculate attendance percentage for student."""
-    df = pd.read_csv(CSV_FILE)
-    
-    if df.empty:
-        
-        print("No attendance data found!")
-        return
-    
-    # Filter by student
-    filtered_df = df.copy()
-    if student_id:
-        filtered_df = filtered_df[filtered_df['ID'] == student_id]
+    store = get_store()
+    status_counts = store.status_counts(student_id)
     
-    if filtered_df.empty:
-        print(f"No data found for the specified criteria!")
+    if not status_counts:
+        if student_id:
+            print(f"No data found for the specified criteria!")
+        else:
+            print("No attendance data found!")
         return
     
     # Calculate percentages
-    total_classes = len(filtered_df[filtered_df['Status'].isin(['Present', 'Absent'])])
-    present_count = len(filtered_df[filtered_df['Status'] == 'Present'])
-    absent_count = len(filtered_df[filtered_df['Status'] == 'Absent'])
+    present_count = status_counts.get('Present', 0)
+    absent_count = status_counts.get('Absent', 0)
+    total_classes = present_count + absent_count
     
     if total_classes > 0:
         attendance_percentage = (present_count / total_classes) * 100
@@ -447,7 +465,7 @@ def calculate_attendance_percentage(student_id=None):
     print(f"\nATTENDANCE REPORT")
     print(f"{'='*50}")
     if student_id:
-        student_name = filtered_df.iloc[0]['Name'] if not filtered_df.empty else "Unknown"
+        student_name = store.get_student_name(student_id) or "Unknown"
         print(f"Student: {student_name} ({student_id})")
     print(f"Total Classes: {total_classes}")
     print(f"Present: {present_count}")
@@ -457,21 +475,24 @@ def calculate_attendance_percentage(student_id=None):
     
     return attendance_percentage
 
-def show_attendance_summary():
-    """Show overall attendance summary."""
-    df = pd.read_csv(CSV_FILE)
+def show_attendance_summary(date_from=None, date_to=None):
+    """Show overall attendance summary, optionally for a date range (YYYY-MM-DD, inclusive)."""
+    store = get_store()
+    status_counts = store.status_counts(date_from=date_from, date_to=date_to)
     
-    if df.empty:
+    if not status_counts:
         print("No attendance data found!")
         return
     
     print(f"\nATTENDANCE SUMMARY")
     print(f"{'='*60}")
+    if date_from or date_to:
+        print(f"Dates: {date_from or 'start'} to {date_to or 'today'}")
     
     # Overall statistics
-    total_records = len(df)
-    present_count = len(df[df['Status'] == 'Present'])
-    absent_count = len(df[df['Status'] == 'Absent'])
+    total_records = sum(status_counts.values())
+    present_count = status_counts.get('Present', 0)
+    absent_count = status_counts.get('Absent', 0)
     
     print(f"Total Records: {total_records}")
     print(f"Present: {present_count}")
@@ -479,16 +500,82 @@ def show_attendance_summary():
     
     # By student
     print(f"\nBy Student:")
-    student_stats = df.groupby(['ID', 'Name'])['Status'].value_counts().unstack(fill_value=0)
-    for (student_id, student_name), row in student_stats.iterrows():
+    student_stats = store.student_status_counts(date_from, date_to)
+    for (student_id, student_name), row in student_stats.items():
         present = row.get('Present', 0)
         absent = row.get('Absent', 0)
         total = present + absent
         percentage = (present / total * 100) if total > 0 else 0
         print(f"  {student_name} ({student_id}): {present}/{total} ({percentage:.1f}%)")
     
+    # By shift and program (all-time, from the counters)
+    if not (date_from or date_to):
+        for group in ('shift', 'program'):
+            print(f"\nBy {group.title()}:")
+            for value, row in store.group_status_counts(group).items():
+                present = row.get('Present', 0)
+                total = present + row.get('Absent', 0)
+                percentage = (present / total * 100) if total > 0 else 0
+                print(f"  {value or 'Unknown'}: {present}/{total} ({percentage:.1f}%)")
+    
     print(f"{'='*60}\n")
 
+def run_batch_report(args):
+    """
+    Build a whole-roster report from 'batch_report' arguments.
+
+    Args:
+        args (list): Optional output file (.csv or .json), 'defaulters', and
+            filters as key=value: program, shift, year, from, to, below
+    """
+    path = None
+    filters = {}
+    names = {'from': 'date_from', 'to': 'date_to', 'program': 'program', 'shift': 'shift',
+             'year': 'year', 'below': 'below'}
+    for arg in args:
+        if arg.lower() == 'defaulters':
+            filters['below'] = settings.get('defaulter_threshold', 75)
+        elif '=' in arg:
+            key, value = arg.split('=', 1)
+            if key.lower() not in names:
+                print(f"Unknown report filter: {key} (use {', '.join(names)})")
+                return
+            filters[names[key.lower()]] = value
+        else:
+            path = arg
+    try:
+        if 'year' in filters:
+            filters['year'] = int(filters['year'])
+        if 'below' in filters:
+            filters['below'] = float(filters['below'])
+    except ValueError:
+        print("Report filters 'year' and 'below' must be numbers")
+        return
+    
+    start = time.perf_counter()
+    report = AttendanceReport(get_store(), get_student_directory(STUDENTS_FILE).get_all())
+    if path:
+        result = export_report(path, report, **filters)
+        if result['success']:
+            print(f"Wrote {result['rows']} students to {result['path']} "
+                  f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+        else:
+            print(f"Report failed: {result['error']}")
+        return
+    
+    print(f"\nBATCH ATTENDANCE REPORT")
+    print(f"{'='*78}")
+    print(f"{'Student':<14}{'Name':<20}{'Present':>8}{'Total':>7}{'%':>7}{'Late':>6}{'Streak':>8}{'Absent Run':>11}")
+    rows = 0
+    for row in report.iter_rows(**filters):
+        percentage = f"{row['percentage']:.1f}" if row['percentage'] is not None else '-'
+        print(f"{row['student_id']:<14}{str(row['name'] or '')[:19]:<20}{row['days_present']:>8}"
+              f"{row['days_total']:>7}{percentage:>7}{row['late_arrivals']:>6}"
+              f"{row['current_streak']:>8}{row['absent_streak']:>11}")
+        rows += 1
+    print(f"{'='*78}")
+    print(f"{rows} students ({(time.perf_counter() - start) * 1000:.0f} ms)\n")
+
 def manual_attendance_entry():
     """Allow manual entry of attendance without QR scanner."""
     print("\n" + "="*50)
@@ -545,9 +632,8 @@ def manual_attendance_entry():
                         "Status": "Absent"
                     }
                     
-                    # Save to CSV
-                    new_entry = pd.DataFrame([absent_record])
-                    new_entry.to_csv(CSV_FILE, mode='a', header=False, index=False)
+                    # Save to local store
+                    save_attendance_records([absent_record])
                     
                     # Try to sync to website
                     if check_internet_connection():
@@ -557,7 +643,7 @@ def manual_attendance_entry():
                                 "attendance_data": [absent_record]
                             }
                             url = urljoin(WEBSITE_URL, API_ENDPOINT)
-                            response = requests.post(url, json=api_data, timeout=5, verify=False)
+                            response = get_http_client().post(url, endpoint='attendance_upload', json=api_data)
                             
                             if response.status_code == 200:
                                 print(f"SUCCESS: {student_name} ({student_id}) marked absent at {timestamp} [SYNCED]")
@@ -606,12 +692,16 @@ def main():
     initialize_students()
     initialize_csv()
     
+    # Pick up settings.json edits without a restart
+    start_settings_watcher()
+    
     # Initialize sync manager
     sync_manager = SyncManager()
     
-    # Check system mode with detailed status
-    internet_status = check_internet_connection()
-    website_status = check_website_connection()
+    # Probe connectivity once, then keep the cached state fresh in the background
+    connectivity = get_connectivity_monitor()
+    internet_status, website_status = connectivity.probe()
+    connectivity.start()
     
     print(f"\nConnection Status:")
     print(f"   Internet: {'ONLINE' if internet_status else 'OFFLINE'}")
@@ -619,7 +709,7 @@ def main():
     print(f"   Website URL: {WEBSITE_URL}")
     print(f"   Note: Website API is read-only (GET only)")
     
-    if is_offline_mode():
+    if not website_status:
         print("\n🔄 OFFLINE MODE - No web server detected")
         print("   • Data will be saved locally")
         print("   • Use 'manual' for attendance entry")
@@ -632,14 +722,30 @@ def main():
     # Start advanced sync manager
     sync_manager.start_auto_sync()
     
+    # Load today's check-in status so scans can skip the status lookup
+    start_status_warm_up()
+    
+    # Mark absentees at each shift's deadline (runs missed passes first)
+    start_absent_scheduler()
+    
+    # Move closed days out of the row store into the columnar archive
+    get_archive_compactor(get_store()).start()
+    
+    # Server calls for scans run in the background so the scanner never waits
+    scan_pipeline = ScanPipeline()
+    
     print("\nAvailable Commands:")
     print("  • Scan QR code: Just scan the student's QR code")
     print("  • 'manual': Manual attendance entry (no scanner needed)")
     print("  • 'mark_absent': Mark absent students")
     print("  • 'report [student_id]': Show attendance report")
-    print("  • 'summary': Show overall attendance summary")
+    print("  • 'summary [from_date] [to_date]': Show overall attendance summary")
+    print("  • 'batch_report [file.csv|file.json] [defaulters] [program=|shift=|year=|from=|to=|below=]': Whole-roster report")
     print("  • 'end_class': End class and mark absent students")
+    print("  • 'rebuild_counters': Recompute attendance counters from all records")
     print("  • 'sync_now': Manually sync data to website")
+    print("  • 'reconcile': Reconcile offline check-in decisions with the website")
+    print("  • 'conflicts': Show recent reconciliation conflicts")
     print("  • 'sync_from_web': Sync data from website to local")
     print("  • 'bidirectional_sync': Full bidirectional sync")
     print("  • 'enhanced_sync': Enhanced sync with admin panel")
@@ -666,18 +772,30 @@ def main():
             
             # Handle commands
             if user_input.lower() == 'quit':
+                if scan_pipeline.pending_count():
+                    print(f"Finishing {scan_pipeline.pending_count()} pending scans...")
+                scan_pipeline.shutdown(wait=True)
                 print("\n👋 Attendance system stopped. Goodbye!")
                 break
             elif user_input.lower() == 'manual':
                 manual_attendance_entry()
-            elif user_input.lower() == 'summary':
-                show_attendance_summary()
+            elif user_input.lower().startswith('summary'):
+                parts = user_input.split()
+                date_from = parts[1] if len(parts) > 1 else None
+                date_to = parts[2] if len(parts) > 2 else None
+                show_attendance_summary(date_from, date_to)
             elif user_input.lower() == 'mark_absent':
                 mark_absent_students()
+            elif user_input.startswith('batch_report'):
+                run_batch_report(user_input.split()[1:])
             elif user_input.startswith('report'):
                 parts = user_input.split()
                 student_id = parts[1] if len(parts) > 1 else None
                 calculate_attendance_percentage(student_id)
+            elif user_input.lower() == 'rebuild_counters':
+                print("Rebuilding attendance counters...")
+                counted = get_store().rebuild_counters()
+                print(f"Counters rebuilt from {counted} records")
             elif user_input.lower() == 'end_class':
                 print(f"Ending class...")
                 mark_absent_students()
@@ -688,6 +806,20 @@ def main():
                     print("Sync completed successfully!")
                 else:
                     print("Sync failed - data saved offline")
+            elif user_input.lower() == 'reconcile':
+                print("Reconciling offline check-in decisions...")
+                result = sync_manager.reconcile_offline_checkins()
+                if result['success']:
+                    print("Reconciliation completed successfully!")
+                else:
+                    print(f"Reconciliation stopped: {result['error']} ({result['remaining']} decisions still pending)")
+            elif user_input.lower() == 'conflicts':
+                conflicts = get_offline_checkin().read_conflicts(limit=20)
+                if not conflicts:
+                    print("No reconciliation conflicts recorded")
+                for conflict in conflicts:
+                    print(f"  {conflict['timestamp']} {conflict['student_id']} {conflict['action']}: "
+                          f"{conflict['type']} - {conflict['message']} ({conflict['resolution']})")
             elif user_input.lower() == 'sync_from_web':
                 print("Attempting to sync data from website...")
                 if sync_manager.sync_from_website():
@@ -709,15 +841,28 @@ def main():
                 print(f"Internet Connection: {'ONLINE' if sync_status['internet'] else 'OFFLINE'}")
                 print(f"Website Status: {'ONLINE' if sync_status['website'] else 'OFFLINE'}")
                 print(f"Website URL: {WEBSITE_URL}")
-                print(f"Sync Interval: {SYNC_INTERVAL} seconds")
+                scheduler_status = sync_status['scheduler']
+                if scheduler_status:
+                    print(f"Auto Sync: {scheduler_status['cycles']} cycles, "
+                          f"{scheduler_status['consecutive_failures']} consecutive failures, "
+                          f"next idle check in {scheduler_status['next_delay_seconds']}s")
                 print(f"Currently Syncing: {'YES' if sync_status['is_syncing'] else 'NO'}")
+                print(f"Pending Scans: {scan_pipeline.pending_count()}")
+                http_metrics = sync_status['http']
+                print(f"HTTP Requests: {http_metrics['requests']} "
+                      f"(connections opened: {http_metrics['connections_opened']}, "
+                      f"reused: {http_metrics['connections_reused']})")
                 print(f"Offline Records: {sync_status['offline_records']}")
+                print(f"Offline Check-in Decisions: {sync_status['offline_decisions']} pending reconciliation")
                 print(f"Local Records: {sync_status['local_records']}")
                 
-                # Check CSV data
+                # Check local store
                 try:
-                    df = pd.read_csv(CSV_FILE)
-                    print(f"Total Attendance Records: {len(df)}")
+                    print(f"Total Attendance Records: {get_store().count()}")
+                    partitions = get_store().partition_stats()
+                    print(f"Row Store: {partitions['hot_rows']} records over {partitions['hot_days']} days")
+                    print(f"Archive: {partitions['archived_rows']} records over {partitions['archived_days']} days "
+                          f"({partitions['archive_bytes'] / 1024:.1f} KB)")
                 except:
                     print("Total Attendance Records: 0")
                 
@@ -829,22 +974,10 @@ def main():
                 current_time = get_current_time()
                 print(f"Current Time: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
                 
-                # Check morning shift (11:00 AM)
-                morning_deadline = current_time.replace(hour=11, minute=0, second=0, microsecond=0)
-                evening_deadline = current_time.replace(hour=17, minute=0, second=0, microsecond=0)
-                
-                print(f"Morning shift absent deadline: {morning_deadline.strftime('%H:%M:%S')}")
-                print(f"Evening shift absent deadline: {evening_deadline.strftime('%H:%M:%S')}")
-                
-                if current_time >= morning_deadline:
-                    print("✓ Morning shift absent marking should have run")
-                else:
-                    print("⏳ Morning shift absent marking not yet due")
-                    
-                if current_time >= evening_deadline:
-                    print("✓ Evening shift absent marking should have run")
-                else:
-                    print("⏳ Evening shift absent marking not yet due")
+                # Deadlines come from the compiled shift timetable
+                for entry in get_absent_scheduler(mark_absent_for_shift).get_status():
+                    print(f"{entry['shift']} shift: next absent deadline {entry['next_deadline']}, "
+                          f"last run {entry['last_run'] or 'never'}")
                 
                 # Trigger check
                 count = check_and_mark_automatic_absent()
@@ -854,7 +987,7 @@ def main():
                     print("No automatic absent marking needed at this time")
             else:
                 # Treat as QR code scan
-                log_attendance(user_input, sync_manager)
+                submit_scan(scan_pipeline, user_input, sync_manager)
             
     except KeyboardInterrupt:
         print("\n\nAttendance system stopped. Goodbye!")
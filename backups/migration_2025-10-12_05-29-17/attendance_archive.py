@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Attendance Archive for QR Code Attendance System
+Compressed columnar (Parquet) archive of closed attendance days, one file
+per day, plus the background job that compacts closed days out of the
+SQLite row store
+"""
+
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import pytz
+from settings_snapshot import get_settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Row-store columns and their archive types
+ARCHIVE_COLUMNS = [
+    ('id', 'int64'),
+    ('student_id', 'string'),
+    ('student_name', 'string'),
+    ('timestamp', 'string'),
+    ('date', 'string'),
+    ('status', 'string'),
+    ('shift', 'string'),
+    ('program', 'string'),
+    ('current_year', 'int64'),
+    ('admission_year', 'int64'),
+    ('auto_marked', 'string'),
+]
+INTEGER_COLUMNS = {column for column, kind in ARCHIVE_COLUMNS if kind == 'int64'}
+
+
+def archive_available() -> bool:
+    """Check whether the columnar archive can be used (pyarrow is installed)."""
+    return pa is not None
+
+
+def _to_int(value) -> Optional[int]:
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class AttendanceArchive:
+    """Per-day Parquet partitions under one archive directory"""
+
+    def __init__(self, archive_dir="attendance_archive", compression=None):
+        self.archive_dir = archive_dir
+        self._compression = compression
+
+    @property
+    def compression(self) -> str:
+        return self._compression or get_settings().get('archive_compression', 'zstd')
+
+    def _schema(self):
+        return pa.schema([(column, getattr(pa, kind)()) for column, kind in ARCHIVE_COLUMNS])
+
+    def partition_path(self, date: str, version: int) -> str:
+        """
+        Get the file for a day's partition.
+
+        The version (the newest row id in the file) is part of the name so a
+        rewritten partition never replaces the file the catalog points at.
+        """
+        return os.path.join(self.archive_dir, date[:7], f"{date}.{version}.parquet")
+
+    def write_partition(self, date: str, rows: List[Dict], version: int) -> str:
+        """
+        Write a day's rows (dicts keyed by row-store column) to a new file.
+
+        Returns:
+            str: Path of the written file
+        """
+        columns = {column: [] for column, _ in ARCHIVE_COLUMNS}
+        for row in rows:
+            for column, values in columns.items():
+                value = row.get(column)
+                values.append(_to_int(value) if column in INTEGER_COLUMNS else
+                              (None if value is None else str(value)))
+        table = pa.Table.from_pydict(columns, schema=self._schema())
+
+        path = self.partition_path(date, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_file = f"{path}.tmp"
+        pq.write_table(table.sort_by('id'), temp_file, compression=self.compression)
+        os.replace(temp_file, path)
+        return path
+
+    def read_partition(self, path: str, columns: Optional[Iterable[str]] = None,
+                       filters: Optional[List[tuple]] = None) -> List[Dict]:
+        """
+        Read a partition file.
+
+        Args:
+            path (str): Partition file from the catalog
+            columns (iterable, optional): Only read these columns
+            filters (list, optional): pyarrow filters, e.g. [('status', '=', 'Present')]
+
+        Returns:
+            List[Dict]: Rows keyed by row-store column, in id order
+        """
+        table = pq.read_table(path, columns=list(columns) if columns else None,
+                              filters=filters or None)
+        return table.to_pylist()
+
+    def delete_partition(self, path: Optional[str]):
+        """Remove a partition file that is no longer referenced."""
+        if path and os.path.exists(path):
+            os.remove(path)
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+
+
+class ArchiveCompactor:
+    """Background job that moves closed days from the row store to the archive"""
+
+    def __init__(self, store, timezone=None):
+        self.store = store
+        # Defaults to the 'timezone' setting, read at use time
+        self._timezone = timezone
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_run = None
+        self._last_result = None
+
+    @property
+    def timezone(self):
+        return pytz.timezone(self._timezone or get_settings().get('timezone', 'Asia/Karachi'))
+
+    @property
+    def hot_days(self) -> int:
+        # Days newer than this stay in the row store
+        return get_settings().get('archive_hot_days', 7)
+
+    @property
+    def interval_seconds(self) -> float:
+        return get_settings().get('archive_interval_seconds', 3600)
+
+    def cutoff_date(self) -> str:
+        """Days before this date (YYYY-MM-DD) are closed and can be archived."""
+        today = datetime.now(self.timezone).date()
+        return (today - timedelta(days=self.hot_days)).strftime('%Y-%m-%d')
+
+    def run_once(self) -> Dict:
+        """Compact every closed day that still has rows in the row store."""
+        if not archive_available():
+            return {'partitions': 0, 'rows': 0, 'error': 'pyarrow is not installed'}
+
+        start = time.perf_counter()
+        result = self.store.compact_partitions(self.cutoff_date())
+        result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        if result['partitions']:
+            print(f"Archived {result['rows']} records from {result['partitions']} closed days "
+                  f"in {result['elapsed_ms']} ms")
+        self._last_run = time.time()
+        self._last_result = result
+        return result
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Archive compaction error: {e}")
+            time.sleep(self.interval_seconds)
+
+    def start(self):
+        """Start the compaction thread."""
+        with self._lock:
+            if self._thread is not None or not archive_available():
+                return
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def get_status(self) -> Dict:
+        """Get compactor state."""
+        return {
+            'available': archive_available(),
+            'running': self._thread is not None,
+            'hot_days': self.hot_days,
+            'last_run': self._last_run,
+            'last_result': self._last_result
+        }
+
+
+_compactor = None
+_compactor_lock = threading.Lock()
+
+
+def get_archive_compactor(store=None) -> Optional[ArchiveCompactor]:
+    """Get the process-wide archive compactor, creating it for store on first use"""
+    global _compactor
+    if _compactor is None and store is not None:
+        with _compactor_lock:
+            if _compactor is None:
+                _compactor = ArchiveCompactor(store)
+    return _compactor
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Attendance Reports for QR Code Attendance System
+Whole-roster attendance reports (percentage, late arrivals, streaks),
+computed one stored day at a time and streamed out as CSV or JSON
+"""
+
+import os
+import csv
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+import numpy as np
+import pandas as pd
+from settings_snapshot import get_settings
+from attendance_store import get_attendance_store
+from student_directory import get_student_directory
+from roll_cache import parse_roll_numbers
+from time_validator import TimeValidator
+from year_progression import YearProgression
+
+# Statuses that count as attending or missing a day
+ATTENDED_STATUSES = ('Present', 'Check-in')
+ABSENT_STATUSES = ('Absent',)
+
+REPORT_COLUMNS = [
+    'student_id', 'name', 'program', 'shift', 'year',
+    'days_present', 'days_absent', 'days_total', 'percentage',
+    'late_arrivals', 'current_streak', 'longest_streak', 'absent_streak',
+]
+
+
+class AttendanceReport:
+    """Batch attendance report over the whole (or a filtered) roster"""
+
+    def __init__(self, store=None, students: Optional[Dict] = None, timezone=None):
+        """
+        Args:
+            store (AttendanceStore, optional): Defaults to the shared store
+            students (Dict, optional): Roster keyed by roll number. Defaults
+                to students.json
+            timezone (str, optional): Defaults to the 'timezone' setting
+        """
+        # Defaults to the 'timezone' setting, read at use time
+        self._timezone = timezone
+
+        self.store = store or get_attendance_store()
+        self.students = students if students is not None else get_student_directory().get_all()
+
+    @property
+    def settings(self):
+        return get_settings()
+
+    @property
+    def validator(self) -> TimeValidator:
+        return TimeValidator(self._timezone or self.settings.get('timezone', 'Asia/Karachi'))
+
+    @property
+    def late_after_minutes(self) -> float:
+        # A check-in later than this after the check-in window opens is late
+        return self.settings.get('late_after_minutes', 15)
+
+    def roster(self, program: Optional[str] = None, shift: Optional[str] = None,
+               year: Optional[int] = None) -> pd.DataFrame:
+        """
+        Get the students a report covers.
+
+        Program and shift come from students.json when set there, otherwise
+        from the roll number; year is the stored current_year or is derived
+        from the admission year.
+
+        Returns:
+            pd.DataFrame: student_id, name, program, shift and year columns
+        """
+        student_ids = sorted(self.students)
+        parsed = parse_roll_numbers(student_ids)
+        academic_year = YearProgression().get_academic_year()
+        parsed_years = np.clip(academic_year - parsed.admission_year.astype(np.int32) + 1, 1, 4)
+
+        columns = {'student_id': student_ids, 'name': [], 'program': [], 'shift': [], 'year': []}
+        for i, student_id in enumerate(student_ids):
+            student = self.students[student_id] or {}
+            columns['name'].append(student.get('name'))
+            columns['program'].append(student.get('program') or parsed.program[i])
+            columns['shift'].append(student.get('shift') or parsed.shift[i])
+            year_value = student.get('current_year')
+            if year_value is None and parsed.valid[i]:
+                year_value = int(parsed_years[i])
+            columns['year'].append(year_value)
+        frame = pd.DataFrame(columns)
+
+        if program:
+            frame = frame[frame['program'].fillna('').str.lower() == program.lower()]
+        if shift:
+            frame = frame[frame['shift'].fillna('').str.lower() == shift.lower()]
+        if year is not None:
+            frame = frame[pd.to_numeric(frame['year'], errors='coerce') == int(year)]
+        return frame.reset_index(drop=True)
+
+    def compute(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                program: Optional[str] = None, shift: Optional[str] = None,
+                year: Optional[int] = None) -> pd.DataFrame:
+        """
+        Compute report metrics for every student on the filtered roster.
+
+        Stored days are read one at a time, oldest first; each day updates
+        per-student counter arrays in a few vectorized operations, so memory
+        use depends on the roster size, not on the history length.
+
+        A day counts as present when the student has a Present/Check-in
+        record, absent when it has only an Absent record. A present day is
+        late when its first check-in is more than 'late_after_minutes' after
+        the check-in window of the student's shift opened that weekday.
+        Streaks count consecutive present (or absent) days among the days
+        the student has records for.
+
+        Returns:
+            pd.DataFrame: One row per student with REPORT_COLUMNS
+        """
+        roster = self.roster(program, shift, year)
+        count = len(roster)
+        index = pd.Index(roster['student_id'])
+
+        timetable = self.validator.timetable
+        shift_codes = timetable.shift_codes(roster['shift'])
+        known_shift = shift_codes >= 0
+        # Check-in start per shift and weekday, shape (shifts, 7)
+        checkin_start = timetable.as_array()[:, :, 0].astype(np.float64)
+        grace = self.late_after_minutes * 60
+
+        present = np.zeros(count, dtype=np.int32)
+        absent = np.zeros(count, dtype=np.int32)
+        late = np.zeros(count, dtype=np.int32)
+        streak = np.zeros(count, dtype=np.int32)
+        longest = np.zeros(count, dtype=np.int32)
+        absent_streak = np.zeros(count, dtype=np.int32)
+
+        columns = ['student_id', 'timestamp', 'status']
+        for date, rows in self.store.iter_days(date_from, date_to, columns):
+            if not count or not rows:
+                continue
+            day = pd.DataFrame.from_records(rows, columns=columns)
+            positions = index.get_indexer(day['student_id'])
+            in_roster = positions >= 0
+            if not in_roster.any():
+                continue
+            positions = positions[in_roster]
+            status = day['status'].to_numpy()[in_roster]
+
+            checked_in = np.isin(status, ATTENDED_STATUSES)
+            attended = np.zeros(count, dtype=bool)
+            attended[positions[checked_in]] = True
+            marked_absent = np.zeros(count, dtype=bool)
+            marked_absent[positions[np.isin(status, ABSENT_STATUSES)]] = True
+            absent_day = marked_absent & ~attended
+
+            # Earliest check-in of the day per student, in seconds since midnight
+            times = day['timestamp'][in_roster][checked_in].astype(str).str.slice(11, 19)
+            seconds = pd.to_timedelta(times, errors='coerce').dt.total_seconds().to_numpy()
+            first_checkin = np.full(count, np.inf)
+            np.fmin.at(first_checkin, positions[checked_in], seconds)
+
+            weekday = datetime.strptime(date, '%Y-%m-%d').weekday()
+            opens = np.where(known_shift, checkin_start[np.maximum(shift_codes, 0), weekday], np.inf)
+            late += attended & (first_checkin > opens + grace)
+
+            present += attended
+            absent += absent_day
+            streak = np.where(attended, streak + 1, np.where(absent_day, 0, streak))
+            longest = np.maximum(longest, streak)
+            absent_streak = np.where(absent_day, absent_streak + 1, np.where(attended, 0, absent_streak))
+
+        total = present + absent
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentage = np.where(total > 0, np.round(present / total * 100, 1), np.nan)
+
+        report = roster.copy()
+        report['days_present'] = present
+        report['days_absent'] = absent
+        report['days_total'] = total
+        report['percentage'] = percentage
+        report['late_arrivals'] = late
+        report['current_streak'] = streak
+        report['longest_streak'] = longest
+        report['absent_streak'] = absent_streak
+        return report[REPORT_COLUMNS]
+
+    def iter_rows(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                  program: Optional[str] = None, shift: Optional[str] = None,
+                  year: Optional[int] = None, below: Optional[float] = None) -> Iterator[Dict]:
+        """
+        Yield report rows as plain dicts, lowest attendance first.
+
+        Args:
+            below (float, optional): Only students whose percentage is below
+                this (e.g. the defaulter threshold); students with no
+                recorded days are left out when it is given
+        """
+        report = self.compute(date_from, date_to, program, shift, year)
+        if below is not None:
+            report = report[report['percentage'] < float(below)]
+        report = report.sort_values(['percentage', 'student_id'], na_position='last')
+
+        for values in report.itertuples(index=False, name=None):
+            row = {}
+            for column, value in zip(REPORT_COLUMNS, values):
+                if isinstance(value, np.generic):
+                    value = value.item()
+                if isinstance(value, float) and np.isnan(value):
+                    value = None
+                row[column] = value
+            yield row
+
+
+def write_csv(rows: Iterable[Dict], path: str) -> int:
+    """Stream report rows to a CSV file. Returns the number of rows written."""
+    count = 0
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: '' if value is None else value for key, value in row.items()})
+            count += 1
+    os.replace(temp_file, path)
+    return count
+
+
+def write_json(rows: Iterable[Dict], path: str) -> int:
+    """Stream report rows to a JSON array, one row per line. Returns the number of rows written."""
+    count = 0
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w') as f:
+        f.write('[')
+        for row in rows:
+            f.write(',\n' if count else '\n')
+            f.write(json.dumps(row))
+            count += 1
+        f.write('\n]\n')
+    os.replace(temp_file, path)
+    return count
+
+
+def export_report(path: str, report: Optional[AttendanceReport] = None, **filters) -> Dict:
+    """
+    Compute a report and write it to a .csv or .json file.
+
+    Args:
+        path (str): Output file; the extension picks the format
+        report (AttendanceReport, optional): Defaults to a new report over the shared store
+        **filters: date_from, date_to, program, shift, year and below
+
+    Returns:
+        Dict: 'success', 'path', 'format', 'rows' and 'error'
+    """
+    extension = os.path.splitext(path)[1].lower()
+    writers = {'.csv': write_csv, '.json': write_json}
+    if extension not in writers:
+        return {'success': False, 'path': path, 'format': None, 'rows': 0,
+                'error': 'Output file must end in .csv or .json'}
+
+    report = report or AttendanceReport()
+    try:
+        rows = writers[extension](report.iter_rows(**filters), path)
+    except (OSError, ValueError) as e:
+        return {'success': False, 'path': path, 'format': extension[1:], 'rows': 0, 'error': str(e)}
+    return {'success': True, 'path': path, 'format': extension[1:], 'rows': rows, 'error': None}
@@ -0,0 +1,889 @@
+#!/usr/bin/env python3
+"""
+Attendance Store for QR Code Attendance System
+SQLite-backed local attendance store (attendance_local.db), the source of
+truth for reports and absent marking. attendance.csv is kept as an export.
+Attendance is partitioned by day: recent days live in the SQLite row store,
+closed days are compacted into the columnar archive (attendance_archive.py).
+"""
+
+import os
+import csv
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+from attendance_archive import AttendanceArchive, archive_available
+
+# Record keys used throughout the Python client, mapped to table columns
+FIELD_COLUMNS = [
+    ('ID', 'student_id'),
+    ('Name', 'student_name'),
+    ('Timestamp', 'timestamp'),
+    ('Status', 'status'),
+    ('Shift', 'shift'),
+    ('Program', 'program'),
+    ('Current_Year', 'current_year'),
+    ('Admission_Year', 'admission_year'),
+    ('Auto_Marked', 'auto_marked'),
+]
+RECORD_FIELDS = [field for field, _ in FIELD_COLUMNS]
+COLUMNS = [column for _, column in FIELD_COLUMNS]
+
+# Legacy attendance.csv rows were written with 4, 6 or 8 columns
+LEGACY_CSV_LAYOUTS = {
+    4: ['ID', 'Name', 'Timestamp', 'Status'],
+    6: ['ID', 'Name', 'Timestamp', 'Status', 'Shift', 'Auto_Marked'],
+    8: ['ID', 'Name', 'Timestamp', 'Status', 'Shift', 'Program', 'Current_Year', 'Admission_Year'],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id TEXT NOT NULL,
+    student_name TEXT,
+    timestamp TEXT NOT NULL,
+    date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    shift TEXT,
+    program TEXT,
+    current_year INTEGER,
+    admission_year INTEGER,
+    auto_marked TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_attendance_student_date ON attendance (student_id, date);
+CREATE INDEX IF NOT EXISTS idx_attendance_date_status ON attendance (date, status);
+CREATE INDEX IF NOT EXISTS idx_attendance_shift_date ON attendance (shift, date);
+
+-- Dedup index: 64-bit hashes of (student_id, timestamp, status)
+CREATE TABLE IF NOT EXISTS attendance_keys (
+    key INTEGER PRIMARY KEY
+);
+
+-- Catalog of days compacted into the columnar archive
+CREATE TABLE IF NOT EXISTS attendance_partitions (
+    date TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    min_id INTEGER NOT NULL,
+    max_id INTEGER NOT NULL,
+    archived_at TEXT NOT NULL
+);
+
+-- Materialized status counts per student, shift and program, updated with every insert
+CREATE TABLE IF NOT EXISTS attendance_counters (
+    student_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    shift TEXT NOT NULL DEFAULT '',
+    program TEXT NOT NULL DEFAULT '',
+    student_name TEXT,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (student_id, status, shift, program)
+);
+"""
+
+# Counter dimensions that can be grouped on besides the student
+COUNTER_GROUPS = ('shift', 'program')
+
+# SQLite limits the number of bound parameters per statement
+KEY_LOOKUP_BATCH = 500
+
+
+def read_attendance_csv(csv_file: str) -> List[Dict]:
+    """Read attendance.csv rows, mapping legacy 4/6/8-column rows to record fields."""
+    records = []
+    with open(csv_file, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return records
+        for row in reader:
+            if not row:
+                continue
+            if len(row) == len(header) and header == RECORD_FIELDS[:len(header)]:
+                layout = header
+            else:
+                layout = LEGACY_CSV_LAYOUTS.get(len(row))
+            if layout is None:
+                layout = header if len(header) == len(row) else RECORD_FIELDS[:len(row)]
+            records.append(dict(zip(layout, row)))
+    return records
+
+
+def normalize_record(record: Dict) -> Dict:
+    """
+    Convert a local (ID/Name/...) or website (student_id/student_name/...)
+    attendance record to the local record format.
+    """
+    normalized = {}
+    for field, column in FIELD_COLUMNS:
+        value = record.get(field)
+        if value is None:
+            value = record.get(column)
+        if value is None:
+            value = record.get(field.lower())
+        normalized[field] = value
+    return normalized
+
+
+def record_key(record: Dict) -> str:
+    """
+    Get the identity of an attendance record: a hash of its student,
+    timestamp and status. Stable across processes, so it can be used as an
+    idempotency key for uploads and as a dedup key for merges.
+    """
+    record = normalize_record(record)
+    identity = f"{record['ID']}\x1f{record['Timestamp']}\x1f{record['Status']}"
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+
+def record_key_int(record: Dict) -> int:
+    """Get record_key() as a signed 64-bit integer for the dedup index."""
+    value = int(record_key(record)[:16], 16)
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+class AttendanceStore:
+    """Indexed SQLite attendance store"""
+
+    def __init__(self, db_file="attendance_local.db", csv_file="attendance.csv",
+                 archive_dir="attendance_archive"):
+        self.db_file = db_file
+        self.csv_file = csv_file
+        self.archive = AttendanceArchive(archive_dir)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._initialize()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection to the store."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _initialize(self):
+        """Create the schema and import attendance.csv on first use."""
+        conn = self._connect()
+        with self._write_lock, conn:
+            conn.executescript(SCHEMA)
+
+        if self.count() == 0 and self.csv_file and os.path.exists(self.csv_file):
+            imported = self.import_csv(self.csv_file)
+            if imported:
+                print(f"Imported {imported} records from {self.csv_file} into {self.db_file}")
+        elif self.count() and not conn.execute("SELECT 1 FROM attendance_keys LIMIT 1").fetchone():
+            # Stores created before the dedup index existed
+            indexed = self.rebuild_key_index()
+            print(f"Built dedup index for {indexed} records")
+
+        if self.count() and not conn.execute("SELECT 1 FROM attendance_counters LIMIT 1").fetchone():
+            # Stores created before the counters existed
+            counted = self.rebuild_counters()
+            print(f"Built attendance counters for {counted} records")
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def _row_values(self, record: Dict) -> tuple:
+        record = normalize_record(record)
+        timestamp = str(record['Timestamp'] or '')
+        values = []
+        for field, column in FIELD_COLUMNS:
+            values.append(record[field])
+            if column == 'timestamp':
+                values.append(timestamp[:10])
+        return tuple(values)
+
+    def add_records(self, records: Iterable[Dict]) -> int:
+        """
+        Insert attendance records in one transaction.
+
+        Args:
+            records: Attendance records in local or website format
+
+        Returns:
+            int: Number of records inserted
+        """
+        records = list(records)
+        rows = [self._row_values(record) for record in records]
+        if not rows:
+            return 0
+
+        keys = [(record_key_int(record),) for record in records]
+        conn = self._connect()
+        with self._write_lock, conn:
+            self._insert_rows(conn, rows, keys)
+        return len(rows)
+
+    def _insert_rows(self, conn: sqlite3.Connection, rows: List[tuple], keys: List[tuple]):
+        """Insert attendance rows and their dedup keys. Caller holds the write lock and transaction."""
+        columns = COLUMNS[:3] + ['date'] + COLUMNS[3:]
+        placeholders = ', '.join('?' for _ in columns)
+        conn.executemany(
+            f"INSERT INTO attendance ({', '.join(columns)}) VALUES ({placeholders})",
+            rows
+        )
+        conn.executemany("INSERT OR IGNORE INTO attendance_keys (key) VALUES (?)", keys)
+        self._update_counters(conn, rows)
+
+    @staticmethod
+    def _counter_deltas(rows: Iterable[tuple]) -> List[tuple]:
+        """Aggregate inserted rows (in _insert_rows column order) into counter increments."""
+        deltas = {}
+        for row in rows:
+            student_id, student_name, status, shift, program = row[0], row[1], row[4], row[5], row[6]
+            key = (student_id, status, shift or '', program or '')
+            count, name = deltas.get(key, (0, None))
+            deltas[key] = (count + 1, student_name if student_name is not None else name)
+        return [key + (name, count) for key, (count, name) in deltas.items()]
+
+    def _update_counters(self, conn: sqlite3.Connection, rows: Iterable[tuple]):
+        """Add inserted rows to the counters. Caller holds the write lock and transaction."""
+        conn.executemany(
+            "INSERT INTO attendance_counters (student_id, status, shift, program, student_name, count) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (student_id, status, shift, program) DO UPDATE SET "
+            "count = count + excluded.count, "
+            "student_name = COALESCE(excluded.student_name, student_name)",
+            self._counter_deltas(rows)
+        )
+
+    def _subtract_counters(self, conn: sqlite3.Connection, rows: Iterable[tuple]):
+        """Remove deleted or re-statused rows from the counters. Caller holds the write lock and transaction."""
+        deltas = self._counter_deltas(rows)
+        conn.executemany(
+            "UPDATE attendance_counters SET count = count - ? "
+            "WHERE student_id = ? AND status = ? AND shift = ? AND program = ?",
+            [(count, student_id, status, shift, program)
+             for student_id, status, shift, program, _, count in deltas]
+        )
+        conn.executemany(
+            "DELETE FROM attendance_counters "
+            "WHERE student_id = ? AND status = ? AND shift = ? AND program = ? AND count <= 0",
+            [(student_id, status, shift, program) for student_id, status, shift, program, _, _ in deltas]
+        )
+
+    def add_record(self, record: Dict) -> int:
+        """Insert one attendance record."""
+        return self.add_records([record])
+
+    def merge_records(self, records: Iterable[Dict]) -> List[Dict]:
+        """
+        Insert records that are not already stored.
+
+        A record is a duplicate when a row with the same student, timestamp
+        and status exists. Duplicates are found through the persistent
+        attendance_keys index, so the cost depends on the batch size rather
+        than on the size of the store.
+
+        Returns:
+            List[Dict]: The records that were inserted, in local format
+        """
+        candidates = {}
+        for record in records:
+            record = normalize_record(record)
+            candidates.setdefault(record_key_int(record), record)
+        if not candidates:
+            return []
+
+        conn = self._connect()
+        with self._write_lock, conn:
+            existing = set()
+            keys = list(candidates)
+            for start in range(0, len(keys), KEY_LOOKUP_BATCH):
+                batch = keys[start:start + KEY_LOOKUP_BATCH]
+                existing.update(row[0] for row in conn.execute(
+                    f"SELECT key FROM attendance_keys WHERE key IN ({', '.join('?' for _ in batch)})",
+                    batch
+                ))
+
+            new_keys = [key for key in keys if key not in existing]
+            new_records = [candidates[key] for key in new_keys]
+            if new_records:
+                self._insert_rows(
+                    conn,
+                    [self._row_values(record) for record in new_records],
+                    [(key,) for key in new_keys]
+                )
+        return new_records
+
+    def apply_check_outs(self, records: Iterable[Dict]) -> List[Dict]:
+        """
+        Turn stored 'Check-in' rows into 'Present' for website check-outs.
+
+        The website records a check-out by updating the day's 'Check-in' row
+        in place (same id and timestamp), so the 'Present' row it returns is
+        not a new record. For each incoming 'Present' record that is not
+        stored yet, the student's 'Check-in' rows on that day are updated the
+        same way, together with their dedup keys and counters. A check-out
+        made on this machine was also saved as its own 'Present' row (at the
+        check-out time); that row is merged away so the day has one Present
+        row, as on the website. The incoming record's key is indexed too, so
+        a later merge_records() skips it.
+
+        Returns:
+            List[Dict]: The incoming records that were applied as updates
+        """
+        candidates = {}
+        for record in records:
+            record = normalize_record(record)
+            if record['Status'] == 'Present' and record['ID'] and record['Timestamp']:
+                candidates.setdefault(record_key_int(record), record)
+        if not candidates:
+            return []
+
+        applied = []
+        conn = self._connect()
+        with self._write_lock, conn:
+            for key, record in candidates.items():
+                if conn.execute("SELECT 1 FROM attendance_keys WHERE key = ?", (key,)).fetchone():
+                    continue
+                rows = conn.execute(
+                    "SELECT id, student_id, student_name, timestamp, shift, program FROM attendance "
+                    "WHERE student_id = ? AND date = ? AND status = 'Check-in'",
+                    (record['ID'], str(record['Timestamp'])[:10])
+                ).fetchall()
+                if not rows:
+                    continue
+
+                # Local check-out rows saved after the check-in (their keys stay indexed)
+                local_outs = conn.execute(
+                    "SELECT id, student_id, student_name, shift, program FROM attendance "
+                    "WHERE student_id = ? AND date = ? AND status = 'Present' AND timestamp > ?",
+                    (record['ID'], str(record['Timestamp'])[:10], min(row['timestamp'] for row in rows))
+                ).fetchall()
+                if local_outs:
+                    conn.executemany("DELETE FROM attendance WHERE id = ?", [(row['id'],) for row in local_outs])
+                    self._subtract_counters(conn, [
+                        (row['student_id'], row['student_name'], None, None, 'Present', row['shift'], row['program'])
+                        for row in local_outs
+                    ])
+
+                conn.executemany("UPDATE attendance SET status = 'Present' WHERE id = ?",
+                                 [(row['id'],) for row in rows])
+                conn.executemany("DELETE FROM attendance_keys WHERE key = ?", [
+                    (record_key_int({'ID': row['student_id'], 'Timestamp': row['timestamp'], 'Status': 'Check-in'}),)
+                    for row in rows
+                ])
+                new_keys = {(key,)} | {
+                    (record_key_int({'ID': row['student_id'], 'Timestamp': row['timestamp'], 'Status': 'Present'}),)
+                    for row in rows
+                }
+                conn.executemany("INSERT OR IGNORE INTO attendance_keys (key) VALUES (?)", list(new_keys))
+
+                # Move the rows from the Check-in counters to the Present counters
+                self._update_counters(conn, [
+                    (row['student_id'], row['student_name'], None, None, 'Present', row['shift'], row['program'])
+                    for row in rows
+                ])
+                self._subtract_counters(conn, [
+                    (row['student_id'], row['student_name'], None, None, 'Check-in', row['shift'], row['program'])
+                    for row in rows
+                ])
+                applied.append(record)
+        return applied
+
+    def remove_records(self, records: Iterable[Dict]) -> int:
+        """
+        Delete the rows matching records (same student, timestamp and status)
+        from the row store, with their dedup keys and counters.
+
+        Used to drop local rows the website refused; archived days are not
+        rewritten.
+
+        Returns:
+            int: Number of rows deleted
+        """
+        removed = 0
+        conn = self._connect()
+        with self._write_lock, conn:
+            for record in records:
+                record = normalize_record(record)
+                rows = conn.execute(
+                    "SELECT id, student_id, student_name, shift, program FROM attendance "
+                    "WHERE student_id = ? AND timestamp = ? AND status = ?",
+                    (record['ID'], record['Timestamp'], record['Status'])
+                ).fetchall()
+                if not rows:
+                    continue
+                conn.executemany("DELETE FROM attendance WHERE id = ?", [(row['id'],) for row in rows])
+                conn.execute("DELETE FROM attendance_keys WHERE key = ?", (record_key_int(record),))
+                self._subtract_counters(conn, [
+                    (row['student_id'], row['student_name'], None, None, record['Status'], row['shift'], row['program'])
+                    for row in rows
+                ])
+                removed += len(rows)
+        return removed
+
+    def replace_all(self, records: Iterable[Dict]) -> int:
+        """Replace every stored record."""
+        records = list(records)
+        rows = [self._row_values(record) for record in records]
+        keys = [(record_key_int(record),) for record in records]
+        conn = self._connect()
+        with self._write_lock, conn:
+            archived = [row['path'] for row in conn.execute("SELECT path FROM attendance_partitions")]
+            conn.execute("DELETE FROM attendance")
+            conn.execute("DELETE FROM attendance_keys")
+            conn.execute("DELETE FROM attendance_partitions")
+            conn.execute("DELETE FROM attendance_counters")
+            self._insert_rows(conn, rows, keys)
+        for path in archived:
+            self.archive.delete_partition(path)
+        return len(rows)
+
+    def rebuild_key_index(self) -> int:
+        """Recompute the dedup index from the stored records."""
+        conn = self._connect()
+        keys = [(record_key_int(record),) for record in self.iter_records()]
+        with self._write_lock, conn:
+            conn.execute("DELETE FROM attendance_keys")
+            conn.executemany("INSERT OR IGNORE INTO attendance_keys (key) VALUES (?)", keys)
+        return len(keys)
+
+    def rebuild_counters(self) -> int:
+        """Recompute the attendance counters from the stored records (row store and archive)."""
+        conn = self._connect()
+        with self._write_lock:
+            rows = [
+                (record['ID'], record['Name'], None, None, record['Status'], record['Shift'], record['Program'])
+                for record in self.iter_records()
+            ]
+            with conn:
+                conn.execute("DELETE FROM attendance_counters")
+                self._update_counters(conn, rows)
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Partitions
+    # ------------------------------------------------------------------
+
+    def archived_partitions(self, date_from: Optional[str] = None,
+                            date_to: Optional[str] = None) -> List[sqlite3.Row]:
+        """Get catalog entries of archived days in a date range, oldest first."""
+        query = "SELECT date, path, rows, min_id, max_id FROM attendance_partitions"
+        conditions, params = self._date_conditions(None, date_from, date_to)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return self._connect().execute(query + " ORDER BY date", params).fetchall()
+
+    def _archived_rows(self, partitions: Iterable[sqlite3.Row], columns: Optional[List[str]] = None,
+                       filters: Optional[List[tuple]] = None):
+        """Read rows from archived partitions, one partition at a time."""
+        for partition in partitions:
+            yield from self.archive.read_partition(partition['path'], columns, filters)
+
+    def archive_partition(self, date: str) -> int:
+        """
+        Move one day's rows from the row store into the archive.
+
+        Rows already archived for the day are merged into a new partition
+        file; the catalog is switched to it in the same transaction that
+        deletes the rows from the row store, so a crash leaves at most an
+        unreferenced file, never a day counted twice.
+
+        Returns:
+            int: Number of rows moved
+        """
+        conn = self._connect()
+        with self._write_lock:
+            rows = [dict(row) for row in conn.execute(
+                f"SELECT id, date, {', '.join(COLUMNS)} FROM attendance WHERE date = ? ORDER BY id",
+                (date,)
+            )]
+            if not rows:
+                return 0
+
+            previous = conn.execute(
+                "SELECT path FROM attendance_partitions WHERE date = ?", (date,)
+            ).fetchone()
+            if previous:
+                rows = self.archive.read_partition(previous['path']) + rows
+
+            ids = [row['id'] for row in rows]
+            path = self.archive.write_partition(date, rows, max(ids))
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO attendance_partitions "
+                    "(date, path, rows, min_id, max_id, archived_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (date, path, len(rows), min(ids), max(ids),
+                     datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                )
+                moved = conn.execute("DELETE FROM attendance WHERE date = ?", (date,)).rowcount
+
+        if previous and previous['path'] != path:
+            self.archive.delete_partition(previous['path'])
+        return moved
+
+    def compact_partitions(self, before_date: str) -> Dict:
+        """
+        Archive every day before before_date that still has rows in the row store.
+
+        Args:
+            before_date (str): First day (YYYY-MM-DD) that stays in the row store
+
+        Returns:
+            Dict: 'partitions' and 'rows' archived
+        """
+        if not archive_available():
+            return {'partitions': 0, 'rows': 0}
+        dates = [row[0] for row in self._connect().execute(
+            "SELECT DISTINCT date FROM attendance WHERE date < ? AND date != '' ORDER BY date",
+            (before_date,)
+        )]
+        moved = 0
+        for date in dates:
+            moved += self.archive_partition(date)
+        return {'partitions': len(dates), 'rows': moved}
+
+    def partition_stats(self) -> Dict:
+        """Get the number of days and rows in the row store and the archive."""
+        conn = self._connect()
+        hot_days, hot_rows = conn.execute(
+            "SELECT COUNT(DISTINCT date), COUNT(*) FROM attendance"
+        ).fetchone()
+        archived_days, archived_rows = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(rows), 0) FROM attendance_partitions"
+        ).fetchone()
+        archive_bytes = sum(
+            os.path.getsize(row['path']) for row in self.archived_partitions()
+            if os.path.exists(row['path'])
+        )
+        return {
+            'hot_days': hot_days,
+            'hot_rows': hot_rows,
+            'archived_days': archived_days,
+            'archived_rows': archived_rows,
+            'archive_bytes': archive_bytes
+        }
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _to_record(self, row) -> Dict:
+        return {field: row[column] for field, column in FIELD_COLUMNS}
+
+    @staticmethod
+    def _date_conditions(date: Optional[str], date_from: Optional[str],
+                         date_to: Optional[str]) -> tuple:
+        """Build SQL conditions for an exact date or an inclusive date range."""
+        conditions, params = [], []
+        if date is not None:
+            conditions.append("date = ?")
+            params.append(date)
+        if date_from is not None:
+            conditions.append("date >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("date <= ?")
+            params.append(date_to)
+        return conditions, params
+
+    def _partitions_for(self, date: Optional[str], date_from: Optional[str],
+                        date_to: Optional[str]) -> List[sqlite3.Row]:
+        """Get the archived partitions a date filter touches."""
+        if date is not None:
+            return self.archived_partitions(date, date)
+        return self.archived_partitions(date_from, date_to)
+
+    def count(self) -> int:
+        """Get the total number of stored records."""
+        conn = self._connect()
+        hot = conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+        archived = conn.execute("SELECT COALESCE(SUM(rows), 0) FROM attendance_partitions").fetchone()[0]
+        return hot + archived
+
+    def iter_records(self):
+        """Iterate over all stored records (archived days first) without loading them all."""
+        for row in self._archived_rows(self.archived_partitions(), COLUMNS):
+            yield self._to_record(row)
+        cursor = self._connect().execute(f"SELECT {', '.join(COLUMNS)} FROM attendance ORDER BY id")
+        for row in cursor:
+            yield self._to_record(row)
+
+    def iter_days(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                  columns: Optional[List[str]] = None):
+        """
+        Iterate over stored days in a date range, oldest first, holding one
+        day in memory at a time.
+
+        Args:
+            date_from (str, optional): First day (YYYY-MM-DD), inclusive
+            date_to (str, optional): Last day (YYYY-MM-DD), inclusive
+            columns (list, optional): Row-store columns to read. Defaults to all
+
+        Yields:
+            tuple: (date, rows) with rows as dicts keyed by column
+        """
+        columns = list(columns or COLUMNS)
+        conn = self._connect()
+        conditions, params = self._date_conditions(None, date_from, date_to)
+        conditions.append("date != ''")
+        hot_dates = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT date FROM attendance WHERE {' AND '.join(conditions)}", params
+        )]
+        partitions = {partition['date']: partition for partition in self.archived_partitions(date_from, date_to)}
+
+        for date in sorted(set(hot_dates) | set(partitions)):
+            rows = []
+            if date in partitions:
+                rows.extend(self.archive.read_partition(partitions[date]['path'], columns))
+            rows.extend(dict(row) for row in conn.execute(
+                f"SELECT {', '.join(columns)} FROM attendance WHERE date = ? ORDER BY id", (date,)
+            ))
+            yield date, rows
+
+    def max_row_id(self) -> int:
+        """Get the id of the newest stored row (0 when empty)."""
+        conn = self._connect()
+        hot = conn.execute("SELECT MAX(id) FROM attendance").fetchone()[0]
+        archived = conn.execute("SELECT MAX(max_id) FROM attendance_partitions").fetchone()[0]
+        return max(hot or 0, archived or 0)
+
+    def get_records_after(self, row_id: int, through_id: Optional[int] = None) -> List[Dict]:
+        """Get records inserted after row_id (up to through_id), oldest first."""
+        query = f"SELECT id, {', '.join(COLUMNS)} FROM attendance WHERE id > ?"
+        params = [row_id]
+        if through_id is not None:
+            query += " AND id <= ?"
+            params.append(through_id)
+        rows = self._connect().execute(query + " ORDER BY id", params).fetchall()
+
+        # Only partitions whose id range overlaps the requested one are read
+        partitions = [
+            partition for partition in self.archived_partitions()
+            if partition['max_id'] > row_id and (through_id is None or partition['min_id'] <= through_id)
+        ]
+        if partitions:
+            filters = [('id', '>', row_id)]
+            if through_id is not None:
+                filters.append(('id', '<=', through_id))
+            rows = sorted(list(self._archived_rows(partitions, ['id'] + COLUMNS, filters)) + rows,
+                          key=lambda row: row['id'])
+        return [self._to_record(row) for row in rows]
+
+    def get_records(self, student_id: Optional[str] = None, date: Optional[str] = None,
+                    status: Optional[str] = None, date_from: Optional[str] = None,
+                    date_to: Optional[str] = None) -> List[Dict]:
+        """
+        Get stored records, optionally filtered by student, date or date
+        range (inclusive YYYY-MM-DD bounds) and status.
+
+        Only the archived days inside the date filter are read.
+        """
+        conditions, params = self._date_conditions(date, date_from, date_to)
+        filters = []
+        if student_id is not None:
+            conditions.append("student_id = ?")
+            params.append(student_id)
+            filters.append(('student_id', '=', student_id))
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+            filters.append(('status', '=', status))
+
+        records = [
+            self._to_record(row) for row in
+            self._archived_rows(self._partitions_for(date, date_from, date_to), COLUMNS, filters)
+        ]
+
+        query = f"SELECT {', '.join(COLUMNS)} FROM attendance"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+
+        records.extend(self._to_record(row) for row in self._connect().execute(query, params))
+        return records
+
+    def status_counts(self, student_id: Optional[str] = None, date_from: Optional[str] = None,
+                      date_to: Optional[str] = None) -> Dict[str, int]:
+        """
+        Count records by status, overall or for one student, optionally
+        within a date range. All-time counts come from the counters.
+        """
+        if date_from is None and date_to is None:
+            query = "SELECT status, SUM(count) FROM attendance_counters"
+            params = []
+            if student_id is not None:
+                query += " WHERE student_id = ?"
+                params.append(student_id)
+            return {status: count for status, count in
+                    self._connect().execute(query + " GROUP BY status", params)}
+
+        conditions, params = self._date_conditions(None, date_from, date_to)
+        filters = []
+        if student_id is not None:
+            conditions.append("student_id = ?")
+            params.append(student_id)
+            filters.append(('student_id', '=', student_id))
+
+        query = "SELECT status, COUNT(*) FROM attendance"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        counts = {status: count for status, count in self._connect().execute(query + " GROUP BY status", params)}
+
+        for row in self._archived_rows(self.archived_partitions(date_from, date_to), ['status'], filters):
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+        return counts
+
+    def student_status_counts(self, date_from: Optional[str] = None,
+                              date_to: Optional[str] = None) -> Dict[tuple, Dict[str, int]]:
+        """
+        Count records by status for every student, keyed by (ID, Name),
+        optionally within a date range. All-time counts come from the
+        counters, with one entry per student under a recorded name.
+        """
+        if date_from is None and date_to is None:
+            stats = {}
+            names = {}
+            rows = self._connect().execute(
+                "SELECT student_id, status, MAX(student_name), SUM(count) FROM attendance_counters "
+                "GROUP BY student_id, status ORDER BY student_id"
+            ).fetchall()
+            for student_id, _, student_name, _ in rows:
+                if student_name is not None:
+                    names.setdefault(student_id, student_name)
+            for student_id, status, _, count in rows:
+                stats.setdefault((student_id, names.get(student_id)), {})[status] = count
+            return stats
+
+        conditions, params = self._date_conditions(None, date_from, date_to)
+        query = "SELECT student_id, student_name, status, COUNT(*) FROM attendance"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        rows = list(self._connect().execute(
+            query + " GROUP BY student_id, student_name, status", params
+        ))
+
+        archived = {}
+        for row in self._archived_rows(self.archived_partitions(date_from, date_to),
+                                       ['student_id', 'student_name', 'status']):
+            key = (row['student_id'], row['student_name'], row['status'])
+            archived[key] = archived.get(key, 0) + 1
+        rows.extend(key + (count,) for key, count in archived.items())
+
+        stats = {}
+        for student_id, student_name, status, count in sorted(rows, key=lambda row: str(row[0])):
+            counts = stats.setdefault((student_id, student_name), {})
+            counts[status] = counts.get(status, 0) + count
+        return stats
+
+    def group_status_counts(self, group: str) -> Dict[str, Dict[str, int]]:
+        """
+        Count records by status for each shift or program, from the counters.
+
+        Args:
+            group (str): 'shift' or 'program'
+
+        Returns:
+            Dict: {shift or program: {status: count}}; records without a
+            value are grouped under ''
+        """
+        if group not in COUNTER_GROUPS:
+            raise ValueError(f"Unknown counter group: {group}")
+        stats = {}
+        rows = self._connect().execute(
+            f"SELECT {group}, status, SUM(count) FROM attendance_counters "
+            f"GROUP BY {group}, status ORDER BY {group}"
+        )
+        for value, status, count in rows:
+            stats.setdefault(value, {})[status] = count
+        return stats
+
+    def get_student_name(self, student_id: str) -> Optional[str]:
+        """Get the most recently recorded name for a student."""
+        row = self._connect().execute(
+            "SELECT student_name FROM attendance WHERE student_id = ? ORDER BY id DESC LIMIT 1",
+            (student_id,)
+        ).fetchone()
+        if row:
+            return row[0]
+
+        # Newest archived day first; stop at the first one that has the student
+        for partition in reversed(self.archived_partitions()):
+            rows = self.archive.read_partition(partition['path'], ['student_name'],
+                                               [('student_id', '=', student_id)])
+            if rows:
+                return rows[-1]['student_name']
+        return None
+
+    def student_ids_with_status(self, date: str, status, time_from: Optional[str] = None,
+                                time_to: Optional[str] = None) -> Set[str]:
+        """
+        Get the students with a given status on a date.
+
+        Args:
+            date (str): Date as YYYY-MM-DD
+            status (str or tuple): Attendance status, or several statuses
+            time_from (str, optional): Earliest time of day as HH:MM:SS
+            time_to (str, optional): Latest time of day as HH:MM:SS
+
+        Returns:
+            Set[str]: Matching student IDs
+        """
+        statuses = [status] if isinstance(status, str) else list(status)
+        query = (f"SELECT DISTINCT student_id FROM attendance WHERE date = ? "
+                 f"AND status IN ({', '.join('?' for _ in statuses)})")
+        params = [date] + statuses
+        if time_from is not None:
+            query += " AND substr(timestamp, 12, 8) >= ?"
+            params.append(time_from)
+        if time_to is not None:
+            query += " AND substr(timestamp, 12, 8) <= ?"
+            params.append(time_to)
+        student_ids = {row[0] for row in self._connect().execute(query, params)}
+
+        for row in self._archived_rows(self.archived_partitions(date, date), ['student_id', 'timestamp'],
+                                       [('status', 'in', statuses)]):
+            time_of_day = (row['timestamp'] or '')[11:19]
+            if (time_from is None or time_of_day >= time_from) and (time_to is None or time_of_day <= time_to):
+                student_ids.add(row['student_id'])
+        return student_ids
+
+    # ------------------------------------------------------------------
+    # CSV import/export
+    # ------------------------------------------------------------------
+
+    def import_csv(self, csv_file: str) -> int:
+        """Import records from an attendance.csv file with mixed row widths."""
+        return self.add_records(read_attendance_csv(csv_file))
+
+    def export_csv(self, csv_file: Optional[str] = None) -> int:
+        """Write all stored records to a CSV export."""
+        csv_file = csv_file or self.csv_file
+        count = 0
+        temp_file = f"{csv_file}.tmp"
+        with open(temp_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(RECORD_FIELDS)
+            for record in self.iter_records():
+                writer.writerow(['' if record[field] is None else record[field] for field in RECORD_FIELDS])
+                count += 1
+        os.replace(temp_file, csv_file)
+        return count
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_attendance_store(db_file="attendance_local.db", csv_file="attendance.csv",
+                         archive_dir="attendance_archive") -> AttendanceStore:
+    """Get the shared attendance store for a database file"""
+    path = os.path.abspath(db_file)
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = AttendanceStore(db_file, csv_file, archive_dir)
+                _stores[path] = store
+    return store
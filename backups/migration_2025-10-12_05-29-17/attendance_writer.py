@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Attendance CSV Writer for QR Code Attendance System
+Appends rows to the attendance.csv export through one long-lived buffered
+handle with a fixed column schema
+"""
+
+import os
+import csv
+import threading
+from typing import Dict, Iterable
+from attendance_store import RECORD_FIELDS, normalize_record, read_attendance_csv
+
+# Fixed attendance.csv schema; every row has exactly these columns
+CSV_COLUMNS = RECORD_FIELDS
+
+
+class AttendanceCsvWriter:
+    """Buffered, schema-fixed appender for attendance.csv"""
+
+    def __init__(self, csv_file="attendance.csv"):
+        self.csv_file = csv_file
+        self._lock = threading.Lock()
+        self._handle = None
+        self._writer = None
+
+    def _open(self):
+        """Open the append handle, writing or upgrading the header first. Caller must hold the lock."""
+        if self._handle is not None:
+            return
+
+        header = None
+        if os.path.exists(self.csv_file) and os.path.getsize(self.csv_file) > 0:
+            with open(self.csv_file, 'r', newline='') as f:
+                header = next(csv.reader(f), None)
+
+        if header is None:
+            with open(self.csv_file, 'w', newline='') as f:
+                csv.writer(f).writerow(CSV_COLUMNS)
+        elif header != CSV_COLUMNS:
+            # One-time upgrade of a legacy file with mixed 4/6/8-column rows
+            self._write_file(read_attendance_csv(self.csv_file))
+            print(f"Upgraded {self.csv_file} to the {len(CSV_COLUMNS)}-column schema")
+
+        self._handle = open(self.csv_file, 'a', newline='', buffering=65536)
+        self._writer = csv.writer(self._handle)
+
+    def _row(self, record: Dict) -> list:
+        record = normalize_record(record)
+        return ['' if record[column] is None else record[column] for column in CSV_COLUMNS]
+
+    def _write_file(self, records: Iterable[Dict]):
+        """Write a complete file atomically. Caller must hold the lock."""
+        temp_file = f"{self.csv_file}.tmp"
+        with open(temp_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+            for record in records:
+                writer.writerow(self._row(record))
+        os.replace(temp_file, self.csv_file)
+
+    def initialize(self):
+        """Create the file with its header if needed."""
+        with self._lock:
+            self._open()
+
+    def append(self, record: Dict):
+        """Append one record."""
+        self.append_many([record])
+
+    def append_many(self, records: Iterable[Dict]) -> int:
+        """
+        Append records in one buffered write.
+
+        Args:
+            records: Attendance records in local or website format
+
+        Returns:
+            int: Number of rows written
+        """
+        rows = [self._row(record) for record in records]
+        if not rows:
+            return 0
+
+        with self._lock:
+            self._open()
+            self._writer.writerows(rows)
+            self._handle.flush()
+        return len(rows)
+
+    def rewrite(self, records: Iterable[Dict]) -> int:
+        """Replace the whole file with the given records."""
+        with self._lock:
+            self._close_handle()
+            count = 0
+
+            def counted():
+                nonlocal count
+                for record in records:
+                    count += 1
+                    yield record
+
+            self._write_file(counted())
+            return count
+
+    def _close_handle(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+            self._writer = None
+
+    def close(self):
+        """Flush and close the append handle."""
+        with self._lock:
+            self._close_handle()
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_attendance_writer(csv_file="attendance.csv") -> AttendanceCsvWriter:
+    """Get the shared writer for an attendance CSV file"""
+    path = os.path.abspath(csv_file)
+    writer = _writers.get(path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = AttendanceCsvWriter(csv_file)
+                _writers[path] = writer
+    return writer
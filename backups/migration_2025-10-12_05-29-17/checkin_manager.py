@@ -4,28 +4,49 @@ Check-in/Check-out Manager for QR Code Attendance System
 Handles check-in and check-out operations with time validation
 """
 
-import requests
 import json
 import time
 from datetime import datetime, timedelta
 import urllib3
 import pytz
-from settings import SettingsManager
+from settings_snapshot import get_settings
+from status_table import get_status_table, NOT_CHECKED_IN, CHECKED_IN, CHECKED_OUT
+from http_client import get_http_client
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# checkin_api.php failure messages that mean our local status is out of date
+STATUS_MISMATCH_MESSAGES = (
+    'Student already checked in. Please check out first.',
+    'No active check-in session found',
+)
+
 class CheckInManager:
     def __init__(self, base_url=None):
-        # Initialize settings manager
-        self.settings = SettingsManager()
-        
-        # Load configuration from settings
-        self.base_url = base_url or self.settings.get('website_url', 'http://localhost/qr_attendance/public')
-        self.checkin_api = f"{self.base_url}/api/checkin_api.php"
-        self.session = requests.Session()
-        self.session.verify = False
-        self.timezone = pytz.timezone(self.settings.get('timezone', 'Asia/Karachi'))
+        # Defaults to the 'website_url' setting, read at use time
+        self._base_url = base_url
+        self.http = get_http_client()
+        self.status_table = get_status_table()
+        # Set when the last request could not reach checkin_api.php (no
+        # connection, a timeout or a 5xx), as opposed to a rejection by its rules
+        self.server_unreachable = False
+    
+    @property
+    def settings(self):
+        return get_settings()
+
+    @property
+    def base_url(self):
+        return self._base_url or self.settings.get('website_url', 'http://localhost/qr_attendance/public')
+
+    @property
+    def checkin_api(self):
+        return f"{self.base_url}/api/checkin_api.php"
+
+    @property
+    def timezone(self):
+        return pytz.timezone(self.settings.get('timezone', 'Asia/Karachi'))
     
     def get_current_time(self):
         """Get current time in Asia/Karachi timezone."""
@@ -37,6 +58,16 @@ class CheckInManager:
             dt = self.get_current_time()
         return dt.strftime("%Y-%m-%d %H:%M:%S")
         
+    def _post(self, data):
+        """Post to checkin_api.php on the shared connection pool"""
+        try:
+            response = self.http.post(self.checkin_api, endpoint='checkin', json=data)
+        except Exception:
+            self.server_unreachable = True
+            raise
+        self.server_unreachable = response.status_code >= 500
+        return response
+        
     def check_in_student(self, student_id):
         """Check in a student"""
         try:
@@ -45,12 +76,13 @@ class CheckInManager:
                 'student_id': student_id
             }
             
-            response = self.session.post(self.checkin_api, json=data, timeout=10)
+            response = self._post(data)
             
             if response.status_code == 200:
                 result = response.json()
                 if result.get('success'):
                     print(f"+ Check-in successful for {student_id}")
+                    self.status_table.record_response('check_in', student_id)
                     return True, result.get('data', {})
                 else:
                     print(f"- Check-in failed: {result.get('message')}")
@@ -71,12 +103,13 @@ class CheckInManager:
                 'student_id': student_id
             }
             
-            response = self.session.post(self.checkin_api, json=data, timeout=10)
+            response = self._post(data)
             
             if response.status_code == 200:
                 result = response.json()
                 if result.get('success'):
                     print(f"+ Check-out successful for {student_id}")
+                    self.status_table.record_response('check_out', student_id)
                     return True, result.get('data', {})
                 else:
                     print(f"- Check-out failed: {result.get('message')}")
@@ -97,11 +130,12 @@ class CheckInManager:
                 'student_id': student_id
             }
             
-            response = self.session.post(self.checkin_api, json=data, timeout=10)
+            response = self._post(data)
             
             if response.status_code == 200:
                 result = response.json()
                 if result.get('success'):
+                    self.status_table.record_response('get_status', student_id, result.get('data', {}))
                     return True, result.get('data', {})
                 else:
                     return False, result.get('message', 'Unknown error')
@@ -111,54 +145,186 @@ class CheckInManager:
         except Exception as e:
             return False, str(e)
     
-    def process_qr_scan(self, student_id):
-        """Process QR code scan and determine appropriate action"""
+    def bulk_checkin(self, records, api_key=None):
+        """Record attendance rows with their own timestamps (bulk_checkin action)"""
         try:
-            # Import time validator for checkout validation
-            from time_validator import TimeValidator, validate_checkout_time
-            from roll_parser import parse_roll_number
+            data = {
+                'action': 'bulk_checkin',
+                'api_key': api_key or self.settings.get('api_key', 'attendance_2025_xyz789_secure'),
+                'attendance_data': records
+            }
             
-            # First, get current status
-            success, status_data = self.get_student_status(student_id)
+            response = self._post(data)
             
-            if not success:
-                print(f"- Failed to get status for {student_id}: {status_data}")
-                return False, status_data
+            if response.status_code == 200:
+                result = response.json()
+                if result.get('success'):
+                    return True, result.get('data', {})
+                else:
+                    return False, result.get('message', 'Unknown error')
+            else:
+                return False, f"HTTP Error: {response.status_code}"
+                
+        except Exception as e:
+            return False, str(e)
+    
+    def replay_offline(self, decision, api_key=None):
+        """
+        Record an offline decision at its original time (offline_replay action)
+        
+        Args:
+            decision (dict): Offline decision with 'student_id', 'action'
+                ('check_in' or 'check_out') and 'timestamp'
+        
+        Returns:
+            tuple: (True, data), or (False, {'reason', 'message'}) when the
+            server rejected the decision or could not be reached
+        """
+        try:
+            data = {
+                'action': 'offline_replay',
+                'api_key': api_key or self.settings.get('api_key', 'attendance_2025_xyz789_secure'),
+                'student_id': decision['student_id'],
+                'type': decision['action'],
+                'timestamp': decision['timestamp']
+            }
             
-            current_status = status_data.get('status', 'Unknown')
+            response = self._post(data)
             
-            if current_status == 'Not checked in':
-                # Student can check in
-                print(f"Student {student_id} is not checked in. Processing check-in...")
-                return self.check_in_student(student_id)
+            if response.status_code == 200:
+                result = response.json()
+                if result.get('success'):
+                    return True, result.get('data', {})
+                else:
+                    return False, {'reason': result.get('reason'), 'message': result.get('message', 'Unknown error')}
+            else:
+                return False, {'reason': 'http_error', 'message': f"HTTP Error: {response.status_code}"}
                 
-            elif current_status == 'Checked-in':
-                # Parse roll number to get shift information
-                roll_data = parse_roll_number(student_id)
-                if not roll_data['valid']:
-                    print(f"Invalid roll number: {roll_data['error']}")
-                    return False, f"Invalid roll number: {roll_data['error']}"
+        except Exception as e:
+            return False, {'reason': 'request_failed', 'message': str(e)}
+    
+    def get_active_sessions(self, api_key=None):
+        """Get open sessions and today's check-outs for all students in one call"""
+        try:
+            data = {
+                'action': 'active_sessions',
+                'api_key': api_key or self.settings.get('api_key', 'attendance_2025_xyz789_secure')
+            }
+            
+            response = self._post(data)
+            
+            if response.status_code == 200:
+                result = response.json()
+                if result.get('success'):
+                    return True, result.get('data', {})
+                else:
+                    return False, result.get('message', 'Unknown error')
+            else:
+                return False, f"HTTP Error: {response.status_code}"
                 
-                shift = roll_data['shift']
+        except Exception as e:
+            return False, str(e)
+    
+    def warm_up_status(self, student_ids):
+        """Pull today's status for a list of students into the local status table"""
+        # One bulk query instead of a get_status call per student
+        success, data = self.get_active_sessions()
+        if not success:
+            # Scans still ask the server on a student's first scan of the day
+            print(f"Status table warm-up skipped: {data}")
+            return 0
+        
+        checked_out = set(data.get('checked_out') or [])
+        active = {session.get('student_id') for session in data.get('active') or []}
+        statuses = {}
+        for student_id in student_ids:
+            if student_id in active:
+                statuses[student_id] = CHECKED_IN
+            elif student_id in checked_out:
+                statuses[student_id] = CHECKED_OUT
+            else:
+                statuses[student_id] = NOT_CHECKED_IN
+        
+        loaded = self.status_table.warm(statuses)
+        print(f"Status table warmed up for {loaded}/{len(student_ids)} students")
+        return loaded
+    
+    def process_qr_scan(self, student_id):
+        """Process QR code scan and determine appropriate action"""
+        try:
+            # Decide from the local status table; only ask the server when
+            # the student has not been seen today
+            current_status = self.status_table.get_status(student_id)
+            
+            if current_status is None:
+                success, status_data = self.get_student_status(student_id)
                 
-                # Validate checkout time based on shift
-                time_validator = TimeValidator()
-                checkout_validation = time_validator.validate_checkout_time(student_id, None, shift)
+                if not success:
+                    print(f"- Failed to get status for {student_id}: {status_data}")
+                    return False, status_data
                 
-                if checkout_validation['valid']:
-                    print(f"Student {student_id} can check out. Processing check-out...")
-                    return self.check_out_student(student_id)
-                else:
-                    print(f"Student {student_id} cannot check out: {checkout_validation['error']}")
-                    return False, checkout_validation['error']
-            else:
-                print(f"Student {student_id} has status: {current_status}")
-                return False, f"Invalid status: {current_status}"
+                current_status = status_data.get('status', 'Unknown')
+            
+            success, result = self._dispatch_scan(student_id, current_status)
+            
+            # The server disagrees with the local table: refresh and retry once
+            if not success and self._is_status_mismatch(result):
+                print(f"Status mismatch for {student_id}, refreshing from server...")
+                self.status_table.invalidate(student_id)
+                
+                success, status_data = self.get_student_status(student_id)
+                if not success:
+                    print(f"- Failed to get status for {student_id}: {status_data}")
+                    return False, status_data
+                
+                return self._dispatch_scan(student_id, status_data.get('status', 'Unknown'))
+            
+            return success, result
                 
         except Exception as e:
             print(f"- QR scan processing error: {e}")
             return False, str(e)
     
+    def _dispatch_scan(self, student_id, current_status):
+        """Check a student in or out based on their current status"""
+        # Import time validator for checkout validation
+        from time_validator import TimeValidator
+        from roll_cache import parse_roll_number
+        
+        if current_status in (NOT_CHECKED_IN, CHECKED_OUT):
+            # Student can check in
+            print(f"Student {student_id} is not checked in. Processing check-in...")
+            return self.check_in_student(student_id)
+            
+        elif current_status == CHECKED_IN:
+            # Parse roll number to get shift information
+            roll_data = parse_roll_number(student_id)
+            if not roll_data['valid']:
+                print(f"Invalid roll number: {roll_data['error']}")
+                return False, f"Invalid roll number: {roll_data['error']}"
+            
+            shift = roll_data['shift']
+            
+            # Validate checkout time based on shift
+            time_validator = TimeValidator()
+            checkout_validation = time_validator.validate_checkout_time(student_id, None, shift)
+            
+            if checkout_validation['valid']:
+                print(f"Student {student_id} can check out. Processing check-out...")
+                return self.check_out_student(student_id)
+            else:
+                print(f"Student {student_id} cannot check out: {checkout_validation['error']}")
+                return False, checkout_validation['error']
+        else:
+            print(f"Student {student_id} has status: {current_status}")
+            return False, f"Invalid status: {current_status}"
+    
+    def _is_status_mismatch(self, message):
+        """Check if a failure message means the server state differs from ours"""
+        if not isinstance(message, str):
+            return False
+        return message in STATUS_MISMATCH_MESSAGES
+    
     def simulate_attendance_flow(self, student_id):
         """Simulate a complete attendance flow for testing"""
         print(f"\n=== Simulating attendance flow for {student_id} ===")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Connectivity Monitor for QR Code Attendance System
+Probes internet and website reachability in the background and publishes
+a cached ONLINE/OFFLINE state so callers never wait on a probe
+"""
+
+import time
+import threading
+from settings_snapshot import get_settings
+
+ONLINE = 'ONLINE'
+OFFLINE = 'OFFLINE'
+
+
+class ConnectivityMonitor:
+    """Scheduled connectivity probe with exponential backoff while offline"""
+
+    def __init__(self, website_url=None, api_endpoint=None):
+        # Explicit arguments win; otherwise the settings are read at use time
+        self._website_url = website_url
+        self._api_endpoint = api_endpoint
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._internet = None
+        self._website = None
+        self._last_probe = None
+        self._backoff = self.min_backoff
+        self._listeners = []
+
+    @property
+    def website_url(self) -> str:
+        return self._website_url or get_settings().get('website_url', 'http://localhost/qr_attendance/public')
+
+    @property
+    def api_endpoint(self) -> str:
+        return self._api_endpoint or get_settings().get('api_endpoint_attendance', '/api/api_attendance.php')
+
+    @property
+    def internet_url(self) -> str:
+        return get_settings().get('connectivity_internet_url', 'https://www.google.com')
+
+    @property
+    def probe_interval(self) -> float:
+        return get_settings().get('connectivity_probe_interval_seconds', 30)
+
+    @property
+    def min_backoff(self) -> float:
+        return get_settings().get('connectivity_min_backoff_seconds', 5)
+
+    @property
+    def max_backoff(self) -> float:
+        return get_settings().get('connectivity_max_backoff_seconds', 300)
+
+    # ------------------------------------------------------------------
+    # Probing
+    # ------------------------------------------------------------------
+
+    def _probe_internet(self) -> bool:
+        """Check if internet connection is available."""
+        from http_client import get_http_client
+        try:
+            response = get_http_client().get(self.internet_url, endpoint='internet_probe', report=False)
+            return response.status_code == 200
+        except Exception:
+            return False
+
+    def _probe_website(self) -> bool:
+        """Check if the website is accessible."""
+        from http_client import get_http_client
+        client = get_http_client()
+        try:
+            # Try the main website first
+            response = client.get(self.website_url, endpoint='probe', report=False)
+            if response.status_code == 200:
+                return True
+
+            # Try the API endpoint directly
+            api_url = self.website_url + self.api_endpoint
+            response = client.get(api_url, endpoint='probe', report=False)
+            return response.status_code in [200, 404, 405]  # 404/405 means server is running but endpoint might not exist
+        except Exception:
+            return False
+
+    def probe(self):
+        """
+        Probe internet and website now and update the cached state.
+
+        Returns:
+            tuple: (internet online, website online)
+        """
+        website = self._probe_website()
+        # A reachable website implies a working network
+        internet = True if website else self._probe_internet()
+
+        self._set_state(internet=internet, website=website)
+        self._last_probe = time.time()
+        return internet, website
+
+    def _probe_loop(self):
+        while True:
+            try:
+                _, website = self.probe()
+            except Exception as e:
+                print(f"Connectivity probe error: {e}")
+                website = False
+
+            if website:
+                self._backoff = self.min_backoff
+                delay = self.probe_interval
+            else:
+                delay = self._backoff
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def start(self):
+        """Start background probing."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._probe_loop, daemon=True)
+            self._thread.start()
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def _set_state(self, internet=None, website=None):
+        """Update the cached state and notify listeners on a website state change."""
+        with self._lock:
+            was_online = self._website
+            if internet is not None:
+                self._internet = internet
+            if website is not None:
+                self._website = website
+            changed = website is not None and was_online is not None and was_online != website
+            listeners = list(self._listeners)
+
+        if changed:
+            print(f"Website connection is now {ONLINE if website else OFFLINE}")
+            for listener in listeners:
+                try:
+                    listener(website)
+                except Exception as e:
+                    print(f"Connectivity listener error: {e}")
+
+    def _ensure_state(self):
+        """Run one synchronous probe if nothing is known yet (startup only)."""
+        if self._website is None:
+            self.probe()
+
+    def is_internet_online(self) -> bool:
+        """Get the cached internet state."""
+        self._ensure_state()
+        return bool(self._internet)
+
+    def is_website_online(self) -> bool:
+        """Get the cached website state."""
+        self._ensure_state()
+        return bool(self._website)
+
+    def get_state(self) -> str:
+        """Get the cached website state as ONLINE or OFFLINE."""
+        return ONLINE if self.is_website_online() else OFFLINE
+
+    def report_success(self):
+        """Record that a real request to the website got a non-5xx response."""
+        if self._website is not True:
+            self._backoff = self.min_backoff
+            self._set_state(internet=True, website=True)
+
+    def report_failure(self):
+        """Record that a real request to the website failed, timed out or got a 5xx."""
+        if self._website is not False:
+            self._set_state(website=False)
+            # Restart the probe schedule so the backoff begins now
+            self._backoff = self.min_backoff
+            self._wake.set()
+
+    def add_listener(self, callback):
+        """
+        Register a callback for website state changes.
+
+        Args:
+            callback (callable): Called with True when the website comes
+            online and False when it goes offline
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def get_status(self):
+        """Get the cached connectivity status."""
+        return {
+            'internet': bool(self._internet),
+            'website': bool(self._website),
+            'state': ONLINE if self._website else OFFLINE,
+            'last_probe': self._last_probe,
+            'next_backoff_seconds': self._backoff
+        }
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_connectivity_monitor() -> ConnectivityMonitor:
+    """Get the process-wide connectivity monitor"""
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = ConnectivityMonitor()
+    return _monitor
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+HTTP Client for QR Code Attendance System
+Process-wide keep-alive connection pool shared by all website calls, with
+per-endpoint timeouts and connection reuse metrics
+"""
+
+import time
+import threading
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from settings_snapshot import get_settings, add_settings_listener
+from connectivity import get_connectivity_monitor
+
+# Disable SSL warnings
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Default timeouts in seconds per endpoint; override with the 'http_timeouts' setting
+DEFAULT_TIMEOUTS = {
+    'checkin': 10,
+    'attendance': 10,
+    'attendance_upload': 10,
+    'sync_log': 10,
+    'year_sync': 10,
+    'probe': 5,
+    'internet_probe': 3,
+    'default': 10,
+}
+
+
+def _build_timeouts(settings):
+    """Merge the 'http_timeouts' setting over the defaults (once per settings version)."""
+    timeouts = dict(DEFAULT_TIMEOUTS)
+    timeouts.update(settings.get('http_timeouts', {}) or {})
+    return timeouts
+
+
+class HttpClient:
+    """Shared requests session with pooled keep-alive connections"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoint_stats = {}
+
+        self.session = requests.Session()
+        self.session.verify = False
+        self.adapter = None
+        self.pool_size = None
+        self._mount_adapter(get_settings())
+
+        # Resize the pool when settings.json changes
+        add_settings_listener(self._mount_adapter)
+
+    def _mount_adapter(self, settings):
+        """Mount a connection pool sized by 'http_pool_maxsize' if the size changed."""
+        pool_size = settings.get('http_pool_maxsize', 10)
+        if pool_size == self.pool_size:
+            return
+        # Requests already running finish on the old pool
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.adapter = adapter
+        self.pool_size = pool_size
+
+    @property
+    def timeouts(self):
+        """Timeouts per endpoint from the current settings snapshot."""
+        return get_settings().derived('http_timeouts', _build_timeouts)
+
+    def get_timeout(self, endpoint: str) -> float:
+        """Get the timeout for an endpoint."""
+        timeouts = self.timeouts
+        return timeouts.get(endpoint, timeouts['default'])
+
+    def request(self, method, url, endpoint='default', timeout=None, report=True, **kwargs):
+        """
+        Make a request on the shared session.
+
+        Args:
+            method (str): HTTP method
+            url (str): Request URL
+            endpoint (str): Endpoint name for timeouts and metrics
+            timeout (float, optional): Overrides the endpoint timeout
+            report (bool): Report the outcome to the connectivity monitor
+                (connection errors, timeouts and 5xx responses count as failures)
+
+        Returns:
+            requests.Response: The response
+        """
+        timeout = timeout or self.get_timeout(endpoint)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            # Includes read timeouts: a website that accepts connections but
+            # hangs must go OFFLINE too, or every scan waits out the timeout
+            self._record(endpoint, time.perf_counter() - started, failed=True)
+            if report:
+                get_connectivity_monitor().report_failure()
+            raise
+
+        # A 5xx means the website is up but not serving; treat it as a failure
+        server_error = response.status_code >= 500
+        self._record(endpoint, time.perf_counter() - started, failed=server_error)
+        if report:
+            if server_error:
+                get_connectivity_monitor().report_failure()
+            else:
+                get_connectivity_monitor().report_success()
+        return response
+
+    def get(self, url, endpoint='default', **kwargs):
+        return self.request('GET', url, endpoint=endpoint, **kwargs)
+
+    def post(self, url, endpoint='default', **kwargs):
+        return self.request('POST', url, endpoint=endpoint, **kwargs)
+
+    def _record(self, endpoint, elapsed, failed=False):
+        with self._lock:
+            stats = self._endpoint_stats.setdefault(endpoint, {'requests': 0, 'failures': 0, 'total_seconds': 0.0})
+            stats['requests'] += 1
+            stats['total_seconds'] += elapsed
+            if failed:
+                stats['failures'] += 1
+
+    def get_metrics(self):
+        """
+        Get request and connection reuse metrics.
+
+        Returns:
+            Dict: Totals, connections opened vs reused, and per-endpoint stats
+        """
+        connections_opened = 0
+        pool_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections_opened += pool.num_connections
+            pool_requests += pool.num_requests
+
+        with self._lock:
+            endpoints = {
+                name: {
+                    'requests': stats['requests'],
+                    'failures': stats['failures'],
+                    'avg_ms': round(stats['total_seconds'] / stats['requests'] * 1000, 1) if stats['requests'] else 0
+                }
+                for name, stats in self._endpoint_stats.items()
+            }
+
+        reused = max(0, pool_requests - connections_opened)
+        return {
+            'requests': sum(stats['requests'] for stats in endpoints.values()),
+            'connections_opened': connections_opened,
+            'connections_reused': reused,
+            'reuse_ratio': round(reused / pool_requests, 3) if pool_requests else 0,
+            'endpoints': endpoints
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Get the process-wide HTTP client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Journal Uploader for QR Code Attendance System
+Drains the offline scan journal to the website in chunks, committing the
+journal cursor after every acknowledged chunk
+"""
+
+import hashlib
+from typing import Dict, Optional
+from settings_snapshot import get_settings
+from attendance_store import record_key
+from http_client import get_http_client
+
+# Matches MAX_SYNC_RECORDS in the website's config.php
+DEFAULT_MAX_SYNC_RECORDS = 1000
+
+
+def upload_journal(journal, url: str, api_key: str, chunk_size: Optional[int] = None,
+                   max_chunks: Optional[int] = None) -> Dict:
+    """
+    Upload pending journal records in chunks.
+
+    Each record carries an 'idempotency_key' (a hash of its student,
+    timestamp and status) and each chunk an Idempotency-Key header, so a
+    chunk that is re-sent after a lost response cannot create duplicate
+    rows. The journal cursor is acknowledged after every successful chunk;
+    on failure the upload stops and the next call resumes from the cursor.
+
+    Args:
+        journal (ScanJournal): Journal to drain
+        url (str): Attendance upload URL
+        api_key (str): Website API key
+        chunk_size (int, optional): Records per request. Defaults to the
+            'max_sync_records' setting (the server's MAX_SYNC_RECORDS)
+        max_chunks (int, optional): Stop after this many chunks
+
+    Returns:
+        Dict: 'success', 'uploaded', 'chunks', 'remaining' and 'error'
+    """
+    if chunk_size is None:
+        chunk_size = get_settings().get('max_sync_records', DEFAULT_MAX_SYNC_RECORDS)
+    client = get_http_client()
+
+    uploaded = 0
+    chunks = 0
+    error = None
+
+    while max_chunks is None or chunks < max_chunks:
+        entries = journal.read_pending(limit=chunk_size)
+        if not entries:
+            break
+
+        records = []
+        for _, record in entries:
+            record = dict(record)
+            record.setdefault('idempotency_key', record_key(record))
+            records.append(record)
+
+        batch_key = hashlib.sha1(
+            ''.join(record['idempotency_key'] for record in records).encode('utf-8')
+        ).hexdigest()
+
+        try:
+            response = client.post(
+                url,
+                endpoint='attendance_upload',
+                json={'api_key': api_key, 'attendance_data': records},
+                headers={'Idempotency-Key': batch_key}
+            )
+        except Exception as e:
+            error = str(e)
+            break
+
+        if response.status_code != 200:
+            error = f"{response.status_code} - {response.text[:200]}"
+            break
+
+        # Commit this chunk before sending the next one
+        journal.ack(entries[-1][0])
+        uploaded += len(records)
+        chunks += 1
+
+    return {
+        'success': error is None,
+        'uploaded': uploaded,
+        'chunks': chunks,
+        'remaining': journal.pending_count(),
+        'error': error
+    }
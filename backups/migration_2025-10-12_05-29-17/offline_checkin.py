@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Offline Check-in for QR Code Attendance System
+Decides check-in/check-out locally when checkin_api.php cannot be reached,
+journals every decision, and replays the journal to checkin_api.php with
+the original timestamps once the website is back, reporting conflicts
+"""
+
+import json
+import time
+import uuid
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import pytz
+from settings_snapshot import get_settings
+from attendance_store import get_attendance_store
+from scan_journal import get_scan_journal
+from status_table import get_status_table, NOT_CHECKED_IN, CHECKED_IN, CHECKED_OUT
+from time_validator import TimeValidator
+from roll_cache import parse_roll_number
+
+DECISIONS_FILE = "offline_decisions.jsonl"
+CONFLICTS_FILE = "offline_conflicts.jsonl"
+
+# Reconciliation outcomes
+REPLAYED = 'replayed'    # recorded by the offline_replay action at its original time
+REJECTED = 'rejected'    # refused by the server's rules; logged as a conflict
+
+# offline_replay reasons that are rulings on the decision itself; any other
+# failure (bad API key, malformed request, server error) is retried later
+CONFLICT_REASONS = (
+    'already_checked_in', 'no_active_session', 'session_left_open', 'checkout_before_checkin',
+    'outside_window', 'unknown_student', 'graduated', 'invalid_timestamp',
+)
+
+# Local record status for each decided action (as checkin_api.php reports it)
+ACTION_STATUS = {
+    'check_in': 'Check-in',
+    'check_out': 'Present',
+}
+
+
+class ReplayDeferred(Exception):
+    """checkin_api.php did not rule on a decision (unreachable, server error, bad API key)"""
+
+
+class OfflineCheckIn:
+    """Local check-in decisions with later reconciliation"""
+
+    def __init__(self, store=None, decisions_file=DECISIONS_FILE, conflicts_file=CONFLICTS_FILE,
+                 timezone=None):
+        # Defaults to the 'timezone' setting, read at use time
+        self._timezone = timezone
+        self.store = store or get_attendance_store()
+        self.status_table = get_status_table()
+        self.journal = get_scan_journal(decisions_file, legacy_file=None)
+        self.conflicts_file = conflicts_file
+
+        # Decisions read and update the status table, so one at a time
+        self._decide_lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self._last_result = None
+
+    @property
+    def timezone(self):
+        return pytz.timezone(self._timezone or get_settings().get('timezone', 'Asia/Karachi'))
+
+    @property
+    def validator(self) -> TimeValidator:
+        # The timetable is compiled once per settings version, so this is cheap
+        return TimeValidator(self.timezone.zone)
+
+    def now(self) -> datetime:
+        return datetime.now(self.timezone)
+
+    # ------------------------------------------------------------------
+    # Local decisions
+    # ------------------------------------------------------------------
+
+    def local_status(self, student_id: str, date: str) -> str:
+        """
+        Get a student's status for a day from the status table, or from the
+        day's local records when the student has not been seen since start-up.
+        """
+        status = self.status_table.get_status(student_id)
+        if status is not None:
+            return status
+
+        status = NOT_CHECKED_IN
+        for record in self.store.get_records(student_id=student_id, date=date):
+            if record['Status'] == ACTION_STATUS['check_in']:
+                status = CHECKED_IN
+            elif record['Status'] == ACTION_STATUS['check_out']:
+                status = CHECKED_OUT
+        return status
+
+    def decide(self, student_id: str, current_time: Optional[datetime] = None,
+               student_name: Optional[str] = None) -> Tuple[bool, object]:
+        """
+        Check a student in or out locally with checkin_api.php's rules.
+
+        A student who is not checked in (or already checked out) is checked
+        in if the shift's check-in window is open; a checked-in student is
+        checked out if the check-out window is open. Accepted decisions are
+        journaled for reconciliation and applied to the status table.
+
+        Args:
+            student_id (str): Student ID
+            current_time (datetime, optional): Scan time. Defaults to now.
+            student_name (str, optional): Name sent with uploaded records
+
+        Returns:
+            tuple: (True, data) like a successful API call, with data
+            'status', 'decision_id' and 'offline'; or (False, error message)
+        """
+        current_time = current_time or self.now()
+        roll_data = parse_roll_number(student_id)
+        if not roll_data['valid']:
+            return False, f"Invalid roll number: {roll_data['error']}"
+        shift = roll_data['shift']
+
+        with self._decide_lock:
+            status = self.local_status(student_id, current_time.strftime('%Y-%m-%d'))
+            if status in (NOT_CHECKED_IN, CHECKED_OUT):
+                action, new_status = 'check_in', CHECKED_IN
+                validation = self.validator.validate_checkin_time(student_id, current_time, shift)
+            elif status == CHECKED_IN:
+                action, new_status = 'check_out', CHECKED_OUT
+                validation = self.validator.validate_checkout_time(student_id, current_time, shift)
+            else:
+                return False, f"Invalid status: {status}"
+
+            if not validation['valid']:
+                return False, validation['error']
+
+            decision = {
+                'decision_id': uuid.uuid4().hex,
+                'action': action,
+                'student_id': student_id,
+                'student_name': student_name,
+                'timestamp': current_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'status': ACTION_STATUS[action],
+                'shift': shift,
+                'program': roll_data['program'],
+                'current_year': roll_data['current_year'],
+                'admission_year': roll_data['admission_year'],
+                'decided_at': time.time()
+            }
+            if not self.journal.append(decision):
+                return False, "Could not journal the offline decision"
+            self.status_table.set_status(student_id, new_status)
+
+        print(f"[OFFLINE] {action.replace('_', '-')} accepted locally for {student_id}")
+        return True, {
+            'student_id': student_id,
+            'status': decision['status'],
+            'decision_id': decision['decision_id'],
+            'offline': True
+        }
+
+    def pending_count(self) -> int:
+        """Get the number of decisions not reconciled yet."""
+        return self.journal.pending_count()
+
+    # ------------------------------------------------------------------
+    # Reconciliation
+    # ------------------------------------------------------------------
+
+    def _reconcile_one(self, manager, decision: Dict) -> Tuple[str, Optional[Dict]]:
+        """
+        Reconcile one decision through checkin_api.php's offline_replay action.
+
+        The server applies its check_in/check_out rules at the decision's
+        original timestamp and opens or closes the check-in session, so a
+        check-in and check-out decided offline end up as one Present row
+        with its check-out time, as a live pair would. A rejection by the
+        server's rules (CONFLICT_REASONS, e.g. the server already has an
+        active check-in) is returned as a conflict and the server's state is
+        kept.
+
+        Returns:
+            tuple: (outcome, conflict or None)
+
+        Raises:
+            ReplayDeferred: If the server did not rule on the decision
+        """
+        success, result = manager.replay_offline(decision)
+        if success:
+            return REPLAYED, None
+        if manager.server_unreachable or result.get('reason') not in CONFLICT_REASONS:
+            raise ReplayDeferred(f"{result.get('reason') or 'error'}: {result.get('message')}")
+
+        return REJECTED, {
+            'decision_id': decision['decision_id'],
+            'student_id': decision['student_id'],
+            'action': decision['action'],
+            'timestamp': decision['timestamp'],
+            'type': result.get('reason') or 'rejected',
+            'message': result.get('message'),
+            'resolution': 'kept server state, removed local record',
+            'reconciled_at': self.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def _record_conflict(self, conflict: Dict):
+        """Append a conflict to the conflicts log."""
+        with open(self.conflicts_file, 'a') as f:
+            f.write(json.dumps(conflict, default=str) + '\n')
+        print(f"Reconciliation conflict for {conflict['student_id']} ({conflict['action']} at "
+              f"{conflict['timestamp']}): {conflict['type']} - {conflict['message']}")
+
+    def reconcile(self, manager=None) -> Dict:
+        """
+        Reconcile journaled decisions with checkin_api.php, oldest first.
+
+        Decisions are replayed in the order they were made, so a student's
+        offline check-in reaches the server before its check-out. Each
+        decision is acknowledged once the server has ruled on it, so an
+        interrupted run resumes where it stopped; a decision the server did
+        not rule on stops the run and is retried next time. The local record
+        of a rejected decision is removed so local counts match the server.
+        Reconciled students are dropped from the status table so their next
+        scan asks the server.
+
+        Args:
+            manager (CheckInManager, optional): Defaults to a new manager
+
+        Returns:
+            Dict: 'success', counts of 'replayed' and 'rejected' decisions,
+            'conflicts', 'remaining' and 'error'
+        """
+        if not self._reconcile_lock.acquire(blocking=False):
+            return {'success': False, REPLAYED: 0, REJECTED: 0, 'conflicts': [],
+                    'remaining': self.pending_count(), 'error': 'Reconciliation already running'}
+
+        try:
+            if manager is None:
+                from checkin_manager import CheckInManager
+                manager = CheckInManager()
+
+            counts = {REPLAYED: 0, REJECTED: 0}
+            conflicts = []
+            error = None
+
+            for offset, decision in self.journal.read_pending():
+                try:
+                    outcome, conflict = self._reconcile_one(manager, decision)
+                except ReplayDeferred as e:
+                    error = str(e)
+                    break
+                if conflict:
+                    self._record_conflict(conflict)
+                    conflicts.append(conflict)
+                    self.store.remove_records([{
+                        'ID': decision['student_id'],
+                        'Timestamp': decision['timestamp'],
+                        'Status': decision['status']
+                    }])
+                counts[outcome] += 1
+                self.journal.ack(offset)
+                self.status_table.invalidate(decision['student_id'])
+
+            result = dict(counts, success=error is None, conflicts=conflicts,
+                          remaining=self.pending_count(), error=error)
+            self._last_result = result
+            return result
+        finally:
+            self._reconcile_lock.release()
+
+    def read_conflicts(self, limit: Optional[int] = None) -> List[Dict]:
+        """Get logged conflicts, newest last."""
+        try:
+            with open(self.conflicts_file, 'r') as f:
+                conflicts = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError):
+            return []
+        return conflicts[-limit:] if limit else conflicts
+
+    def get_status(self) -> Dict:
+        """Get pending decisions and the last reconciliation result."""
+        return {
+            'pending': self.pending_count(),
+            'last_result': self._last_result
+        }
+
+
+_offline_checkin = None
+_offline_checkin_lock = threading.Lock()
+
+
+def get_offline_checkin() -> OfflineCheckIn:
+    """Get the process-wide offline check-in engine"""
+    global _offline_checkin
+    if _offline_checkin is None:
+        with _offline_checkin_lock:
+            if _offline_checkin is None:
+                _offline_checkin = OfflineCheckIn()
+    return _offline_checkin
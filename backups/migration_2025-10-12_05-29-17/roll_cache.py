@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Roll Number Cache for QR Code Attendance System
+Memoized and batch wrappers around roll_parser.parse_roll_number
+"""
+
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List
+import numpy as np
+import pytz
+import roll_parser
+from settings_snapshot import get_settings, add_settings_listener
+
+ROLL_CACHE_SIZE = get_settings().get('roll_cache_size', 4096)
+
+# Parsed results include the current academic year, so the cache is
+# cleared whenever the date (in the configured timezone) changes
+_cache_day = None
+_cache_lock = threading.Lock()
+
+
+def _parse_uncached(roll_number: str) -> Dict:
+    return roll_parser.parse_roll_number(roll_number)
+
+
+_parse_cached = lru_cache(maxsize=ROLL_CACHE_SIZE)(_parse_uncached)
+
+
+def _resize_cache(snapshot):
+    """Rebuild the cache when 'roll_cache_size' changes on a settings reload."""
+    global _parse_cached, ROLL_CACHE_SIZE
+    size = snapshot.get('roll_cache_size', 4096)
+    if size != ROLL_CACHE_SIZE:
+        with _cache_lock:
+            _parse_cached = lru_cache(maxsize=size)(_parse_uncached)
+            ROLL_CACHE_SIZE = size
+
+
+add_settings_listener(_resize_cache)
+
+
+def _check_day():
+    global _cache_day
+    today = datetime.now(pytz.timezone(get_settings().get('timezone', 'Asia/Karachi'))).date()
+    if _cache_day != today:
+        with _cache_lock:
+            if _cache_day != today:
+                _parse_cached.cache_clear()
+                _cache_day = today
+
+
+def parse_roll_number(roll_number: str) -> Dict:
+    """
+    Parse a roll number through a bounded LRU cache.
+
+    Args:
+        roll_number (str): Roll number to parse (e.g., "25-SWT-01")
+
+    Returns:
+        Dict: Same result as roll_parser.parse_roll_number (a copy, safe to modify)
+    """
+    _check_day()
+    return dict(_parse_cached(roll_number))
+
+
+def get_shift(roll_number: str) -> str:
+    """Extract shift from roll number, defaulting to Morning like roll_parser.get_shift"""
+    roll_data = parse_roll_number(roll_number)
+    if not roll_data['valid']:
+        return 'Morning'
+    return roll_data['shift']
+
+
+def cache_info():
+    """Get LRU cache statistics"""
+    return _parse_cached.cache_info()
+
+
+def clear_cache():
+    """Drop all cached parse results"""
+    _parse_cached.cache_clear()
+
+
+class ParsedRoster:
+    """Columnar parse results for a list of roll numbers"""
+
+    def __init__(self, roll_numbers: List[str], valid, shift_codes, shift_names,
+                 program_codes, program_names, admission_year, sequence):
+        self.roll_numbers = np.array(roll_numbers, dtype=object)
+        self.valid = valid
+        self.shift_codes = shift_codes
+        self.shift_names = shift_names
+        self.program_codes = program_codes
+        self.program_names = program_names
+        self.admission_year = admission_year
+        self.sequence = sequence
+
+    def __len__(self):
+        return len(self.roll_numbers)
+
+    def shift_code(self, shift: str) -> int:
+        """Get the code of a shift name, or -1 if no roll number has it."""
+        for code, name in enumerate(self.shift_names):
+            if name.lower() == shift.lower():
+                return code
+        return -1
+
+    def mask_for_shift(self, shift: str):
+        """Boolean mask of valid roll numbers in a shift."""
+        return self.valid & (self.shift_codes == self.shift_code(shift))
+
+    def students_in_shift(self, shift: str) -> List[str]:
+        """Roll numbers in a shift."""
+        return list(self.roll_numbers[self.mask_for_shift(shift)])
+
+    @property
+    def shift(self):
+        """Shift name per roll number (None when invalid)."""
+        names = np.array(list(self.shift_names) + [None], dtype=object)
+        return names[self.shift_codes]
+
+    @property
+    def program(self):
+        """Program code per roll number (None when invalid)."""
+        names = np.array(list(self.program_names) + [None], dtype=object)
+        return names[self.program_codes]
+
+    def to_dict(self) -> Dict:
+        """Columns as plain lists."""
+        return {
+            'roll_number': list(self.roll_numbers),
+            'valid': self.valid.tolist(),
+            'shift': list(self.shift),
+            'program': list(self.program),
+            'admission_year': self.admission_year.tolist(),
+            'sequence': self.sequence.tolist()
+        }
+
+
+def parse_roll_numbers(roll_numbers: Iterable[str]):
+    """
+    Parse many roll numbers at once.
+
+    Each distinct roll number is parsed once (through the LRU cache) and the
+    results are returned as compact columns. Invalid roll numbers get
+    valid=False, shift/program code -1 and year/sequence 0.
+
+    Args:
+        roll_numbers: List of roll numbers, or a pandas Series
+
+    Returns:
+        ParsedRoster, or a pandas DataFrame (same index) when given a Series
+    """
+    # A pandas Series carries an index to preserve; plain sequences do not
+    index = getattr(roll_numbers, 'index', None)
+    if callable(index):
+        index = None
+    roll_numbers = [str(roll_number) for roll_number in roll_numbers]
+    count = len(roll_numbers)
+
+    valid = np.zeros(count, dtype=bool)
+    shift_codes = np.full(count, -1, dtype=np.int8)
+    program_codes = np.full(count, -1, dtype=np.int16)
+    admission_year = np.zeros(count, dtype=np.int16)
+    sequence = np.zeros(count, dtype=np.int16)
+
+    shift_names, shift_lookup = [], {}
+    program_names, program_lookup = [], {}
+    parsed = {}
+
+    _check_day()
+    for i, roll_number in enumerate(roll_numbers):
+        roll_data = parsed.get(roll_number)
+        if roll_data is None:
+            roll_data = _parse_cached(roll_number)
+            parsed[roll_number] = roll_data
+        if not roll_data['valid']:
+            continue
+
+        valid[i] = True
+        shift = roll_data['shift']
+        if shift not in shift_lookup:
+            shift_lookup[shift] = len(shift_names)
+            shift_names.append(shift)
+        shift_codes[i] = shift_lookup[shift]
+
+        program = roll_data['program']
+        if program not in program_lookup:
+            program_lookup[program] = len(program_names)
+            program_names.append(program)
+        program_codes[i] = program_lookup[program]
+
+        admission_year[i] = roll_data['admission_year']
+        sequence[i] = roll_data['sequence_number']
+
+    roster = ParsedRoster(roll_numbers, valid, shift_codes, tuple(shift_names),
+                          program_codes, tuple(program_names), admission_year, sequence)
+
+    if index is not None:
+        import pandas as pd
+        return pd.DataFrame({
+            'roll_number': roster.roll_numbers,
+            'valid': roster.valid,
+            'shift': pd.Categorical.from_codes(roster.shift_codes, roster.shift_names),
+            'program': pd.Categorical.from_codes(roster.program_codes, roster.program_names),
+            'admission_year': roster.admission_year,
+            'sequence': roster.sequence
+        }, index=index)
+
+    return roster
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Scan Journal for QR Code Attendance System
+Append-only JSONL journal for offline scans with a consumer cursor
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+from settings_snapshot import get_settings
+
+# fsync policies
+FSYNC_ALWAYS = 'always'   # fsync after every append
+FSYNC_GROUP = 'group'     # fsync every N records or T milliseconds
+FSYNC_NONE = 'none'       # leave flushing to the operating system
+
+
+class ScanJournal:
+    """Append-only journal of offline attendance records"""
+
+    def __init__(self, journal_file="offline_journal.jsonl", legacy_file="offline_data.json",
+                 fsync_policy=None, group_commit_records=None, group_commit_ms=None):
+        self.journal_file = journal_file
+        self.cursor_file = f"{journal_file}.cursor"
+        self.legacy_file = legacy_file
+        # Explicit arguments win; otherwise the settings are read at use time
+        self._fsync_policy = fsync_policy
+        self._group_commit_records = group_commit_records
+        self._group_commit_ms = group_commit_ms
+
+        self._lock = threading.RLock()
+        self._handle = None
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+        self._fsync_timer = None
+        self._listeners = []
+
+        self._cursor = self._read_cursor()
+        self._pending = self._count_records(self._cursor, None)
+        self._import_legacy_file()
+
+    @property
+    def fsync_policy(self) -> str:
+        return self._fsync_policy or get_settings().get('journal_fsync_policy', FSYNC_GROUP)
+
+    @property
+    def group_commit_records(self) -> int:
+        return self._group_commit_records or get_settings().get('journal_group_commit_records', 20)
+
+    @property
+    def group_commit_ms(self) -> float:
+        return self._group_commit_ms or get_settings().get('journal_group_commit_ms', 1000)
+
+    # ------------------------------------------------------------------
+    # Cursor
+    # ------------------------------------------------------------------
+
+    def _read_cursor(self) -> int:
+        """Load the acknowledged byte offset."""
+        try:
+            with open(self.cursor_file, 'r') as f:
+                offset = int(json.load(f).get('offset', 0))
+        except (OSError, ValueError, AttributeError):
+            offset = 0
+
+        # A cursor past the end means the journal was truncated behind our back
+        if offset > self._file_size():
+            offset = 0
+        return offset
+
+    def _write_cursor(self, offset: int):
+        """Persist the acknowledged byte offset atomically."""
+        temp_file = f"{self.cursor_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump({'offset': offset, 'updated_at': time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.cursor_file)
+
+    def _file_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_file)
+        except OSError:
+            return 0
+
+    def _count_records(self, start: int, end: Optional[int]) -> int:
+        """Count complete records between two byte offsets."""
+        count = 0
+        try:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(start)
+                remaining = None if end is None else end - start
+                while remaining is None or remaining > 0:
+                    size = 65536 if remaining is None else min(65536, remaining)
+                    chunk = f.read(size)
+                    if not chunk:
+                        break
+                    count += chunk.count(b'\n')
+                    if remaining is not None:
+                        remaining -= len(chunk)
+        except OSError:
+            pass
+        return count
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def _get_handle(self):
+        if self._handle is None:
+            self._handle = open(self.journal_file, 'ab')
+        return self._handle
+
+    def append(self, record: Dict) -> bool:
+        """Append one record to the journal."""
+        return self.append_many([record])
+
+    def append_many(self, records: List[Dict]) -> bool:
+        """Append records to the journal in one write."""
+        if not records:
+            return True
+
+        data = b''.join(
+            json.dumps(record, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
+            for record in records
+        )
+
+        try:
+            with self._lock:
+                handle = self._get_handle()
+                handle.write(data)
+                handle.flush()
+                self._pending += len(records)
+                self._unsynced += len(records)
+                self._commit()
+                listeners = list(self._listeners)
+        except Exception as e:
+            print(f"Error writing scan journal: {e}")
+            return False
+
+        for listener in listeners:
+            try:
+                listener(len(records))
+            except Exception as e:
+                print(f"Journal listener error: {e}")
+        return True
+
+    def add_listener(self, callback):
+        """
+        Register a callback for new records.
+
+        Args:
+            callback (callable): Called with the number of records appended
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _commit(self):
+        """Apply the fsync policy after a write. Caller must hold the lock."""
+        if self.fsync_policy == FSYNC_ALWAYS:
+            self.sync()
+        elif self.fsync_policy == FSYNC_GROUP:
+            elapsed_ms = (time.monotonic() - self._last_fsync) * 1000
+            if self._unsynced >= self.group_commit_records or elapsed_ms >= self.group_commit_ms:
+                self.sync()
+            elif self._fsync_timer is None:
+                # Bound the time a record can sit in the page cache
+                self._fsync_timer = threading.Timer(self.group_commit_ms / 1000, self.sync)
+                self._fsync_timer.daemon = True
+                self._fsync_timer.start()
+
+    def sync(self):
+        """Force appended records to disk."""
+        with self._lock:
+            if self._fsync_timer is not None:
+                self._fsync_timer.cancel()
+                self._fsync_timer = None
+            if self._handle is not None and self._unsynced:
+                os.fsync(self._handle.fileno())
+            self._unsynced = 0
+            self._last_fsync = time.monotonic()
+
+    def close(self):
+        """Sync and close the journal file."""
+        with self._lock:
+            self.sync()
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def read_pending(self, limit: Optional[int] = None) -> List[Tuple[int, Dict]]:
+        """
+        Read records that have not been acknowledged yet.
+
+        Args:
+            limit (int, optional): Maximum number of records to return
+
+        Returns:
+            List[Tuple[int, Dict]]: (end offset, record) pairs; pass an end
+            offset to ack() once that record and all before it are uploaded
+        """
+        entries = []
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+            offset = self._cursor
+
+            try:
+                with open(self.journal_file, 'rb') as f:
+                    f.seek(offset)
+                    for line in f:
+                        # A line without newline is a torn write still in progress
+                        if not line.endswith(b'\n'):
+                            break
+                        offset += len(line)
+                        try:
+                            entries.append((offset, json.loads(line)))
+                        except ValueError:
+                            print(f"Skipping corrupt journal record at offset {offset - len(line)}")
+                            continue
+                        if limit is not None and len(entries) >= limit:
+                            break
+            except OSError:
+                pass
+
+        return entries
+
+    def ack(self, offset: int):
+        """
+        Acknowledge all records up to a byte offset.
+
+        Args:
+            offset (int): End offset returned by read_pending()
+        """
+        with self._lock:
+            if offset <= self._cursor:
+                return
+
+            self._pending = max(0, self._pending - self._count_records(self._cursor, offset))
+            self._cursor = offset
+
+            # Once everything is acknowledged the journal can be reset in O(1)
+            if self._cursor >= self._file_size():
+                if self._handle is not None:
+                    self._handle.truncate(0)
+                else:
+                    open(self.journal_file, 'wb').close()
+                self._cursor = 0
+                self._pending = 0
+
+            self._write_cursor(self._cursor)
+
+    def pending_count(self) -> int:
+        """Get the number of records waiting to be uploaded."""
+        return self._pending
+
+    # ------------------------------------------------------------------
+    # Migration
+    # ------------------------------------------------------------------
+
+    def _import_legacy_file(self):
+        """Move records from the old offline_data.json into the journal."""
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+
+        try:
+            with open(self.legacy_file, 'r') as f:
+                legacy_data = json.load(f)
+            if isinstance(legacy_data, dict):
+                legacy_data = [legacy_data]
+
+            if self.append_many(legacy_data):
+                self.sync()
+                os.replace(self.legacy_file, f"{self.legacy_file}.migrated")
+                print(f"Moved {len(legacy_data)} offline records into {self.journal_file}")
+        except Exception as e:
+            print(f"Error importing {self.legacy_file}: {e}")
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_scan_journal(journal_file="offline_journal.jsonl", legacy_file="offline_data.json") -> ScanJournal:
+    """Get the shared scan journal for a journal file (legacy_file=None skips the offline_data.json import)"""
+    path = os.path.abspath(journal_file)
+    journal = _journals.get(path)
+    if journal is None:
+        with _journals_lock:
+            journal = _journals.get(path)
+            if journal is None:
+                journal = ScanJournal(journal_file, legacy_file=legacy_file)
+                _journals[path] = journal
+    return journal
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Scan Pipeline for QR Code Attendance System
+Completes server calls for accepted scans on a bounded pool of worker
+threads so the scanner input loop never waits on the network
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from settings_snapshot import get_settings, add_settings_listener
+
+
+class ScanPipeline:
+    """Bounded background pipeline for completing scans"""
+
+    def __init__(self, max_workers=None, max_pending=None):
+        # Default to the 'scan_pipeline_workers' and 'scan_pipeline_max_pending'
+        # settings, read at use time
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._last_futures = {}
+        self._pending = 0
+        self._executor = None
+        self._slots = None
+        self.workers = None
+        self.pending_limit = None
+        self._resize(get_settings())
+
+        # Resize the pool when settings.json changes
+        add_settings_listener(self._resize)
+
+    @property
+    def settings(self):
+        return get_settings()
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers or self.settings.get('scan_pipeline_workers', 4)
+
+    @property
+    def max_pending(self) -> int:
+        return self._max_pending or self.settings.get('scan_pipeline_max_pending', 100)
+
+    def _resize(self, settings):
+        """Start a new worker pool if the worker or pending limits changed."""
+        workers = self._max_workers or settings.get('scan_pipeline_workers', 4)
+        pending_limit = self._max_pending or settings.get('scan_pipeline_max_pending', 100)
+        with self._lock:
+            if (workers, pending_limit) == (self.workers, self.pending_limit):
+                return
+            previous = self._executor
+            # Scans already queued finish on the old pool and release its slots
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan')
+            self._slots = threading.BoundedSemaphore(pending_limit)
+            self.workers = workers
+            self.pending_limit = pending_limit
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def submit(self, student_id, task, *args, **kwargs):
+        """
+        Run a task for a student in the background.
+
+        Blocks only when max_pending scans are already in flight. Tasks for
+        the same student run one after another in submission order.
+
+        Args:
+            student_id (str): Student ID the task belongs to
+            task (callable): Function to run
+            *args, **kwargs: Arguments for the task
+
+        Returns:
+            Future: Future for the task result
+        """
+        slots = self._slots
+        slots.acquire()
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(task(*args, **kwargs))
+            except Exception as e:
+                print(f"- Background scan error for {student_id}: {e}")
+                future.set_result(False)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                slots.release()
+
+        def start(_previous=None):
+            while True:
+                executor = self._executor
+                try:
+                    executor.submit(run)
+                    return
+                except RuntimeError:
+                    # The pool was replaced by a settings change meanwhile
+                    if executor is self._executor:
+                        raise
+
+        with self._lock:
+            self._pending += 1
+            previous = self._last_futures.get(student_id)
+            self._last_futures[student_id] = future
+
+        # Keep a student's scans in order (e.g. check-in before check-out)
+        # without holding a worker while the earlier scan finishes
+        if previous is None:
+            start()
+        else:
+            previous.add_done_callback(start)
+
+        future.add_done_callback(lambda done: self._forget(student_id, done))
+        return future
+
+    def _forget(self, student_id, future):
+        """Drop the ordering entry for a student once their last scan is done."""
+        with self._lock:
+            if self._last_futures.get(student_id) is future:
+                del self._last_futures[student_id]
+
+    def pending_count(self):
+        """Get the number of scans still being completed."""
+        with self._lock:
+            return self._pending
+
+    def shutdown(self, wait=True):
+        """Stop accepting scans and optionally wait for in-flight ones."""
+        if wait:
+            with self._lock:
+                futures = list(self._last_futures.values())
+            for future in futures:
+                future.result()
+        self._executor.shutdown(wait=wait)
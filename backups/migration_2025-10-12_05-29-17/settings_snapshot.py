@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Settings Snapshot for QR Code Attendance System
+One process-wide, read-only view of the settings, loaded at startup and
+swapped atomically when settings.json changes
+"""
+
+import os
+import time
+import threading
+from typing import Any, Callable
+from settings import SettingsManager
+
+SETTINGS_FILE = "settings.json"
+
+
+class SettingsSnapshot:
+    """Immutable settings view with memoized lookups and derived values"""
+
+    def __init__(self, manager, version: int = 1):
+        self._manager = manager
+        self.version = version
+        self.loaded_at = time.time()
+        self._lock = threading.Lock()
+        self._values = {}
+        self._derived = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get a setting value.
+
+        Lookups are memoized; the underlying manager is never modified after
+        the snapshot is created, so repeated reads do no settings I/O.
+        """
+        try:
+            value = self._values[key]
+        except KeyError:
+            value = self._manager.get(key, None)
+            with self._lock:
+                self._values[key] = value
+        return default if value is None else value
+
+    def derived(self, name: str, builder: Callable[['SettingsSnapshot'], Any]) -> Any:
+        """
+        Get a value computed from this snapshot, building it once.
+
+        Use for parsed settings (e.g. shift time objects) so they are parsed
+        once per settings version instead of once per use.
+
+        Args:
+            name (str): Cache key for the derived value
+            builder (callable): Called with the snapshot to compute the value
+        """
+        try:
+            return self._derived[name]
+        except KeyError:
+            pass
+        value = builder(self)
+        with self._lock:
+            return self._derived.setdefault(name, value)
+
+
+class SettingsWatcher:
+    """Reloads the settings snapshot when the settings file changes"""
+
+    def __init__(self, settings_file: str = SETTINGS_FILE):
+        self.settings_file = settings_file
+        self._lock = threading.Lock()
+        self._thread = None
+        self._snapshot = None
+        self._signature = None
+        self._listeners = []
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.settings_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self) -> SettingsSnapshot:
+        """Get the current snapshot, loading it on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._signature = self._file_signature()
+                    self._snapshot = SettingsSnapshot(SettingsManager())
+                snapshot = self._snapshot
+        return snapshot
+
+    def reload(self) -> SettingsSnapshot:
+        """Load a new snapshot and swap it in."""
+        with self._lock:
+            version = self._snapshot.version + 1 if self._snapshot else 1
+            self._signature = self._file_signature()
+            snapshot = SettingsSnapshot(SettingsManager(), version)
+            self._snapshot = snapshot
+            listeners = list(self._listeners)
+
+        print(f"Settings reloaded (version {snapshot.version})")
+        for listener in listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"Settings listener error: {e}")
+        return snapshot
+
+    def check(self) -> bool:
+        """Reload if the settings file changed. Returns True if reloaded."""
+        self.get()
+        if self._file_signature() != self._signature:
+            self.reload()
+            return True
+        return False
+
+    def _watch_loop(self):
+        while True:
+            interval = self.get().get('settings_reload_interval_seconds', 5)
+            time.sleep(interval)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Settings reload error: {e}")
+
+    def start(self):
+        """Start watching the settings file in the background."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._watch_loop, daemon=True)
+            self._thread.start()
+
+    def add_listener(self, callback):
+        """
+        Register a callback for settings reloads.
+
+        Args:
+            callback (callable): Called with the new SettingsSnapshot
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+
+_watcher = SettingsWatcher()
+
+
+def get_settings() -> SettingsSnapshot:
+    """Get the current process-wide settings snapshot"""
+    return _watcher.get()
+
+
+def reload_settings() -> SettingsSnapshot:
+    """Reload settings now"""
+    return _watcher.reload()
+
+
+def start_settings_watcher():
+    """Start hot-reloading settings when settings.json changes"""
+    _watcher.start()
+
+
+def add_settings_listener(callback):
+    """Register a callback for settings reloads"""
+    _watcher.add_listener(callback)
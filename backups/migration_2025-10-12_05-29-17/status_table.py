@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Student Status Table for QR Code Attendance System
+Keeps a local per-day view of each student's check-in state so a scan
+can pick check-in or check-out without asking the server first
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+import pytz
+from settings_snapshot import get_settings
+
+# Status values (the first two match checkin_api.php get_status responses)
+NOT_CHECKED_IN = 'Not checked in'
+CHECKED_IN = 'Checked-in'
+CHECKED_OUT = 'Checked-out'
+
+VALID_STATUSES = (NOT_CHECKED_IN, CHECKED_IN, CHECKED_OUT)
+
+
+class StudentStatusTable:
+    """Thread-safe per-day table of student check-in states"""
+
+    def __init__(self, timezone=None):
+        # Defaults to the 'timezone' setting, read at use time
+        self._timezone = timezone
+
+        self._lock = threading.Lock()
+        self._date = None
+        self._statuses = {}
+
+    @property
+    def timezone(self):
+        return pytz.timezone(self._timezone or get_settings().get('timezone', 'Asia/Karachi'))
+
+    def _today(self) -> str:
+        """Get today's date string in the configured timezone."""
+        return datetime.now(self.timezone).strftime('%Y-%m-%d')
+
+    def _roll_over(self):
+        """Reset the table when the day changes. Caller must hold the lock."""
+        today = self._today()
+        if self._date != today:
+            self._date = today
+            self._statuses = {}
+
+    def get_status(self, student_id: str) -> Optional[str]:
+        """
+        Get the locally known status of a student for today.
+
+        Args:
+            student_id (str): Student ID
+
+        Returns:
+            Optional[str]: Known status, or None if the student has not been seen today
+        """
+        with self._lock:
+            self._roll_over()
+            return self._statuses.get(student_id)
+
+    def set_status(self, student_id: str, status: str):
+        """Set a student's status for today."""
+        if status not in VALID_STATUSES:
+            return
+
+        with self._lock:
+            self._roll_over()
+            # The server reports 'Not checked in' after a check-out too, so
+            # keep the more specific local state in that case
+            if status == NOT_CHECKED_IN and self._statuses.get(student_id) == CHECKED_OUT:
+                return
+            self._statuses[student_id] = status
+
+    def warm(self, statuses: Dict[str, str]) -> int:
+        """
+        Load statuses for students not seen yet today.
+
+        Students already in the table keep their state, so a scan handled
+        while a warm-up request was in flight is never overwritten.
+
+        Returns:
+            int: Number of statuses loaded
+        """
+        loaded = 0
+        with self._lock:
+            self._roll_over()
+            for student_id, status in statuses.items():
+                if status in VALID_STATUSES and student_id not in self._statuses:
+                    self._statuses[student_id] = status
+                    loaded += 1
+        return loaded
+
+    def record_response(self, action: str, student_id: str, data: Optional[Dict] = None):
+        """
+        Update the table from a successful checkin_api.php response.
+
+        Args:
+            action (str): 'check_in', 'check_out' or 'get_status'
+            student_id (str): Student ID
+            data (dict, optional): Response data from the API
+        """
+        if action == 'check_in':
+            self.set_status(student_id, CHECKED_IN)
+        elif action == 'check_out':
+            self.set_status(student_id, CHECKED_OUT)
+        elif action == 'get_status' and isinstance(data, dict):
+            self.set_status(student_id, data.get('status'))
+
+    def invalidate(self, student_id: str):
+        """Forget a student's status so the next scan asks the server."""
+        with self._lock:
+            self._roll_over()
+            self._statuses.pop(student_id, None)
+
+    def clear(self):
+        """Forget all statuses."""
+        with self._lock:
+            self._date = None
+            self._statuses = {}
+
+    def snapshot(self) -> Dict[str, str]:
+        """Get a copy of today's statuses."""
+        with self._lock:
+            self._roll_over()
+            return dict(self._statuses)
+
+    def __len__(self):
+        with self._lock:
+            self._roll_over()
+            return len(self._statuses)
+
+
+_status_table = None
+_status_table_lock = threading.Lock()
+
+
+def get_status_table() -> StudentStatusTable:
+    """Get the process-wide student status table"""
+    global _status_table
+    if _status_table is None:
+        with _status_table_lock:
+            if _status_table is None:
+                _status_table = StudentStatusTable()
+    return _status_table
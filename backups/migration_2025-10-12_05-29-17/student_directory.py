@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Student Directory for QR Code Attendance System
+Keeps students.json resident in memory and reloads it only when the file changes
+"""
+
+import os
+import json
+import threading
+from typing import Dict, Optional
+
+
+class StudentDirectory:
+    """Process-wide cache of students.json with mtime/size invalidation"""
+
+    def __init__(self, students_file="students.json"):
+        self.students_file = students_file
+        self._lock = threading.RLock()
+        self._students = {}
+        self._signature = None
+
+    def _file_signature(self):
+        """Get (mtime, size) of the students file, or None if it is missing."""
+        try:
+            stat = os.stat(self.students_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _refresh(self):
+        """Reload the students file if it changed since the last load."""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+
+        with self._lock:
+            signature = self._file_signature()
+            if signature == self._signature:
+                return
+
+            if signature is None:
+                self._students = {}
+            else:
+                try:
+                    with open(self.students_file, 'r') as f:
+                        self._students = json.load(f)
+                except Exception as e:
+                    print(f"Error loading students: {e}")
+                    return
+            self._signature = signature
+
+    def get_all(self) -> Dict[str, Dict]:
+        """
+        Get all students keyed by roll number.
+
+        The returned dict is shared; use copy() before modifying it.
+        """
+        self._refresh()
+        return self._students
+
+    def get(self, student_id: str) -> Optional[Dict]:
+        """Look up a single student by roll number."""
+        self._refresh()
+        return self._students.get(student_id)
+
+    def __contains__(self, student_id):
+        self._refresh()
+        return student_id in self._students
+
+    def __len__(self):
+        self._refresh()
+        return len(self._students)
+
+    def copy(self) -> Dict[str, Dict]:
+        """Get a modifiable copy of all students."""
+        self._refresh()
+        return {student_id: dict(info) for student_id, info in self._students.items()}
+
+    def save(self, students: Dict[str, Dict]):
+        """
+        Write students to disk atomically and make them the resident copy.
+
+        Args:
+            students (dict): Students keyed by roll number
+        """
+        with self._lock:
+            temp_file = f"{self.students_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(students, f, indent=2)
+            os.replace(temp_file, self.students_file)
+
+            self._students = students
+            self._signature = self._file_signature()
+
+    def invalidate(self):
+        """Force a reload on the next lookup."""
+        with self._lock:
+            self._signature = None
+
+
+_directories = {}
+_directories_lock = threading.Lock()
+
+
+def get_student_directory(students_file="students.json") -> StudentDirectory:
+    """Get the shared student directory for a students file"""
+    path = os.path.abspath(students_file)
+    directory = _directories.get(path)
+    if directory is None:
+        with _directories_lock:
+            directory = _directories.get(path)
+            if directory is None:
+                directory = StudentDirectory(students_file)
+                _directories[path] = directory
+    return directory
+
+
+def load_students(students_file="students.json") -> Dict[str, Dict]:
+    """Load students from the shared directory"""
+    return get_student_directory(students_file).get_all()
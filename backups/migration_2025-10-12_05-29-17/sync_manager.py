@@ -4,41 +4,81 @@ Advanced Sync Manager for QR Code Attendance System
 Handles bidirectional synchronization between local and web data
 """
 
-import pandas as pd
 import json
 import os
-import requests
-import sqlite3
+import hashlib
 from datetime import datetime, timedelta
 import time
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 import urllib3
 import pytz
-from settings import SettingsManager
+from settings_snapshot import get_settings
+from student_directory import get_student_directory
+from scan_journal import get_scan_journal
+from journal_uploader import upload_journal
+from attendance_store import get_attendance_store
+from attendance_writer import get_attendance_writer
+from connectivity import get_connectivity_monitor
+from http_client import get_http_client
+from sync_state import get_sync_state
+from sync_scheduler import start_sync_scheduler, get_sync_scheduler
+from checkin_manager import CheckInManager
+from offline_checkin import get_offline_checkin
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Marks exports written by push_to_admin
+EXCHANGE_ORIGIN = 'local'
+# Unacknowledged admin exports remembered for matching a late ack
+ADMIN_EXPORT_HISTORY = 5
+
 class SyncManager:
     def __init__(self):
-        # Initialize settings manager
-        self.settings = SettingsManager()
-        
-        # Load configuration from settings
-        self.CSV_FILE = "attendance.csv"
+        self.CSV_FILE = "attendance.csv"  # Export only; LOCAL_DB is the source of truth
         self.STUDENTS_FILE = "students.json"
-        self.OFFLINE_FILE = "offline_data.json"
+        self.OFFLINE_FILE = "offline_data.json"  # Legacy offline store, imported into the journal
+        self.OFFLINE_JOURNAL_FILE = "offline_journal.jsonl"
         self.LOCAL_DB = "attendance_local.db"
-        self.SYNC_DATA_FILE = "sync_data.json"
-        self.WEBSITE_URL = self.settings.get('website_url', 'http://localhost/qr_attendance/public')
-        self.API_ENDPOINT = self.settings.get('api_endpoint_attendance', '/api/api_attendance.php')
+        self.SYNC_DATA_FILE = "sync_data.json"  # Written by the admin panel only
+        self.ADMIN_EXPORT_FILE = "offline_sync_data.json"  # Written by push_to_admin only
+        self.ADMIN_ACK_FILE = "admin_ack.json"  # Last export version the admin panel imported
+        self.SYNC_STATE_FILE = "sync_state.json"
         self.DASHBOARD_API = "/dashboard_api.php"
         self.ADMIN_API = "/admin_api.php"
-        self.API_KEY = self.settings.get('api_key', 'attendance_2025_xyz789_secure')
-        self.SYNC_INTERVAL = self.settings.get('sync_interval_seconds', 30)
         self.is_syncing = False
-        self.timezone = pytz.timezone(self.settings.get('timezone', 'Asia/Karachi'))
+        self._cycle_website_online = None
+        self._phase_pool = None
+        self.last_uploaded = 0
+        self.last_pulled = 0
+    
+    # Settings are read from the current snapshot on every use so
+    # settings.json edits apply without a restart
+
+    @property
+    def settings(self):
+        return get_settings()
+
+    @property
+    def WEBSITE_URL(self):
+        return self.settings.get('website_url', 'http://localhost/qr_attendance/public')
+
+    @property
+    def API_ENDPOINT(self):
+        return self.settings.get('api_endpoint_attendance', '/api/api_attendance.php')
+
+    @property
+    def API_KEY(self):
+        return self.settings.get('api_key', 'attendance_2025_xyz789_secure')
+
+    @property
+    def SYNC_INTERVAL(self):
+        return self.settings.get('sync_interval_seconds', 30)
+
+    @property
+    def timezone(self):
+        return pytz.timezone(self.settings.get('timezone', 'Asia/Karachi'))
     
     def get_current_time(self):
         """Get current time in Asia/Karachi timezone."""
@@ -51,129 +91,175 @@ class SyncManager:
         return dt.strftime("%Y-%m-%d %H:%M:%S")
         
     def check_internet_connection(self):
-        """Check if internet connection is available."""
-        try:
-            response = requests.get("https://www.google.com", timeout=3, verify=False)
-            return response.status_code == 200
-        except:
-            return False
+        """Check if internet connection is available (cached by the connectivity monitor)."""
+        return get_connectivity_monitor().is_internet_online()
     
     def check_website_connection(self):
-        """Check if the website is accessible."""
-        try:
-            # Try the main website first
-            response = requests.get(self.WEBSITE_URL, timeout=5, verify=False)
-            if response.status_code == 200:
-                return True
-            
-            # Try the API endpoint directly
-            api_url = self.WEBSITE_URL + self.API_ENDPOINT
-            response = requests.get(api_url, timeout=5, verify=False)
-            return response.status_code in [200, 404, 405]  # 404/405 means server is running but endpoint might not exist
-        except Exception as e:
-            print(f"Website connection check failed: {e}")
-            return False
+        """Check if the website is accessible (cached by the connectivity monitor)."""
+        # During an enhanced sync cycle every phase shares the cycle's check
+        if self._cycle_website_online is not None:
+            return self._cycle_website_online
+        return get_connectivity_monitor().is_website_online()
+    
+    def _request(self, method, url, endpoint='default', **kwargs):
+        """Make a website request on the shared connection pool."""
+        return get_http_client().request(method, url, endpoint=endpoint, **kwargs)
+    
+    def get_store(self):
+        """Get the local attendance store."""
+        return get_attendance_store(self.LOCAL_DB, self.CSV_FILE)
     
     def load_local_data(self):
-        """Load data from local CSV file."""
+        """Load data from the local attendance store."""
         try:
-            if os.path.exists(self.CSV_FILE):
-                df = pd.read_csv(self.CSV_FILE)
-                return df.to_dict('records')
-            return []
+            return self.get_store().get_records()
         except Exception as e:
             print(f"Error loading local data: {e}")
             return []
     
     def load_offline_data(self):
-        """Load offline data."""
+        """Load offline records not yet acknowledged by the website."""
         try:
-            if os.path.exists(self.OFFLINE_FILE):
-                with open(self.OFFLINE_FILE, 'r') as f:
-                    return json.load(f)
-            return []
+            return [record for _, record in self.get_journal().read_pending()]
         except Exception as e:
             print(f"Error loading offline data: {e}")
             return []
     
+    def get_journal(self):
+        """Get the shared offline scan journal."""
+        return get_scan_journal(self.OFFLINE_JOURNAL_FILE)
+    
     def save_offline_data(self, data):
         """Save data to offline storage."""
-        try:
-            offline_data = self.load_offline_data()
-            if isinstance(data, list):
-                offline_data.extend(data)
-            else:
-                offline_data.append(data)
-            
-            with open(self.OFFLINE_FILE, 'w') as f:
-                json.dump(offline_data, f, indent=2)
-            
-            print(f"Saved {len(data) if isinstance(data, list) else 1} records to offline storage")
+        records = data if isinstance(data, list) else [data]
+        if self.get_journal().append_many(records):
+            print(f"Saved {len(records)} records to offline storage")
             return True
-        except Exception as e:
-            print(f"Error saving offline data: {e}")
-            return False
+        return False
     
     def sync_to_website(self):
         """Sync local data to website."""
-        if not self.check_internet_connection() or not self.check_website_connection():
+        if not self.check_website_connection():
             return False
         
         try:
-            # Load offline data
-            offline_data = self.load_offline_data()
-            if not offline_data:
+            # Records not yet acknowledged by the website
+            journal = self.get_journal()
+            if not journal.pending_count():
                 return True
             
-            # Check if website API supports POST requests
+            # Upload in chunks of max_sync_records, acknowledging each chunk;
+            # reachability comes from the connectivity monitor, so no probe request
             url = self.WEBSITE_URL + self.API_ENDPOINT
-            test_response = requests.post(url, json={"test": "data"}, timeout=5, verify=False)
-            
-            if test_response.status_code == 405:
-                print("Website API is read-only. Data will be saved locally only.")
-                return False
-            
-            # Prepare API data
-            api_data = {
-                "api_key": self.API_KEY,
-                "attendance_data": offline_data
-            }
-            
-            # Send to website
-            response = requests.post(url, json=api_data, timeout=10, verify=False)
-            
-            if response.status_code == 200:
-                # Clear offline data after successful sync
-                if os.path.exists(self.OFFLINE_FILE):
-                    os.remove(self.OFFLINE_FILE)
-                print(f"Successfully synced {len(offline_data)} records to website")
-                return True
-            else:
-                print(f"Sync failed: {response.status_code} - {response.text}")
-                return False
+            result = upload_journal(journal, url, self.API_KEY)
+            self.last_uploaded = result['uploaded']
+            
+            if result['uploaded']:
+                print(f"Successfully synced {result['uploaded']} records to website in {result['chunks']} chunks")
+            if not result['success']:
+                if str(result['error']).startswith('405'):
+                    print("Website API is read-only. Data will be saved locally only.")
+                else:
+                    print(f"Sync failed: {result['error']} ({result['remaining']} records still pending)")
+            return result['success']
                 
         except Exception as e:
             print(f"Sync error: {e}")
             return False
     
+    def get_sync_state(self):
+        """Get the persistent sync cursors."""
+        return get_sync_state(self.SYNC_STATE_FILE)
+    
     def sync_from_website(self):
-        """Sync data from website to local storage."""
-        if not self.check_internet_connection() or not self.check_website_connection():
+        """
+        Pull new website records into local storage with one request.
+        
+        Sends the last seen record id and timestamp (since_id/since) and the
+        last ETag (If-None-Match). A 304 means nothing changed; otherwise
+        only records past the high-water mark are merged.
+        
+        The website records a check-out by updating the existing 'Check-in'
+        row, which keeps its id, so the open day also has to be pulled
+        again. That is only done once the website has shown that it filters
+        by since_id and since (a server that ignores them returns the whole
+        history every time); the open-day pull then takes every other cycle.
+        """
+        if not self.check_website_connection():
             return False
         
         try:
+            state = self.get_sync_state()
+            if state.get('pull_next') == 'open_day' and self._open_day_pull_supported(state):
+                state.update(pull_next='cursor')
+                merged = self._pull_open_day(state)
+                self.last_pulled = merged or 0
+                return merged is not None
+            
+            last_id = state.get('pull_last_id')
+            last_timestamp = state.get('pull_last_timestamp')
+            etag = state.get('pull_etag')
+            
+            # Prefer the id cursor: late offline uploads can carry old timestamps
+            params = {}
+            if last_id is not None:
+                params['since_id'] = last_id
+            elif last_timestamp:
+                params['since'] = last_timestamp
+            headers = {'If-None-Match': etag} if etag else {}
+            
             # Get data from website
             url = self.WEBSITE_URL + self.API_ENDPOINT
-            response = requests.get(url, timeout=10, verify=False)
+            response = self._request('GET', url, endpoint='attendance', params=params, headers=headers)
+            
+            if response.status_code == 304:
+                self.last_pulled = 0
+                self._schedule_open_day_pull(state)
+                return True
             
             if response.status_code == 200:
                 data = response.json()
-                if data.get('success') and data.get('data'):
-                    # Update local CSV with website data
-                    website_data = data['data']
-                    self.update_local_csv(website_data)
+                if not data.get('success'):
+                    return False
+                
+                website_data = data.get('data') or []
+                
+                # Servers that ignore since_id still return everything; drop
+                # what we have already seen before merging
+                if last_id is not None:
+                    seen = [
+                        record for record in website_data
+                        if self._record_id(record) and self._record_id(record) <= last_id
+                    ]
+                    state.update(pull_since_id_honored=not seen)
+                    if seen:
+                        website_data = [
+                            record for record in website_data
+                            if not self._record_id(record) or self._record_id(record) > last_id
+                        ]
+                
+                self.last_pulled = 0
+                if website_data:
+                    self.last_pulled = self.update_local_csv(website_data)
                     print(f"Successfully synced {len(website_data)} records from website")
-                    return True
+                
+                # Advance the high-water mark
+                for record in website_data:
+                    record_id = self._record_id(record)
+                    if record_id and (last_id is None or record_id > last_id):
+                        last_id = record_id
+                    timestamp = str(record.get('timestamp') or record.get('Timestamp') or '')
+                    if timestamp and (not last_timestamp or timestamp > last_timestamp):
+                        last_timestamp = timestamp
+                
+                state.update(
+                    pull_last_id=last_id,
+                    pull_last_timestamp=last_timestamp,
+                    pull_etag=response.headers.get('ETag') or etag,
+                    pull_synced_at=self.format_time()
+                )
+                self._schedule_open_day_pull(state)
+                return True
             else:
                 print(f"Failed to fetch from website: {response.status_code}")
                 return False
@@ -182,53 +268,107 @@ class SyncManager:
             print(f"Error syncing from website: {e}")
             return False
     
+    @staticmethod
+    def _open_day_pull_supported(state):
+        """Check whether the website is known to filter pulls by since_id and since."""
+        return bool(state.get('pull_since_id_honored')) and state.get('pull_since_honored') is not False
+    
+    def _schedule_open_day_pull(self, state):
+        """Make the next cycle re-pull the open day, if the website supports it."""
+        if self._open_day_pull_supported(state):
+            state.update(pull_next='open_day')
+    
+    def _pull_open_day(self, state):
+        """
+        Re-pull today's website records so in-place updates are merged.
+        
+        Uses its own ETag, kept per day, so an unchanged day costs a 304. A
+        response with records from earlier days means the website ignores
+        'since', and the open-day pull is not used again.
+        
+        Returns:
+            int: Records inserted or updated locally, or None if the pull failed
+        """
+        today = self.get_current_time().strftime('%Y-%m-%d')
+        etag = state.get('pull_open_day_etag') if state.get('pull_open_day') == today else None
+        headers = {'If-None-Match': etag} if etag else {}
+        
+        url = self.WEBSITE_URL + self.API_ENDPOINT
+        response = self._request('GET', url, endpoint='attendance',
+                                 params={'since': f"{today} 00:00:00"}, headers=headers)
+        if response.status_code == 304:
+            return 0
+        if response.status_code != 200:
+            print(f"Failed to re-pull today's records: {response.status_code}")
+            return None
+        
+        data = response.json()
+        if not data.get('success'):
+            return None
+        
+        records = data.get('data') or []
+        website_data = [
+            record for record in records
+            if str(record.get('timestamp') or record.get('Timestamp') or '').startswith(today)
+        ]
+        if len(website_data) < len(records):
+            print("Website ignores 'since'; not re-pulling the open day")
+            state.update(pull_since_honored=False)
+        
+        merged = self.update_local_csv(website_data) if website_data else 0
+        state.update(pull_open_day=today, pull_open_day_etag=response.headers.get('ETag'))
+        return merged
+    
+    @staticmethod
+    def _record_id(record):
+        """Get a website record's numeric id, or None."""
+        try:
+            return int(record.get('id'))
+        except (TypeError, ValueError):
+            return None
+    
     def update_local_csv(self, website_data):
-        """Update local CSV with website data."""
+        """Merge website data into the local store and append new rows to the CSV export."""
         try:
-            # Load existing local data
-            local_data = self.load_local_data()
-            
-            # Create a set of existing records for deduplication
-            existing_records = set()
-            for record in local_data:
-                key = f"{record['ID']}_{record['Timestamp']}_{record['Status']}"
-                existing_records.add(key)
-            
-            # Add new records from website
-            new_records = []
-            for record in website_data:
-                key = f"{record['student_id']}_{record['timestamp']}_{record['status']}"
-                if key not in existing_records:
-                    new_record = {
-                        'ID': record['student_id'],
-                        'Name': record['student_name'],
-                        'Timestamp': record['timestamp'],
-                        'Status': record['status']
-                    }
-                    new_records.append(new_record)
-                    existing_records.add(key)
+            store = self.get_store()
+            
+            # Check-outs update the day's 'Check-in' row rather than adding one
+            updated = store.apply_check_outs(website_data)
+            if updated:
+                print(f"Marked {len(updated)} checked-out students Present in local store")
+            
+            # The persistent dedup key index skips records we already have
+            new_records = store.merge_records(website_data)
             
-            # Combine and save
             if new_records:
-                all_data = local_data + new_records
-                df = pd.DataFrame(all_data)
-                df.to_csv(self.CSV_FILE, index=False)
-                print(f"Added {len(new_records)} new records to local CSV")
+                get_attendance_writer(self.CSV_FILE).append_many(new_records)
+                print(f"Added {len(new_records)} new records to local store")
+            return len(updated) + len(new_records)
             
         except Exception as e:
             print(f"Error updating local CSV: {e}")
+            return 0
     
     def bidirectional_sync(self):
-        """Perform bidirectional synchronization."""
+        """
+        Perform bidirectional synchronization.
+        
+        Returns:
+            bool: True if the upload succeeded (or had nothing to send)
+        """
         if self.is_syncing:
-            return
+            return True
         
         self.is_syncing = True
         try:
             print("Starting bidirectional sync...")
             
+            # Check-ins decided offline go to checkin_api.php first
+            reconciled = self.reconcile_offline_checkins()['success']
+            
             # Sync local data to website
-            if self.sync_to_website():
+            uploaded = self.sync_to_website() and reconciled
+            if uploaded:
                 print("+ Local to website sync completed")
             
             # Sync website data to local
@@ -236,36 +376,67 @@ class SyncManager:
                 print("+ Website to local sync completed")
             
             print("Bidirectional sync completed successfully")
+            return uploaded
             
         except Exception as e:
             print(f"Bidirectional sync error: {e}")
+            return False
         finally:
             self.is_syncing = False
     
     def start_auto_sync(self):
-        """Start automatic synchronization."""
-        def sync_loop():
-            while True:
-                try:
-                    if self.check_internet_connection() and self.check_website_connection():
-                        self.bidirectional_sync()
-                    time.sleep(self.SYNC_INTERVAL)
-                except Exception as e:
-                    print(f"Auto sync error: {e}")
-                    time.sleep(60)
+        """
+        Start automatic synchronization.
         
-        sync_thread = threading.Thread(target=sync_loop, daemon=True)
-        sync_thread.start()
-        print(f"Auto sync started (every {self.SYNC_INTERVAL} seconds)")
+        Syncs run when scans are journaled or the website comes back
+        online, with a periodic pull while idle and jittered backoff on
+        failure.
+        """
+        journal = self.get_journal()
+        offline = get_offline_checkin()
+        scheduler = start_sync_scheduler(
+            self.bidirectional_sync, journal=journal,
+            pending_function=lambda: journal.pending_count() + offline.pending_count()
+        )
+        offline.journal.add_listener(scheduler.notify)
+        print(f"Auto sync started (on new scans, idle pull every {scheduler.idle_interval} seconds)")
+        return scheduler
+    
+    def reconcile_offline_checkins(self):
+        """
+        Reconcile check-ins decided offline with checkin_api.php.
+        
+        Returns:
+            dict: OfflineCheckIn.reconcile() result
+        """
+        offline = get_offline_checkin()
+        if not offline.pending_count():
+            return {'success': True, 'replayed': 0, 'rejected': 0,
+                    'conflicts': [], 'remaining': 0, 'error': None}
+        if not self.check_website_connection():
+            return {'success': False, 'replayed': 0, 'rejected': 0,
+                    'conflicts': [], 'remaining': offline.pending_count(), 'error': 'Website offline'}
+        
+        result = offline.reconcile(CheckInManager(self.WEBSITE_URL))
+        handled = result['replayed'] + result['rejected']
+        if handled:
+            print(f"Reconciled {handled} offline check-in decisions ({result['replayed']} replayed, "
+                  f"{len(result['conflicts'])} conflicts)")
+        if not result['success']:
+            print(f"Reconciliation stopped: {result['error']} ({result['remaining']} decisions still pending)")
+        return result
     
     def get_sync_status(self):
         """Get current synchronization status."""
         status = {
             'internet': self.check_internet_connection(),
             'website': self.check_website_connection(),
-            'offline_records': len(self.load_offline_data()),
-            'local_records': len(self.load_local_data()),
-            'is_syncing': self.is_syncing
+            'offline_records': self.get_journal().pending_count(),
+            'offline_decisions': get_offline_checkin().pending_count(),
+            'local_records': self.get_store().count(),
+            'is_syncing': self.is_syncing,
+            'scheduler': get_sync_scheduler().get_status() if get_sync_scheduler() else None,
+            'http': get_http_client().get_metrics()
         }
         return status
     
@@ -287,47 +458,60 @@ class SyncManager:
             return None
     
     def apply_admin_changes(self):
-        """Apply changes from admin panel to local system."""
+        """
+        Merge changes from the admin panel into the local system.
+        
+        sync_data.json is only written by the admin panel; local exports go
+        to ADMIN_EXPORT_FILE. The file is claimed (renamed) before it is
+        read, so an admin write that lands while changes are applied starts
+        a new file and is picked up next time instead of being deleted.
+        Students are upserted and attendance rows merged through the dedup
+        index, so applying a file costs O(changes).
+        """
         try:
-            sync_data = self.check_sync_data()
-            if not sync_data:
-                return False
+            claimed_file = f"{self.SYNC_DATA_FILE}.applying"
+            # A claimed file left by an interrupted run is applied first
+            if not os.path.exists(claimed_file):
+                if not os.path.exists(self.SYNC_DATA_FILE):
+                    return False
+                os.replace(self.SYNC_DATA_FILE, claimed_file)
+            
+            with open(claimed_file, 'r') as f:
+                sync_data = json.load(f)
             
             print("Applying admin panel changes to local system...")
             
-            # Update students.json
-            if 'students' in sync_data:
-                with open(self.STUDENTS_FILE, 'w') as f:
-                    students_dict = {}
-                    for student in sync_data['students']:
-                        students_dict[student['student_id']] = {
-                            'name': student['name'],
-                            'email': student.get('email', ''),
-                            'phone': student.get('phone', '')
-                        }
-                    json.dump(students_dict, f, indent=2)
+            # Upsert changed students into students.json
+            if sync_data.get('students'):
+                directory = get_student_directory(self.STUDENTS_FILE)
+                students_dict = directory.copy()
+                for student in sync_data['students']:
+                    info = students_dict.setdefault(student['student_id'], {})
+                    info['name'] = student['name']
+                    info['email'] = student.get('email', '')
+                    info['phone'] = student.get('phone', '')
+                directory.save(students_dict)
                 print(f"Updated {len(sync_data['students'])} students")
             
-            # Update attendance.csv
-            if 'attendance' in sync_data:
-                import pandas as pd
-                attendance_data = []
-                for record in sync_data['attendance']:
-                    attendance_data.append({
+            # Merge new attendance rows into the local store and CSV export
+            if sync_data.get('attendance'):
+                new_records = self.get_store().merge_records(
+                    {
                         'ID': record['student_id'],
                         'Name': record['student_name'],
                         'Timestamp': record['timestamp'],
                         'Status': record['status']
-                    })
-                
-                if attendance_data:
-                    df = pd.DataFrame(attendance_data)
-                    df.to_csv(self.CSV_FILE, index=False)
-                    print(f"Updated {len(attendance_data)} attendance records")
+                    }
+                    for record in sync_data['attendance']
+                )
+                if new_records:
+                    get_attendance_writer(self.CSV_FILE).append_many(new_records)
+                print(f"Merged {len(new_records)} new of {len(sync_data['attendance'])} attendance records")
             
-            # Remove sync data file after processing
-            if os.path.exists(self.SYNC_DATA_FILE):
-                os.remove(self.SYNC_DATA_FILE)
+            # Remove the claimed file after processing
+            os.remove(claimed_file)
+            if sync_data.get('version') is not None:
+                self.get_sync_state().update(admin_applied_version=sync_data['version'])
             
             print("Admin changes applied successfully")
             return True
@@ -336,38 +520,108 @@ class SyncManager:
             print(f"Error applying admin changes: {e}")
             return False
     
+    def _acknowledge_admin_export(self, state):
+        """
+        Advance the acknowledged export from the admin panel's ack file.
+        
+        admin_api.php pull_from_offline writes ADMIN_ACK_FILE with the
+        version it imported; that export's row id and student digests
+        become the base of the next export.
+        """
+        try:
+            with open(self.ADMIN_ACK_FILE, 'r') as f:
+                acked_version = int(json.load(f).get('version'))
+        except (OSError, ValueError, TypeError, AttributeError):
+            return
+        
+        if acked_version <= state.get('admin_acked_version', 0):
+            return
+        exports = state.get('admin_exports', {})
+        export = exports.get(str(acked_version))
+        if export is None:
+            return
+        
+        state.update(
+            admin_acked_version=acked_version,
+            admin_acked_through_id=export['through_id'],
+            admin_acked_students=export['students'],
+            admin_exports={version: entry for version, entry in exports.items() if int(version) > acked_version}
+        )
+    
     def push_to_admin(self):
-        """Push local data to admin panel."""
+        """
+        Export local changes for the admin panel.
+        
+        Writes only the attendance rows and students changed since the last
+        export the admin panel acknowledged, with a version number. Until an
+        export is acknowledged, later exports include its changes too; an
+        unchanged export is not rewritten.
+        """
         try:
-            if not self.check_internet_connection() or not self.check_website_connection():
+            if not self.check_website_connection():
                 return False
             
-            # Prepare local data
-            local_data = self.load_local_data()
-            students_data = self.load_students()
+            state = self.get_sync_state()
+            self._acknowledge_admin_export(state)
             
-            # Convert students to admin format
+            # Attendance rows added since the acknowledged export
+            store = self.get_store()
+            acked_through_id = state.get('admin_acked_through_id', 0)
+            through_id = store.max_row_id()
+            
+            # Students whose admin fields changed since the acknowledged export
+            acked_students = state.get('admin_acked_students', {})
+            student_digests = {}
             admin_students = []
-            for student_id, info in students_data.items():
-                admin_students.append({
+            for student_id, info in self.load_students().items():
+                student = {
                     'student_id': student_id,
                     'name': info['name'],
                     'email': info.get('email', ''),
                     'phone': info.get('phone', '')
-                })
+                }
+                digest = hashlib.sha1(json.dumps(student, sort_keys=True).encode('utf-8')).hexdigest()
+                student_digests[student_id] = digest
+                if acked_students.get(student_id) != digest:
+                    admin_students.append(student)
+            
+            if through_id <= acked_through_id and not admin_students:
+                return True
             
-            # Prepare sync data
+            # The waiting export already has these changes
+            exports = state.get('admin_exports', {})
+            latest = exports.get(str(state.get('admin_version', 0)))
+            if latest and latest['through_id'] == through_id and latest['students'] == student_digests \
+                    and os.path.exists(self.ADMIN_EXPORT_FILE):
+                return True
+            
+            local_data = store.get_records_after(acked_through_id, through_id)
+            version = state.get('admin_version', 0) + 1
             sync_data = {
                 'timestamp': datetime.now().isoformat(),
+                'origin': EXCHANGE_ORIGIN,
+                'version': version,
+                'base_version': state.get('admin_acked_version', 0),
                 'students': admin_students,
                 'attendance': local_data
             }
             
-            # Save sync data file
-            with open(self.SYNC_DATA_FILE, 'w') as f:
-                json.dump(sync_data, f, indent=2)
-            
-            print("Local data prepared for admin panel sync")
+            # Save the export atomically
+            temp_file = f"{self.ADMIN_EXPORT_FILE}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(sync_data, f, separators=(',', ':'))
+            os.replace(temp_file, self.ADMIN_EXPORT_FILE)
+            
+            # Remember what each unacknowledged export covers, newest few only
+            exports[str(version)] = {'through_id': through_id, 'students': student_digests}
+            recent = sorted(exports, key=int)[-ADMIN_EXPORT_HISTORY:]
+            state.update(
+                admin_version=version,
+                admin_exports={key: exports[key] for key in recent}
+            )
+            
+            print(f"Local changes prepared for admin panel sync (version {version}: "
+                  f"{len(admin_students)} students, {len(local_data)} attendance records)")
             return True
             
         except Exception as e:
@@ -375,18 +629,28 @@ class SyncManager:
             return False
     
     def load_students(self):
-        """Load students from JSON file."""
+        """Load students from the shared in-memory student directory."""
+        return get_student_directory(self.STUDENTS_FILE).get_all()
+    
+    def _timed_phase(self, name, phase, timings):
+        """Run one sync phase, recording its latency and outcome."""
+        started = time.perf_counter()
         try:
-            if os.path.exists(self.STUDENTS_FILE):
-                with open(self.STUDENTS_FILE, 'r') as f:
-                    return json.load(f)
-            return {}
+            return phase()
         except Exception as e:
-            print(f"Error loading students: {e}")
-            return {}
+            print(f"Sync phase {name} error: {e}")
+            return False
+        finally:
+            timings[name] = round((time.perf_counter() - started) * 1000, 1)
     
     def enhanced_bidirectional_sync(self):
-        """Enhanced bidirectional sync with admin panel support."""
+        """
+        Enhanced bidirectional sync with admin panel support.
+        
+        The upload runs concurrently with the admin-change chain (apply admin
+        changes, then pull from the website and push to the admin panel in
+        parallel). Connectivity is checked once for the whole cycle.
+        """
         if self.is_syncing:
             return
         
@@ -402,57 +666,72 @@ class SyncManager:
             'ip_address': self.get_client_ip(),
             'user_agent': 'Python Sync Manager'
         }
+        timings = {}
         
         try:
             print("Starting enhanced bidirectional sync...")
             
-            # Check for admin changes first
-            admin_changes_applied = 0
-            if self.apply_admin_changes():
+            # One connectivity check shared by every phase of this cycle
+            self._cycle_website_online = get_connectivity_monitor().is_website_online()
+            self.last_uploaded = 0
+            self.last_pulled = 0
+            
+            pool = self._get_phase_pool()
+            
+            # The upload only reads the journal, so it runs alongside everything else
+            upload = pool.submit(self._timed_phase, 'sync_to_website', self.sync_to_website, timings)
+            reconcile = pool.submit(self._timed_phase, 'reconcile_offline_checkins',
+                                    lambda: self.reconcile_offline_checkins()['success'], timings)
+            
+            # Admin changes rewrite local data, so pull and push wait for them
+            admin_changes_applied = 1 if self._timed_phase('apply_admin_changes', self.apply_admin_changes, timings) else 0
+            if admin_changes_applied:
                 print("+ Admin changes applied")
-                admin_changes_applied = 1
             
-            # Sync local data to website
-            local_to_web_success = False
-            local_to_web_records = 0
-            if self.sync_to_website():
-                print("✓ Local to website sync completed")
-                local_to_web_success = True
-                local_to_web_records = len(self.load_offline_data())
+            pull = pool.submit(self._timed_phase, 'sync_from_website', self.sync_from_website, timings)
+            push = pool.submit(self._timed_phase, 'push_to_admin', self.push_to_admin, timings)
             
-            # Sync website data to local
-            web_to_local_success = False
-            web_to_local_records = 0
-            if self.sync_from_website():
+            if upload.result():
+                print("✓ Local to website sync completed")
+            if reconcile.result():
+                print("✓ Offline check-ins reconciled")
+            if pull.result():
                 print("✓ Website to local sync completed")
-                web_to_local_success = True
-                web_to_local_records = len(self.load_local_data())
-            
-            # Push local data to admin panel
-            admin_push_success = False
-            if self.push_to_admin():
+            if push.result():
                 print("✓ Local data pushed to admin panel")
-                admin_push_success = True
             
-            # Calculate sync metrics
-            total_records = admin_changes_applied + local_to_web_records + web_to_local_records
+            # Calculate sync metrics from what the phases actually moved
+            total_records = admin_changes_applied + self.last_uploaded + self.last_pulled
             sync_log['records_processed'] = total_records
             sync_log['sync_duration'] = round(time.time() - sync_start_time, 3)
+            sync_log['phase_timings_ms'] = dict(timings)
             
             # Log successful sync
-            self.log_sync_activity(sync_log)
+            self._timed_phase('log_sync_activity', lambda: self.log_sync_activity(sync_log), timings)
             
-            print(f"Enhanced bidirectional sync completed successfully - {total_records} records processed in {sync_log['sync_duration']}s")
+            breakdown = ', '.join(f"{name} {ms}ms" for name, ms in timings.items())
+            print(f"Enhanced bidirectional sync completed successfully - {total_records} records processed in {sync_log['sync_duration']}s ({breakdown})")
             
         except Exception as e:
             sync_log['status'] = 'failed'
             sync_log['error_message'] = str(e)
             sync_log['sync_duration'] = round(time.time() - sync_start_time, 3)
+            sync_log['phase_timings_ms'] = dict(timings)
             self.log_sync_activity(sync_log)
             print(f"Enhanced sync error: {e}")
         finally:
+            self._cycle_website_online = None
             self.is_syncing = False
     
+    def _get_phase_pool(self):
+        """Get the bounded thread pool for concurrent sync phases."""
+        if self._phase_pool is None:
+            self._phase_pool = ThreadPoolExecutor(
+                max_workers=self.settings.get('sync_phase_workers', 3),
+                thread_name_prefix='sync-phase'
+            )
+        return self._phase_pool
+    
     def get_client_ip(self):
         """Get client IP address."""
         try:
@@ -471,12 +750,11 @@ class SyncManager:
             if not self.check_website_connection():
                 return False
             
-            import requests
             url = f"{self.WEBSITE_URL}/api/sync_api.php"
-            response = requests.post(url, json={
+            response = self._request('POST', url, endpoint='sync_log', json={
                 'action': 'log_sync',
                 'sync_data': sync_log
-            }, timeout=10, verify=False)
+            })
             
             return response.status_code == 200
         except Exception as e:
@@ -486,6 +764,7 @@ class SyncManager:
 def main():
     """Test the sync manager."""
     sync_manager = SyncManager()
+    get_connectivity_monitor().start()
     
     print("=" * 60)
     print("QR Code Attendance System - Sync Manager")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Sync Scheduler for QR Code Attendance System
+Event-driven sync loop: wakes when scans are journaled or the website comes
+back online, coalesces bursts, and backs off with jitter on failure
+"""
+
+import time
+import random
+import threading
+from typing import Callable, Optional
+from settings_snapshot import get_settings
+from connectivity import get_connectivity_monitor
+
+
+class SyncScheduler:
+    """Runs a sync function on demand instead of on a fixed interval"""
+
+    def __init__(self, sync_function: Callable[[], bool],
+                 pending_function: Optional[Callable[[], int]] = None):
+        """
+        Args:
+            sync_function (callable): Runs one sync cycle, returns True on success
+            pending_function (callable, optional): Number of records still
+                waiting to upload; a non-zero count after a successful cycle
+                schedules the next cycle immediately
+        """
+        self.sync_function = sync_function
+        self.pending_function = pending_function
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._failures = 0
+        self._cycles = 0
+        self._last_run = None
+        self._last_result = None
+        self._next_delay = self.idle_interval
+
+    # Timings are read from the current settings snapshot on every use so
+    # settings.json edits apply without a restart
+
+    @property
+    def coalesce_seconds(self) -> float:
+        return get_settings().get('sync_coalesce_ms', 500) / 1000
+
+    @property
+    def idle_interval(self) -> float:
+        settings = get_settings()
+        return settings.get('sync_idle_interval_seconds', settings.get('sync_interval_seconds', 30))
+
+    @property
+    def min_backoff(self) -> float:
+        return get_settings().get('sync_min_backoff_seconds', 5)
+
+    @property
+    def max_backoff(self) -> float:
+        return get_settings().get('sync_max_backoff_seconds', 300)
+
+    def notify(self, *_):
+        """Request a sync cycle as soon as possible."""
+        self._wake.set()
+
+    def _on_connectivity_change(self, online: bool):
+        if online:
+            # A fresh connection should not wait out an old backoff
+            self._failures = 0
+            self.notify()
+
+    def _backoff_delay(self) -> float:
+        """Exponential backoff with jitter for the current failure count."""
+        backoff = min(self.max_backoff, self.min_backoff * (2 ** (self._failures - 1)))
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+    def _run_cycle(self):
+        if not get_connectivity_monitor().is_website_online():
+            # The connectivity listener wakes us when the website returns
+            self._next_delay = self.idle_interval
+            return
+
+        try:
+            success = bool(self.sync_function())
+        except Exception as e:
+            print(f"Auto sync error: {e}")
+            success = False
+
+        self._cycles += 1
+        self._last_run = time.time()
+        self._last_result = success
+
+        if success:
+            self._failures = 0
+            self._next_delay = self.idle_interval
+            if self.pending_function and self.pending_function():
+                # More backlog than one cycle uploads; keep draining
+                self._wake.set()
+        else:
+            self._failures += 1
+            self._next_delay = self._backoff_delay()
+
+    def _loop(self):
+        while True:
+            woken = self._wake.wait(self._next_delay)
+            if woken:
+                # Let a burst of scans land so they go up in one upload
+                time.sleep(self.coalesce_seconds)
+            self._wake.clear()
+            self._run_cycle()
+
+    def start(self):
+        """Start the scheduler thread and run a first cycle."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            get_connectivity_monitor().add_listener(self._on_connectivity_change)
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        self.notify()
+
+    def get_status(self):
+        """Get scheduler state."""
+        return {
+            'running': self._thread is not None,
+            'cycles': self._cycles,
+            'consecutive_failures': self._failures,
+            'last_run': self._last_run,
+            'last_result': self._last_result,
+            'next_delay_seconds': round(self._next_delay, 1)
+        }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_sync_scheduler() -> Optional[SyncScheduler]:
+    """Get the running process-wide sync scheduler, if any"""
+    return _scheduler
+
+
+def start_sync_scheduler(sync_function: Callable[[], bool], journal=None,
+                         pending_function: Optional[Callable[[], int]] = None) -> SyncScheduler:
+    """
+    Start the process-wide sync scheduler (once).
+
+    Args:
+        sync_function (callable): Runs one sync cycle, returns True on success
+        journal (ScanJournal, optional): Journal whose appends trigger a sync
+        pending_function (callable, optional): Records still waiting to
+            upload; defaults to the journal's pending count
+
+    Returns:
+        SyncScheduler: The running scheduler
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            return _scheduler
+        if pending_function is None and journal is not None:
+            pending_function = journal.pending_count
+        scheduler = SyncScheduler(sync_function, pending_function)
+        if journal is not None:
+            journal.add_listener(scheduler.notify)
+        scheduler.start()
+        _scheduler = scheduler
+    return scheduler
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Sync State for QR Code Attendance System
+Small persistent key/value state for sync cursors (high-water marks, ETags)
+"""
+
+import os
+import json
+import threading
+from typing import Any, Dict
+
+
+class SyncState:
+    """JSON-file backed sync state, written atomically on every update"""
+
+    def __init__(self, state_file="sync_state.json"):
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        """Write the state atomically. Caller must hold the lock."""
+        temp_file = f"{self.state_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(temp_file, self.state_file)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a state value."""
+        with self._lock:
+            return self._state.get(key, default)
+
+    def update(self, **values):
+        """Set state values and persist them."""
+        with self._lock:
+            self._state.update(values)
+            self._save()
+
+    def clear(self, *keys):
+        """Remove state values (all when no keys are given) and persist."""
+        with self._lock:
+            if keys:
+                for key in keys:
+                    self._state.pop(key, None)
+            else:
+                self._state = {}
+            self._save()
+
+    def snapshot(self) -> Dict:
+        """Get a copy of the whole state."""
+        with self._lock:
+            return dict(self._state)
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def get_sync_state(state_file="sync_state.json") -> SyncState:
+    """Get the shared sync state for a state file"""
+    path = os.path.abspath(state_file)
+    state = _states.get(path)
+    if state is None:
+        with _states_lock:
+            state = _states.get(path)
+            if state is None:
+                state = SyncState(state_file)
+                _states[path] = state
+    return state
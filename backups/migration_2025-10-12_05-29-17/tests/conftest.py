@@ -0,0 +1,117 @@
+"""
+Shared fixtures for the QR Code Attendance System tests
+
+settings.py and roll_parser.py are not part of this backup; when they cannot
+be imported, small stand-ins with the same interface are installed so the
+modules under test can be imported.
+"""
+
+import os
+import re
+import sys
+import json
+import types
+from datetime import datetime
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeSettingsManager:
+    """settings.SettingsManager reading settings.json from the working directory"""
+
+    def __init__(self, settings_file='settings.json'):
+        self.settings_file = settings_file
+        self.settings = {}
+        if os.path.exists(settings_file):
+            with open(settings_file, 'r') as f:
+                self.settings = json.load(f)
+
+    def get(self, key, default=None):
+        return self.settings.get(key, default)
+
+
+# YY-[E]PROGRAM-NN, e.g. 24-SWT-01 (Morning) or 24-ESWT-01 (Evening)
+ROLL_PATTERN = re.compile(r'^(\d{2})-(E?)([A-Z]{2,4})-(\d{2,3})$')
+
+
+def fake_parse_roll_number(roll_number):
+    if not roll_number or not isinstance(roll_number, str):
+        return {'valid': False, 'error': 'Invalid roll number format'}
+    roll_number = roll_number.strip().upper()
+    match = ROLL_PATTERN.match(roll_number)
+    if not match:
+        return {'valid': False, 'error': 'Invalid roll number format. Expected: YY-[E]PROGRAM-NN'}
+
+    admission_year = 2000 + int(match.group(1))
+    now = datetime.now()
+    academic_year = now.year if now.month >= 9 else now.year - 1
+    return {
+        'valid': True,
+        'roll_number': roll_number,
+        'admission_year': admission_year,
+        'shift': 'Evening' if match.group(2) else 'Morning',
+        'is_evening': bool(match.group(2)),
+        'program': match.group(3),
+        'sequence_number': int(match.group(4)),
+        'current_year': min(max(academic_year - admission_year + 1, 1), 4),
+    }
+
+
+def fake_get_shift(roll_number):
+    roll_data = fake_parse_roll_number(roll_number)
+    return roll_data['shift'] if roll_data['valid'] else 'Morning'
+
+
+def fake_get_program(roll_number):
+    return fake_parse_roll_number(roll_number).get('program')
+
+
+def fake_get_academic_year_info(roll_number):
+    roll_data = fake_parse_roll_number(roll_number)
+    if not roll_data['valid']:
+        return roll_data
+    return {'valid': True, 'current_year': roll_data['current_year'], 'is_graduated': False,
+            'years_remaining': 4 - roll_data['current_year']}
+
+
+def _install_fake(name, **attributes):
+    try:
+        __import__(name)
+    except ImportError:
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+
+
+_install_fake('settings', SettingsManager=FakeSettingsManager)
+_install_fake('roll_parser', parse_roll_number=fake_parse_roll_number, get_shift=fake_get_shift,
+              get_program=fake_get_program, get_academic_year_info=fake_get_academic_year_info)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run a test in an empty directory (the modules use relative file paths)."""
+    monkeypatch.chdir(tmp_path)
+    from settings_snapshot import reload_settings
+    from status_table import get_status_table
+    reload_settings()
+    get_status_table().clear()
+    yield tmp_path
+    get_status_table().clear()
+
+
+@pytest.fixture
+def write_settings(workdir):
+    """Write settings.json in the test directory and reload the shared snapshot."""
+    from settings_snapshot import reload_settings
+
+    def write(**values):
+        with open(workdir / 'settings.json', 'w') as f:
+            json.dump(values, f)
+        return reload_settings()
+
+    yield write
+    if (workdir / 'settings.json').exists():
+        os.remove(workdir / 'settings.json')
+    reload_settings()
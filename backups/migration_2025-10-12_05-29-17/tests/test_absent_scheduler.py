@@ -0,0 +1,142 @@
+"""
+Tests for absent-marking deadlines, catch-up and working days
+"""
+
+from datetime import date, datetime
+import pytest
+import pytz
+
+from absent_scheduler import AbsentScheduler
+
+TIMEZONE = pytz.timezone('Asia/Karachi')
+
+# 2026-10-12 is a Monday
+MONDAY = date(2026, 10, 12)
+
+
+def at(day, clock):
+    return TIMEZONE.localize(datetime.combine(day, datetime.strptime(clock, '%H:%M').time()))
+
+
+class Marker:
+    """mark_function that records its passes and can be made to fail"""
+
+    def __init__(self):
+        self.passes = []
+        self.fail = False
+
+    def __call__(self, shift, day):
+        if self.fail:
+            raise RuntimeError('database locked')
+        self.passes.append((shift, day))
+        return 1
+
+
+@pytest.fixture
+def marker():
+    return Marker()
+
+
+@pytest.fixture
+def scheduler(workdir, marker):
+    return AbsentScheduler(marker, 'Asia/Karachi', state_file='absent_state.json')
+
+
+def test_deadline_is_shift_start_plus_grace(scheduler, write_settings):
+    assert scheduler.deadline('Morning', MONDAY) == at(MONDAY, '11:00')
+    assert scheduler.deadline('Evening', MONDAY) == at(MONDAY, '17:00')
+
+    write_settings(absent_after_minutes=30)
+    assert scheduler.deadline('Morning', MONDAY) == at(MONDAY, '09:30')
+
+
+def test_first_run_marks_only_today_after_deadline(scheduler, marker):
+    assert scheduler.due_passes(at(MONDAY, '10:59')) == []
+
+    assert scheduler.run_due(at(MONDAY, '11:00')) == 1
+    assert marker.passes == [('Morning', MONDAY)]
+    # The pass is not repeated
+    assert scheduler.run_due(at(MONDAY, '12:00')) == 0
+
+    scheduler.run_due(at(MONDAY, '17:30'))
+    assert marker.passes == [('Morning', MONDAY), ('Evening', MONDAY)]
+    assert scheduler.last_run('Morning') == scheduler.last_run('Evening') == MONDAY
+
+
+def test_catch_up_is_limited_to_catchup_days(scheduler, marker, write_settings):
+    write_settings(absent_catchup_days=2)
+    scheduler._set_last_run('Morning', date(2026, 10, 5))
+    scheduler._set_last_run('Evening', date(2026, 10, 15))
+
+    scheduler.run_due(at(date(2026, 10, 15), '12:00'))
+
+    assert marker.passes == [('Morning', date(2026, 10, 13)), ('Morning', date(2026, 10, 14)),
+                             ('Morning', date(2026, 10, 15))]
+    assert scheduler.last_run('Morning') == date(2026, 10, 15)
+
+
+def test_failed_pass_is_retried(scheduler, marker):
+    marker.fail = True
+    assert scheduler.run_due(at(MONDAY, '11:30')) == 0
+    assert scheduler.last_run('Morning') is None
+
+    marker.fail = False
+    assert scheduler.run_due(at(MONDAY, '11:31')) == 1
+    assert scheduler.last_run('Morning') == MONDAY
+
+
+def test_weekends_and_holidays_are_skipped(scheduler, marker, write_settings):
+    write_settings(holidays=['2026-10-16'], absent_catchup_days=7)
+    scheduler._set_last_run('Morning', date(2026, 10, 15))
+    scheduler._set_last_run('Evening', date(2026, 10, 20))
+
+    # Friday is a holiday and the weekend is not a working day
+    scheduler.run_due(at(date(2026, 10, 19), '12:00'))
+
+    assert marker.passes == [('Morning', date(2026, 10, 19))]
+
+
+def test_next_deadline_moves_past_non_working_days(scheduler, write_settings):
+    write_settings(holidays=['2026-10-19'])
+    friday_evening = at(date(2026, 10, 16), '18:00')
+    scheduler.run_due(friday_evening)
+
+    deadlines = sorted(scheduler._next_deadlines(friday_evening))
+
+    assert [(shift, day) for _, shift, day in deadlines] == [('Morning', date(2026, 10, 20)),
+                                                             ('Evening', date(2026, 10, 20))]
+
+
+def test_working_days_setting(scheduler, write_settings):
+    write_settings(working_days=['monday', 5])
+
+    assert scheduler.is_working_day(MONDAY)
+    assert scheduler.is_working_day(date(2026, 10, 17))
+    assert not scheduler.is_working_day(date(2026, 10, 13))
+
+
+def test_shift_start_listeners_run_before_each_check_in_window(scheduler):
+    starts = []
+    scheduler.add_shift_start_listener(lambda shift, day: starts.append((shift, day)))
+    # Starts that passed before the first check are left to the startup warm-up
+    assert scheduler.run_shift_starts(at(MONDAY, '10:00')) == 0
+
+    assert scheduler.run_shift_starts(at(MONDAY, '14:54')) == 0
+    assert scheduler.run_shift_starts(at(MONDAY, '14:55')) == 1
+    assert scheduler.run_shift_starts(at(MONDAY, '16:00')) == 0
+
+    # Tuesday's morning start
+    scheduler.run_shift_starts(at(date(2026, 10, 13), '09:00'))
+    assert starts == [('Evening', MONDAY), ('Morning', date(2026, 10, 13))]
+
+
+def test_shift_starts_skip_non_working_days_and_listener_errors(scheduler, write_settings):
+    write_settings(status_warm_up_lead_minutes=0)
+    starts = []
+    scheduler.add_shift_start_listener(lambda shift, day: 1 / 0)
+    scheduler.add_shift_start_listener(lambda shift, day: starts.append((shift, day)))
+    scheduler.run_shift_starts(at(date(2026, 10, 16), '18:00'))
+
+    scheduler.run_shift_starts(at(date(2026, 10, 19), '09:00'))
+
+    assert starts == [('Morning', date(2026, 10, 19))]
@@ -0,0 +1,108 @@
+"""
+Tests for the versioned delta exchange with the admin panel
+"""
+
+import json
+import pytest
+
+import sync_manager
+from student_directory import get_student_directory
+
+
+class OnlineMonitor:
+    def is_website_online(self):
+        return True
+
+
+@pytest.fixture
+def manager(workdir, monkeypatch):
+    monkeypatch.setattr(sync_manager, 'get_connectivity_monitor', lambda: OnlineMonitor())
+    get_student_directory().save({'24-SWT-01': {'name': 'A'}, '24-SWT-02': {'name': 'B'}})
+    return sync_manager.SyncManager()
+
+
+def add_row(manager, student_id, timestamp):
+    manager.get_store().add_record({'ID': student_id, 'Name': 'A', 'Timestamp': timestamp, 'Status': 'Present',
+                                    'Shift': 'Morning', 'Program': 'SWT'})
+
+
+def read_export(manager):
+    with open(manager.ADMIN_EXPORT_FILE) as f:
+        return json.load(f)
+
+
+def acknowledge(manager, version):
+    with open(manager.ADMIN_ACK_FILE, 'w') as f:
+        json.dump({'version': version}, f)
+
+
+def test_unchanged_export_is_not_rewritten(manager, monkeypatch):
+    add_row(manager, '24-SWT-01', '2026-10-12 09:05:00')
+    assert manager.push_to_admin()
+
+    export = read_export(manager)
+    assert export['version'] == 1 and export['base_version'] == 0 and export['origin'] == 'local'
+    assert len(export['students']) == 2 and len(export['attendance']) == 1
+
+    monkeypatch.setattr(sync_manager.os, 'replace', lambda *args: pytest.fail('export rewritten'))
+    assert manager.push_to_admin()
+
+
+def test_exports_hold_every_change_since_the_acknowledged_one(manager):
+    add_row(manager, '24-SWT-01', '2026-10-12 09:05:00')
+    manager.push_to_admin()
+    add_row(manager, '24-SWT-02', '2026-10-12 09:10:00')
+
+    manager.push_to_admin()
+
+    # Version 1 was never acknowledged, so version 2 repeats its rows
+    export = read_export(manager)
+    assert export['version'] == 2 and len(export['attendance']) == 2
+
+    acknowledge(manager, 2)
+    add_row(manager, '24-SWT-01', '2026-10-13 09:05:00')
+    directory = get_student_directory()
+    students = directory.copy()
+    students['24-SWT-02']['phone'] = '0300'
+    directory.save(students)
+
+    manager.push_to_admin()
+
+    export = read_export(manager)
+    assert export['version'] == 3 and export['base_version'] == 2
+    assert [row['Timestamp'] for row in export['attendance']] == ['2026-10-13 09:05:00']
+    assert [student['student_id'] for student in export['students']] == ['24-SWT-02']
+    assert list(manager.get_sync_state().get('admin_exports')) == ['3']
+
+
+def test_unknown_ack_versions_are_ignored(manager):
+    add_row(manager, '24-SWT-01', '2026-10-12 09:05:00')
+    manager.push_to_admin()
+    acknowledge(manager, 7)
+
+    manager.push_to_admin()
+
+    assert manager.get_sync_state().get('admin_acked_version', 0) == 0
+
+
+def test_admin_changes_are_upserted_and_merged_once(manager):
+    add_row(manager, '24-SWT-01', '2026-10-12 09:05:00')
+    sync_data = {
+        'version': 4,
+        'students': [{'student_id': '24-SWT-03', 'name': 'C', 'email': 'c@example.com'}],
+        'attendance': [
+            {'student_id': '24-SWT-01', 'student_name': 'A', 'timestamp': '2026-10-12 09:05:00', 'status': 'Present'},
+            {'student_id': '24-SWT-03', 'student_name': 'C', 'timestamp': '2026-10-12 09:20:00', 'status': 'Present'},
+        ],
+    }
+    with open(manager.SYNC_DATA_FILE, 'w') as f:
+        json.dump(sync_data, f)
+
+    assert manager.apply_admin_changes()
+
+    assert get_student_directory().get('24-SWT-03')['email'] == 'c@example.com'
+    assert get_student_directory().get('24-SWT-01') == {'name': 'A'}
+    assert manager.get_store().count() == 2
+    assert manager.get_sync_state().get('admin_applied_version') == 4
+    # The file was consumed
+    assert not manager.apply_admin_changes()
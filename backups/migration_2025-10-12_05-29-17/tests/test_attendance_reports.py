@@ -0,0 +1,109 @@
+"""
+Tests for whole-roster attendance reports
+"""
+
+import csv
+import json
+import pytest
+
+from attendance_store import AttendanceStore
+from attendance_reports import AttendanceReport, REPORT_COLUMNS, export_report
+
+STUDENTS = {
+    '24-SWT-01': {'name': 'A', 'program': 'SWT', 'shift': 'Morning', 'current_year': 3},
+    '24-SWT-02': {'name': 'B', 'program': 'SWT', 'shift': 'Morning', 'current_year': 3},
+    '24-ECIT-03': {'name': 'C', 'program': 'CIT', 'shift': 'Evening', 'current_year': 3},
+}
+
+
+def record(student_id, timestamp, status):
+    return {'ID': student_id, 'Name': STUDENTS[student_id]['name'], 'Timestamp': timestamp, 'Status': status,
+            'Shift': STUDENTS[student_id]['shift'], 'Program': STUDENTS[student_id]['program']}
+
+
+@pytest.fixture
+def store(workdir):
+    return AttendanceStore(str(workdir / 'attendance_local.db'), None, str(workdir / 'attendance_archive'))
+
+
+@pytest.fixture
+def report(store):
+    return AttendanceReport(store, STUDENTS, 'Asia/Karachi')
+
+
+def student_row(report, student_id, **filters):
+    return next(row for row in report.iter_rows(**filters) if row['student_id'] == student_id)
+
+
+def test_late_threshold_is_read_at_use_time(report, store, write_settings):
+    # Monday; the morning check-in window opens at 09:00
+    store.add_record(record('24-SWT-01', '2026-10-12 09:20:00', 'Present'))
+    assert student_row(report, '24-SWT-01')['late_arrivals'] == 1
+
+    write_settings(late_after_minutes=30)
+
+    assert report.late_after_minutes == 30
+    assert student_row(report, '24-SWT-01')['late_arrivals'] == 0
+
+
+@pytest.fixture
+def week(store):
+    """Monday 2026-10-12 to Friday 2026-10-16"""
+    store.add_records([
+        record('24-SWT-01', '2026-10-12 09:05:00', 'Present'),
+        # Later than the 15 minute grace
+        record('24-SWT-01', '2026-10-13 09:30:00', 'Present'),
+        record('24-SWT-01', '2026-10-14 11:00:00', 'Absent'),
+        record('24-SWT-01', '2026-10-15 09:00:00', 'Present'),
+        record('24-SWT-01', '2026-10-16 09:10:00', 'Present'),
+        record('24-SWT-02', '2026-10-12 11:00:00', 'Absent'),
+        record('24-SWT-02', '2026-10-13 11:00:00', 'Absent'),
+        # A check-in counts even when the student was also marked absent
+        record('24-SWT-02', '2026-10-14 11:00:00', 'Absent'),
+        record('24-SWT-02', '2026-10-14 09:02:00', 'Check-in'),
+    ])
+    return store
+
+
+def test_metrics_per_student(report, week):
+    rows = {row['student_id']: row for row in report.iter_rows()}
+
+    assert rows['24-SWT-01'] == {
+        'student_id': '24-SWT-01', 'name': 'A', 'program': 'SWT', 'shift': 'Morning', 'year': 3,
+        'days_present': 4, 'days_absent': 1, 'days_total': 5, 'percentage': 80.0,
+        'late_arrivals': 1, 'current_streak': 2, 'longest_streak': 2, 'absent_streak': 0,
+    }
+    second = rows['24-SWT-02']
+    assert (second['days_present'], second['days_absent'], second['percentage']) == (1, 2, 33.3)
+    assert (second['current_streak'], second['absent_streak'], second['late_arrivals']) == (1, 0, 0)
+    # No recorded days
+    assert rows['24-ECIT-03']['percentage'] is None and rows['24-ECIT-03']['days_total'] == 0
+
+
+def test_date_range_limits_the_days(report, week):
+    row = student_row(report, '24-SWT-02', date_from='2026-10-12', date_to='2026-10-13')
+
+    assert (row['days_absent'], row['absent_streak'], row['percentage']) == (2, 2, 0.0)
+
+
+def test_rows_come_lowest_first_and_filter(report, week):
+    assert [row['student_id'] for row in report.iter_rows()] == ['24-SWT-02', '24-SWT-01', '24-ECIT-03']
+    assert [row['student_id'] for row in report.iter_rows(below=50)] == ['24-SWT-02']
+    assert [row['student_id'] for row in report.iter_rows(program='cit')] == ['24-ECIT-03']
+    assert [row['student_id'] for row in report.iter_rows(shift='Morning', year=3)] == ['24-SWT-02', '24-SWT-01']
+
+
+def test_export_writes_csv_and_json(report, week, workdir):
+    result = export_report(str(workdir / 'report.csv'), report, below=90)
+    assert result == {'success': True, 'path': str(workdir / 'report.csv'), 'format': 'csv', 'rows': 2,
+                      'error': None}
+    with open(workdir / 'report.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == REPORT_COLUMNS and rows[1]['percentage'] == '80.0'
+
+    assert export_report(str(workdir / 'report.json'), report)['rows'] == 3
+    with open(workdir / 'report.json') as f:
+        assert [row['student_id'] for row in json.load(f)] == ['24-SWT-02', '24-SWT-01', '24-ECIT-03']
+
+    result = export_report(str(workdir / 'report.txt'), report)
+    assert not result['success'] and result['error'] == 'Output file must end in .csv or .json'
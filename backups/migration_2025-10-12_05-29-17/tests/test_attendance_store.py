@@ -0,0 +1,223 @@
+"""
+Tests for the SQLite attendance store
+"""
+
+import csv
+import pytest
+
+from attendance_store import AttendanceStore, RECORD_FIELDS
+
+
+def record(student_id, timestamp, status, name='A', shift='Morning', program='SWT'):
+    return {'ID': student_id, 'Name': name, 'Timestamp': timestamp, 'Status': status,
+            'Shift': shift, 'Program': program}
+
+
+@pytest.fixture
+def store(workdir):
+    return AttendanceStore(str(workdir / 'attendance_local.db'), None, str(workdir / 'attendance_archive'))
+
+
+def test_queries_filter_by_student_date_and_status(store):
+    store.add_records([
+        record('24-SWT-01', '2026-10-12 09:05:00', 'Check-in'),
+        record('24-SWT-01', '2026-10-13 09:05:00', 'Present'),
+        record('24-SWT-02', '2026-10-12 10:30:00', 'Present', name='B'),
+        record('24-SWT-03', '2026-10-12 11:00:00', 'Absent', name='C'),
+    ])
+
+    assert [r['Timestamp'] for r in store.get_records('24-SWT-01')] == ['2026-10-12 09:05:00',
+                                                                         '2026-10-13 09:05:00']
+    assert [r['ID'] for r in store.get_records(date='2026-10-12', status='Present')] == ['24-SWT-02']
+    assert len(store.get_records(date_from='2026-10-13', date_to='2026-10-31')) == 1
+    assert store.student_ids_with_status('2026-10-12', ('Present', 'Check-in')) == {'24-SWT-01', '24-SWT-02'}
+    assert store.student_ids_with_status('2026-10-12', ('Present', 'Check-in'), time_from='10:00:00') == {'24-SWT-02'}
+    assert store.get_student_name('24-SWT-02') == 'B'
+
+
+def test_first_use_imports_legacy_csv_rows(workdir):
+    with open('attendance.csv', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['ID', 'Name', 'Timestamp', 'Status'])
+        writer.writerow(['24-SWT-01', 'A', '2026-10-12 09:05:00', 'Present'])
+        writer.writerow(['24-SWT-02', 'B', '2026-10-12 11:00:00', 'Absent', 'Morning', 'True'])
+        writer.writerow(['24-SWT-03', 'C', '2026-10-12 09:10:00', 'Present', 'Morning', 'SWT', '3', '2024'])
+
+    store = AttendanceStore('attendance_local.db', 'attendance.csv', 'attendance_archive')
+
+    records = {r['ID']: r for r in store.get_records()}
+    assert store.count() == 3
+    assert records['24-SWT-02']['Auto_Marked'] == 'True' and records['24-SWT-02']['Program'] is None
+    assert records['24-SWT-03']['Program'] == 'SWT' and records['24-SWT-03']['Current_Year'] == 3
+
+    # Reopening does not import the CSV a second time
+    assert AttendanceStore('attendance_local.db', 'attendance.csv', 'attendance_archive').count() == 3
+
+
+def test_export_csv_round_trips(store, workdir):
+    store.add_records([
+        record('24-SWT-01', '2026-10-12 09:05:00', 'Present'),
+        record('24-SWT-02', '2026-10-12 11:00:00', 'Absent', name='B'),
+    ])
+
+    assert store.export_csv(str(workdir / 'export.csv')) == 2
+
+    with open(workdir / 'export.csv', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == RECORD_FIELDS
+    copy = AttendanceStore(str(workdir / 'copy.db'), str(workdir / 'export.csv'), str(workdir / 'archive2'))
+    assert [r['ID'] for r in copy.get_records()] == ['24-SWT-01', '24-SWT-02']
+
+
+def test_merge_skips_stored_and_repeated_records(store):
+    store.add_record(record('24-SWT-01', '2026-10-12 09:05:00', 'Check-in'))
+
+    inserted = store.merge_records([
+        record('24-SWT-01', '2026-10-12 09:05:00', 'Check-in'),
+        # Website format for the same row
+        {'student_id': '24-SWT-01', 'student_name': 'A', 'timestamp': '2026-10-12 09:05:00',
+         'status': 'Check-in'},
+        record('24-SWT-02', '2026-10-12 09:10:00', 'Check-in', name='B'),
+        record('24-SWT-02', '2026-10-12 09:10:00', 'Check-in', name='B'),
+    ])
+
+    assert [r['ID'] for r in inserted] == ['24-SWT-02']
+    assert store.count() == 2
+    assert store.merge_records(inserted) == []
+
+
+def test_merge_keeps_records_that_differ_in_status(store):
+    store.add_record(record('24-SWT-01', '2026-10-12 09:05:00', 'Check-in'))
+
+    inserted = store.merge_records([record('24-SWT-01', '2026-10-12 09:05:00', 'Present')])
+
+    assert len(inserted) == 1 and store.count() == 2
+
+
+def test_dedup_index_is_rebuilt_for_older_stores(store, workdir):
+    store.add_record(record('24-SWT-01', '2026-10-12 09:05:00', 'Present'))
+    conn = store._connect()
+    with conn:
+        conn.execute("DELETE FROM attendance_keys")
+
+    reopened = AttendanceStore(str(workdir / 'attendance_local.db'), None, str(workdir / 'attendance_archive'))
+
+    assert reopened.merge_records([record('24-SWT-01', '2026-10-12 09:05:00', 'Present')]) == []
+
+
+def test_archive_round_trip(store):
+    pytest.importorskip('pyarrow')
+    rows = [
+        record('24-SWT-01', '2026-10-12 09:05:00', 'Present'),
+        record('24-SWT-02', '2026-10-12 09:10:00', 'Absent', name='B'),
+        record('24-SWT-01', '2026-10-13 09:05:00', 'Present'),
+    ]
+    store.add_records(rows)
+    before = store.get_records()
+
+    store.compact_partitions('2026-10-13')
+
+    # Only the day before the cutoff moved; it has no rows left in the row store
+    assert [p['date'] for p in store.archived_partitions()] == ['2026-10-12']
+    assert store.archive_partition('2026-10-12') == 0
+    assert store.partition_stats()['hot_rows'] == 1
+    assert store.count() == 3
+    assert store.get_records() == before
+    assert [r['ID'] for r in store.get_records(date='2026-10-12', status='Absent')] == ['24-SWT-02']
+    assert store.status_counts(date_from='2026-10-12', date_to='2026-10-12') == {'Present': 1, 'Absent': 1}
+    assert store.student_ids_with_status('2026-10-12', 'Present') == {'24-SWT-01'}
+    assert [date for date, _ in store.iter_days()] == ['2026-10-12', '2026-10-13']
+    # Archived rows are still deduplicated
+    assert store.merge_records(rows) == []
+
+
+def test_archiving_a_day_again_merges_late_rows(store):
+    pytest.importorskip('pyarrow')
+    store.add_record(record('24-SWT-01', '2026-10-12 09:05:00', 'Present'))
+    store.archive_partition('2026-10-12')
+
+    store.add_record(record('24-SWT-02', '2026-10-12 09:10:00', 'Present', name='B'))
+    assert store.archive_partition('2026-10-12') == 1
+
+    partitions = store.archived_partitions()
+    assert len(partitions) == 1 and partitions[0]['rows'] == 2
+    assert [r['ID'] for r in store.get_records(date='2026-10-12')] == ['24-SWT-01', '24-SWT-02']
+
+
+def test_counters_match_ranged_counts(store):
+    store.add_records([
+        record('24-SWT-01', '2026-10-12 09:05:00', 'Present'),
+        record('24-SWT-01', '2026-10-13 09:05:00', 'Absent'),
+        record('24-SWT-02', '2026-10-12 15:10:00', 'Present', name='B', shift='Evening', program='CIT'),
+    ])
+    store.merge_records([record('24-SWT-01', '2026-10-14 09:01:00', 'Present')])
+
+    ranged = store.status_counts(date_from='2026-01-01', date_to='2026-12-31')
+    assert store.status_counts() == ranged == {'Present': 3, 'Absent': 1}
+    assert store.status_counts('24-SWT-01') == {'Present': 2, 'Absent': 1}
+    assert store.student_status_counts() == store.student_status_counts('2026-01-01', '2026-12-31')
+    assert store.group_status_counts('shift') == {'Evening': {'Present': 1},
+                                                  'Morning': {'Absent': 1, 'Present': 2}}
+    assert store.group_status_counts('program') == {'CIT': {'Present': 1},
+                                                    'SWT': {'Absent': 1, 'Present': 2}}
+
+    # Rebuilding from the records gives the same counters
+    store.rebuild_counters()
+    assert store.status_counts() == ranged
+
+
+def test_counters_survive_archiving_and_replace_all(store):
+    store.add_records([
+        record('24-SWT-01', '2026-10-12 09:05:00', 'Present'),
+        record('24-SWT-02', '2026-10-12 11:00:00', 'Absent', name='B'),
+    ])
+    store.compact_partitions('2026-10-13')
+    assert store.status_counts() == {'Present': 1, 'Absent': 1}
+
+    store.replace_all([record('24-SWT-03', '2026-10-14 09:00:00', 'Present', name='C')])
+
+    assert store.status_counts() == {'Present': 1}
+    assert list(store.student_status_counts()) == [('24-SWT-03', 'C')]
+
+
+def test_group_counts_reject_unknown_groups(store):
+    with pytest.raises(ValueError):
+        store.group_status_counts('student_name')
+
+
+def test_apply_check_outs_updates_check_in_rows(store):
+    store.add_record(record('24-SWT-01', '2026-10-12 09:05:00', 'Check-in'))
+    website_row = {'student_id': '24-SWT-01', 'student_name': 'A',
+                   'timestamp': '2026-10-12 09:05:00', 'status': 'Present'}
+
+    applied = store.apply_check_outs([website_row])
+
+    assert len(applied) == 1
+    assert [r['Status'] for r in store.get_records('24-SWT-01')] == ['Present']
+    assert store.status_counts() == {'Present': 1}
+    # The pulled row is now known, so merging it adds nothing
+    assert store.merge_records([website_row]) == []
+    assert store.apply_check_outs([website_row]) == []
+
+
+def test_apply_check_outs_merges_a_local_check_out(store):
+    # A check-out made on this machine saves its own Present row
+    store.add_records([
+        record('24-SWT-01', '2026-10-12 09:05:00', 'Check-in'),
+        record('24-SWT-01', '2026-10-12 12:30:00', 'Present'),
+        record('24-SWT-02', '2026-10-12 09:10:00', 'Check-in', name='B'),
+    ])
+    website_row = {'student_id': '24-SWT-01', 'student_name': 'A',
+                   'timestamp': '2026-10-12 09:05:00', 'status': 'Present'}
+
+    store.apply_check_outs([website_row])
+    store.merge_records([website_row])
+
+    assert [(r['ID'], r['Timestamp'], r['Status']) for r in store.get_records()] == [
+        ('24-SWT-01', '2026-10-12 09:05:00', 'Present'),
+        ('24-SWT-02', '2026-10-12 09:10:00', 'Check-in'),
+    ]
+    assert store.status_counts('24-SWT-01') == {'Present': 1}
+    assert store.status_counts() == store.status_counts(date_from='2026-10-12', date_to='2026-10-12')
+    # Re-pulling the local check-out row does not bring it back
+    assert store.merge_records([record('24-SWT-01', '2026-10-12 12:30:00', 'Present')]) == []
@@ -0,0 +1,112 @@
+"""
+Tests for the cached connectivity state and what the HTTP client reports to it
+"""
+
+import pytest
+import requests
+
+import http_client
+from connectivity import ConnectivityMonitor, ONLINE, OFFLINE
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+@pytest.fixture
+def monitor(workdir, monkeypatch):
+    monitor = ConnectivityMonitor('http://site', '/api')
+    probes = []
+
+    def probe_website():
+        probes.append('website')
+        return True
+
+    monkeypatch.setattr(monitor, '_probe_website', probe_website)
+    monkeypatch.setattr(monitor, '_probe_internet', lambda: True)
+    monitor.probes = probes
+    monitor.changes = []
+    monitor.add_listener(monitor.changes.append)
+    return monitor
+
+
+def test_first_read_probes_once_then_uses_cached_state(monitor):
+    assert monitor.get_state() == ONLINE
+    assert monitor.is_website_online() and monitor.is_internet_online()
+    assert monitor.probes == ['website']
+
+
+def test_reports_flip_the_state_and_notify_listeners(monitor):
+    monitor.probe()
+
+    monitor.report_failure()
+    monitor.report_failure()
+    assert monitor.get_state() == OFFLINE
+
+    monitor.report_success()
+    assert monitor.get_state() == ONLINE
+    # One notification per change, not per report
+    assert monitor.changes == [False, True]
+    assert monitor.probes == ['website']
+
+
+def test_failure_restarts_the_probe_backoff(monitor, write_settings):
+    write_settings(connectivity_min_backoff_seconds=2)
+    monitor.probe()
+    monitor._backoff = 64
+
+    monitor.report_failure()
+
+    assert monitor.get_status()['next_backoff_seconds'] == 2
+    assert monitor._wake.is_set()
+
+
+def test_listener_errors_do_not_stop_other_listeners(monitor):
+    monitor.probe()
+    monitor.add_listener(lambda online: 1 / 0)
+    seen = []
+    monitor.add_listener(seen.append)
+
+    monitor.report_failure()
+
+    assert seen == [False]
+
+
+@pytest.fixture
+def client(monitor, monkeypatch):
+    monitor.probe()
+    monkeypatch.setattr(http_client, 'get_connectivity_monitor', lambda: monitor)
+    return http_client.HttpClient()
+
+
+@pytest.mark.parametrize('error', [requests.exceptions.ReadTimeout, requests.exceptions.ConnectTimeout,
+                                   requests.exceptions.ConnectionError])
+def test_client_reports_timeouts_and_connection_errors(client, monitor, monkeypatch, error):
+    def hang(*args, **kwargs):
+        raise error('no answer')
+
+    monkeypatch.setattr(client.session, 'request', hang)
+
+    with pytest.raises(error):
+        client.get('http://site/api', endpoint='checkin')
+
+    assert monitor.get_state() == OFFLINE
+    assert client.get_metrics()['endpoints']['checkin']['failures'] == 1
+
+
+@pytest.mark.parametrize('status, state', [(500, OFFLINE), (503, OFFLINE), (404, ONLINE), (200, ONLINE)])
+def test_client_reports_server_errors(client, monitor, monkeypatch, status, state):
+    monkeypatch.setattr(client.session, 'request', lambda *args, **kwargs: FakeResponse(status))
+
+    assert client.get('http://site/api').status_code == status
+
+    assert monitor.get_state() == state
+
+
+def test_probe_requests_are_not_reported(client, monitor, monkeypatch):
+    monkeypatch.setattr(client.session, 'request', lambda *args, **kwargs: FakeResponse(500))
+
+    client.get('http://site', endpoint='probe', report=False)
+
+    assert monitor.get_state() == ONLINE
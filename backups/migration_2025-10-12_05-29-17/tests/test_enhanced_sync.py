@@ -0,0 +1,106 @@
+"""
+Tests for the concurrent phases of the enhanced bidirectional sync
+"""
+
+import threading
+import pytest
+
+import sync_manager
+
+
+class CountingMonitor:
+    def __init__(self):
+        self.checks = 0
+
+    def is_website_online(self):
+        self.checks += 1
+        return True
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    monitor = CountingMonitor()
+    monkeypatch.setattr(sync_manager, 'get_connectivity_monitor', lambda: monitor)
+    return monitor
+
+
+@pytest.fixture
+def manager(workdir, monitor, monkeypatch):
+    manager = sync_manager.SyncManager()
+    manager.events = []
+    manager.logs = []
+    monkeypatch.setattr(manager, 'get_client_ip', lambda: '127.0.0.1')
+    monkeypatch.setattr(manager, 'log_sync_activity', lambda sync_log: manager.logs.append(sync_log) or True)
+    return manager
+
+
+def phase(manager, name, result=True, wait_for=None, records=None):
+    """Fake phase that records when it ran and which phases it saw finished."""
+    def run():
+        manager.events.append(f"{name} started")
+        assert manager.check_website_connection()
+        if wait_for is not None:
+            assert wait_for.wait(5), f"{name} was not run concurrently"
+        if records:
+            setattr(manager, records[0], records[1])
+        manager.events.append(f"{name} done")
+        return result
+    return run
+
+
+def test_upload_runs_alongside_the_admin_chain(manager, monitor, monkeypatch):
+    admin_started = threading.Event()
+
+    def apply_admin_changes():
+        admin_started.set()
+        manager.events.append('apply_admin_changes done')
+        return True
+
+    # The upload only finishes once the admin changes have started
+    monkeypatch.setattr(manager, 'sync_to_website',
+                        phase(manager, 'upload', wait_for=admin_started, records=('last_uploaded', 3)))
+    monkeypatch.setattr(manager, 'reconcile_offline_checkins', lambda: {'success': True})
+    monkeypatch.setattr(manager, 'apply_admin_changes', apply_admin_changes)
+    monkeypatch.setattr(manager, 'sync_from_website', phase(manager, 'pull', records=('last_pulled', 2)))
+    monkeypatch.setattr(manager, 'push_to_admin', phase(manager, 'push'))
+
+    manager.enhanced_bidirectional_sync()
+
+    events = manager.events
+    # Pull and push wait for the admin changes they depend on
+    assert events.index('apply_admin_changes done') < events.index('pull started')
+    assert events.index('apply_admin_changes done') < events.index('push started')
+    assert 'upload done' in events
+    # One connectivity check for the whole cycle
+    assert monitor.checks == 1
+    assert manager._cycle_website_online is None and not manager.is_syncing
+
+    sync_log = manager.logs[-1]
+    assert sync_log['status'] == 'success' and sync_log['records_processed'] == 6
+    assert set(sync_log['phase_timings_ms']) == {'sync_to_website', 'reconcile_offline_checkins',
+                                                 'apply_admin_changes', 'sync_from_website', 'push_to_admin'}
+
+
+def test_a_failing_phase_does_not_stop_the_others(manager, monkeypatch):
+    def fail():
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(manager, 'sync_to_website', fail)
+    monkeypatch.setattr(manager, 'reconcile_offline_checkins', lambda: {'success': False})
+    monkeypatch.setattr(manager, 'apply_admin_changes', lambda: False)
+    monkeypatch.setattr(manager, 'sync_from_website', phase(manager, 'pull', records=('last_pulled', 1)))
+    monkeypatch.setattr(manager, 'push_to_admin', phase(manager, 'push'))
+
+    manager.enhanced_bidirectional_sync()
+
+    assert 'pull done' in manager.events and 'push done' in manager.events
+    assert manager.logs[-1]['records_processed'] == 1
+
+
+def test_overlapping_cycles_are_skipped(manager, monkeypatch):
+    manager.is_syncing = True
+    monkeypatch.setattr(manager, 'sync_to_website', phase(manager, 'upload'))
+
+    manager.enhanced_bidirectional_sync()
+
+    assert manager.events == [] and manager.logs == []
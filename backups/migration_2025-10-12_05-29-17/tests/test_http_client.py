@@ -0,0 +1,89 @@
+"""
+Tests for the shared pooled HTTP client
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+import http_client
+from http_client import HttpClient, get_http_client
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"success": true}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(workdir):
+    return HttpClient()
+
+
+def test_timeouts_per_endpoint_follow_settings(client, write_settings, monkeypatch):
+    assert client.get_timeout('probe') == 5
+    assert client.get_timeout('unknown') == 10
+
+    write_settings(http_timeouts={'checkin': 4, 'default': 7})
+
+    assert client.get_timeout('checkin') == 4 and client.get_timeout('unknown') == 7
+    sent = []
+
+    def request(method, url, timeout, **kwargs):
+        sent.append(timeout)
+        return FakeResponse(200)
+
+    monkeypatch.setattr(client.session, 'request', request)
+    monkeypatch.setattr(http_client, 'get_connectivity_monitor', lambda: pytest.fail('reported'))
+    client.get('http://site', endpoint='checkin', report=False)
+    client.get('http://site', endpoint='checkin', timeout=1, report=False)
+    assert sent == [4, 1]
+
+
+def test_pool_is_remounted_only_when_its_size_changes(client, write_settings):
+    adapter = client.adapter
+    write_settings(http_timeouts={'checkin': 4})
+    assert client.adapter is adapter
+
+    write_settings(http_pool_maxsize=3)
+
+    assert client.pool_size == 3 and client.adapter is not adapter
+    assert client.session.get_adapter('https://site') is client.adapter
+
+
+def test_requests_reuse_pooled_connections(client, server):
+    for _ in range(3):
+        assert client.get(f"{server}/api", endpoint='attendance', report=False).status_code == 200
+
+    metrics = client.get_metrics()
+    assert metrics['requests'] == 3
+    assert metrics['connections_opened'] == 1 and metrics['connections_reused'] == 2
+    assert metrics['endpoints']['attendance']['failures'] == 0
+
+
+def test_client_is_shared(workdir):
+    assert get_http_client() is get_http_client()
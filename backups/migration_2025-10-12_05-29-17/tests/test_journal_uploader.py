@@ -0,0 +1,119 @@
+"""
+Tests for chunked journal uploads
+"""
+
+import pytest
+
+import journal_uploader
+import sync_manager
+from scan_journal import ScanJournal, FSYNC_ALWAYS
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeClient:
+    """Answers posts from a list of status codes; an exception entry is raised"""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.posts = []
+
+    def post(self, url, endpoint=None, json=None, headers=None):
+        self.posts.append({'url': url, 'json': json, 'headers': headers})
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return FakeResponse(answer, 'server error' if answer != 200 else '')
+
+
+def scan(n):
+    return {'ID': f'24-SWT-{n:02d}', 'Timestamp': f'2026-10-12 09:{n:02d}:00', 'Status': 'Check-in'}
+
+
+@pytest.fixture
+def journal(workdir):
+    journal = ScanJournal('journal.jsonl', legacy_file=None, fsync_policy=FSYNC_ALWAYS)
+    journal.append_many([scan(n) for n in range(1, 8)])
+    return journal
+
+
+def use_client(monkeypatch, client):
+    monkeypatch.setattr(journal_uploader, 'get_http_client', lambda: client)
+    return client
+
+
+def test_uploads_in_chunks(journal, monkeypatch):
+    client = use_client(monkeypatch, FakeClient([200, 200, 200]))
+
+    result = journal_uploader.upload_journal(journal, 'http://site/api', 'key', chunk_size=3)
+
+    assert result == {'success': True, 'uploaded': 7, 'chunks': 3, 'remaining': 0, 'error': None}
+    assert [len(post['json']['attendance_data']) for post in client.posts] == [3, 3, 1]
+    assert all(post['json']['api_key'] == 'key' for post in client.posts)
+
+
+def test_failed_chunk_keeps_acknowledged_chunks(journal, monkeypatch):
+    use_client(monkeypatch, FakeClient([200, 500]))
+
+    result = journal_uploader.upload_journal(journal, 'http://site/api', 'key', chunk_size=3)
+
+    assert not result['success'] and result['error'].startswith('500')
+    assert result['uploaded'] == 3 and result['chunks'] == 1 and result['remaining'] == 4
+    assert [record['ID'] for _, record in journal.read_pending(limit=1)] == ['24-SWT-04']
+
+
+def test_resend_after_failure_uses_same_idempotency_keys(journal, monkeypatch):
+    failing = use_client(monkeypatch, FakeClient([200, ConnectionError('reset')]))
+    result = journal_uploader.upload_journal(journal, 'http://site/api', 'key', chunk_size=3)
+    assert result['error'] == 'reset' and result['remaining'] == 4
+
+    retry = use_client(monkeypatch, FakeClient([200, 200]))
+    result = journal_uploader.upload_journal(journal, 'http://site/api', 'key', chunk_size=3)
+
+    assert result['success'] and result['uploaded'] == 4 and result['remaining'] == 0
+    assert retry.posts[0]['headers'] == failing.posts[1]['headers']
+    assert [r['idempotency_key'] for r in retry.posts[0]['json']['attendance_data']] == \
+        [r['idempotency_key'] for r in failing.posts[1]['json']['attendance_data']]
+
+
+def test_max_chunks_stops_early(journal, monkeypatch):
+    use_client(monkeypatch, FakeClient([200]))
+
+    result = journal_uploader.upload_journal(journal, 'http://site/api', 'key', chunk_size=2, max_chunks=1)
+
+    assert result['success'] and result['uploaded'] == 2 and result['remaining'] == 5
+
+
+class OnlineMonitor:
+    def is_website_online(self):
+        return True
+
+
+@pytest.fixture
+def manager(workdir, monkeypatch):
+    monkeypatch.setattr(sync_manager, 'get_connectivity_monitor', lambda: OnlineMonitor())
+    manager = sync_manager.SyncManager()
+    manager.get_journal().append_many([scan(n) for n in range(1, 4)])
+    return manager
+
+
+def test_sync_to_website_sends_only_upload_chunks(manager, monkeypatch):
+    client = use_client(monkeypatch, FakeClient([200]))
+    monkeypatch.setattr(sync_manager, 'get_http_client', lambda: client)
+
+    assert manager.sync_to_website()
+
+    assert len(client.posts) == 1
+    assert len(client.posts[0]['json']['attendance_data']) == 3
+    assert manager.last_uploaded == 3 and manager.get_journal().pending_count() == 0
+
+
+def test_sync_to_website_keeps_records_on_read_only_api(manager, monkeypatch):
+    use_client(monkeypatch, FakeClient([405]))
+
+    assert not manager.sync_to_website()
+    assert manager.get_journal().pending_count() == 3
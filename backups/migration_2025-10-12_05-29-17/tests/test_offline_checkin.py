@@ -0,0 +1,181 @@
+"""
+Tests for offline check-in decisions and their reconciliation
+"""
+
+from datetime import datetime
+import pytest
+import pytz
+
+from attendance_store import get_attendance_store
+from offline_checkin import OfflineCheckIn, REPLAYED, REJECTED
+
+STUDENT = '24-SWT-01'
+TIMEZONE = pytz.timezone('Asia/Karachi')
+
+
+def at(clock, day='2026-10-12'):
+    return TIMEZONE.localize(datetime.strptime(f"{day} {clock}", '%Y-%m-%d %H:%M:%S'))
+
+
+class FakeCheckinServer:
+    """checkin_api.php sessions and rows, with offline_replay's rules"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.rows = []
+        self.server_unreachable = False
+        self.unreachable = False
+        # Reply to every replay with this rejection instead of applying it
+        self.refusal = None
+
+    def check_in(self, student_id, timestamp):
+        self.sessions[student_id] = timestamp
+        self.rows.append({'student_id': student_id, 'timestamp': timestamp,
+                          'status': 'Check-in', 'check_out_time': None})
+
+    def check_out(self, student_id, timestamp):
+        if student_id not in self.sessions:
+            return False, {'reason': 'no_active_session', 'message': 'No active check-in session found'}
+        if self.sessions[student_id][:10] != timestamp[:10]:
+            return False, {'reason': 'session_left_open', 'message': 'Active check-in session is from an earlier day'}
+        del self.sessions[student_id]
+        for row in self.rows:
+            if row['student_id'] == student_id and row['timestamp'][:10] == timestamp[:10] \
+                    and row['status'] == 'Check-in':
+                row.update(status='Present', check_out_time=timestamp)
+        return True, {'status': 'Present'}
+
+    def replay_offline(self, decision):
+        self.server_unreachable = self.unreachable
+        if self.unreachable:
+            return False, {'reason': 'request_failed', 'message': 'Connection refused'}
+        if self.refusal is not None:
+            return False, self.refusal
+        student_id, timestamp = decision['student_id'], decision['timestamp']
+        if decision['action'] == 'check_in':
+            if student_id in self.sessions:
+                return False, {'reason': 'already_checked_in',
+                               'message': 'Student already checked in. Please check out first.'}
+            self.check_in(student_id, timestamp)
+            return True, {'status': 'Check-in'}
+        return self.check_out(student_id, timestamp)
+
+
+@pytest.fixture
+def offline(workdir):
+    return OfflineCheckIn(store=get_attendance_store(str(workdir / 'attendance_local.db'), None))
+
+
+def test_decide_checks_in_then_out_after_checkin_window(offline):
+    success, data = offline.decide(STUDENT, at('09:05:00'), 'A')
+    assert success and data['status'] == 'Check-in'
+
+    # The check-in window has closed; a check-out is still allowed
+    success, data = offline.decide(STUDENT, at('12:30:00'), 'A')
+    assert success and data['status'] == 'Present'
+    assert offline.pending_count() == 2
+
+
+def test_decide_rejects_check_in_outside_window(offline):
+    success, _ = offline.decide(STUDENT, at('11:30:00'), 'A')
+    assert not success
+    assert offline.pending_count() == 0
+
+
+def test_replay_uses_original_timestamp(offline):
+    offline.decide(STUDENT, at('09:05:00'), 'A')
+    server = FakeCheckinServer()
+
+    result = offline.reconcile(server)
+
+    assert result['success'] and result[REPLAYED] == 1 and result['remaining'] == 0
+    assert server.rows == [{'student_id': STUDENT, 'timestamp': '2026-10-12 09:05:00',
+                            'status': 'Check-in', 'check_out_time': None}]
+    # The session is open, so a later live check-out succeeds
+    assert server.sessions == {STUDENT: '2026-10-12 09:05:00'}
+    assert server.check_out(STUDENT, '2026-10-12 12:15:00')[0]
+
+
+def test_offline_pair_becomes_one_present_row(offline):
+    offline.decide(STUDENT, at('09:05:00'), 'A')
+    offline.decide(STUDENT, at('12:30:00'), 'A')
+    server = FakeCheckinServer()
+
+    result = offline.reconcile(server)
+
+    assert result[REPLAYED] == 2 and not result['conflicts']
+    assert server.rows == [{'student_id': STUDENT, 'timestamp': '2026-10-12 09:05:00',
+                            'status': 'Present', 'check_out_time': '2026-10-12 12:30:00'}]
+    assert server.sessions == {}
+
+
+def test_check_in_conflict_keeps_server_session(offline):
+    offline.decide(STUDENT, at('09:05:00'), 'A')
+    offline.decide(STUDENT, at('12:30:00'), 'A')
+    server = FakeCheckinServer()
+    server.check_in(STUDENT, '2026-10-12 09:01:00')
+
+    result = offline.reconcile(server)
+
+    assert result[REPLAYED] == 1 and result[REJECTED] == 1
+    assert [conflict['type'] for conflict in result['conflicts']] == ['already_checked_in']
+    assert offline.read_conflicts()[-1]['decision_id'] == result['conflicts'][0]['decision_id']
+    # The offline check-out closed the server's own session
+    assert server.rows[0]['status'] == 'Present' and server.sessions == {}
+
+
+def test_check_out_without_session_is_a_conflict(offline):
+    offline.status_table.set_status(STUDENT, 'Checked-in')
+    offline.decide(STUDENT, at('12:30:00'), 'A')
+
+    result = offline.reconcile(FakeCheckinServer())
+
+    assert result[REJECTED] == 1
+    assert result['conflicts'][0]['type'] == 'no_active_session'
+
+
+def test_unreachable_server_stops_and_resumes(offline):
+    offline.decide(STUDENT, at('09:05:00'), 'A')
+    offline.decide(STUDENT, at('12:30:00'), 'A')
+    server = FakeCheckinServer()
+    server.unreachable = True
+
+    result = offline.reconcile(server)
+    assert not result['success'] and result['remaining'] == 2 and not server.rows
+
+    server.unreachable = False
+    result = offline.reconcile(server)
+    assert result['success'] and result[REPLAYED] == 2 and result['remaining'] == 0
+
+
+# None: a server without the offline_replay action ("Invalid action")
+@pytest.mark.parametrize('reason', ['invalid_api_key', 'invalid_request', 'server_error', 'http_error', None])
+def test_failures_that_are_not_rulings_are_retried(offline, reason):
+    offline.decide(STUDENT, at('09:05:00'), 'A')
+    server = FakeCheckinServer()
+    server.refusal = {'reason': reason, 'message': 'Refused'}
+
+    result = offline.reconcile(server)
+
+    assert not result['success'] and result[REJECTED] == 0 and result['remaining'] == 1
+    assert not result['conflicts'] and offline.read_conflicts() == []
+
+    server.refusal = None
+    assert offline.reconcile(server)[REPLAYED] == 1
+
+
+def test_rejected_decision_removes_local_record(offline):
+    success, data = offline.decide(STUDENT, at('09:05:00'), 'A')
+    # complete_scan saves the accepted decision to the local store
+    offline.store.add_record({'ID': STUDENT, 'Name': 'A', 'Timestamp': '2026-10-12 09:05:00',
+                              'Status': data['status'], 'Shift': 'Morning', 'Program': 'SWT'})
+    offline.store.add_record({'ID': STUDENT, 'Name': 'A', 'Timestamp': '2026-10-11 09:05:00',
+                              'Status': 'Present', 'Shift': 'Morning', 'Program': 'SWT'})
+    server = FakeCheckinServer()
+    server.check_in(STUDENT, '2026-10-12 09:01:00')
+
+    result = offline.reconcile(server)
+
+    assert result[REJECTED] == 1
+    assert [r['Timestamp'] for r in offline.store.get_records(STUDENT)] == ['2026-10-11 09:05:00']
+    assert offline.store.status_counts() == {'Present': 1}
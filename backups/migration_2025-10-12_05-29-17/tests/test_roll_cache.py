@@ -0,0 +1,82 @@
+"""
+Tests for memoized and batch roll-number parsing
+"""
+
+from datetime import date
+import pandas as pd
+import pytest
+
+import roll_cache
+import roll_parser
+
+
+@pytest.fixture
+def parses(workdir, monkeypatch):
+    """Count calls to the underlying parser."""
+    calls = []
+    real_parse = roll_parser.parse_roll_number
+
+    def parse(roll_number):
+        calls.append(roll_number)
+        return real_parse(roll_number)
+
+    monkeypatch.setattr(roll_parser, 'parse_roll_number', parse)
+    roll_cache.clear_cache()
+    yield calls
+    roll_cache.clear_cache()
+
+
+def test_repeated_parses_hit_the_cache(parses):
+    first = roll_cache.parse_roll_number('24-SWT-01')
+    first['shift'] = 'Changed'
+
+    assert roll_cache.parse_roll_number('24-SWT-01')['shift'] == 'Morning'
+    assert roll_cache.get_shift('24-ESWT-02') == 'Evening'
+    assert roll_cache.get_shift('not a roll number') == 'Morning'
+    assert parses == ['24-SWT-01', '24-ESWT-02', 'not a roll number']
+
+
+def test_cache_size_setting_bounds_the_cache(parses, write_settings):
+    write_settings(roll_cache_size=2)
+
+    for roll_number in ('24-SWT-01', '24-SWT-02', '24-SWT-03', '24-SWT-01'):
+        roll_cache.parse_roll_number(roll_number)
+
+    # The least recently used entry was evicted
+    assert roll_cache.cache_info().maxsize == 2 and roll_cache.cache_info().currsize == 2
+    assert parses == ['24-SWT-01', '24-SWT-02', '24-SWT-03', '24-SWT-01']
+
+
+def test_cache_is_cleared_when_the_day_changes(parses, monkeypatch):
+    roll_cache.parse_roll_number('24-SWT-01')
+
+    monkeypatch.setattr(roll_cache, '_cache_day', date(2000, 1, 1))
+    roll_cache.parse_roll_number('24-SWT-01')
+
+    assert parses == ['24-SWT-01', '24-SWT-01']
+
+
+def test_batch_parse_returns_columns(parses):
+    roster = roll_cache.parse_roll_numbers(['24-SWT-01', 'bad', '23-ECIT-07', '24-SWT-01'])
+
+    assert roster.to_dict() == {
+        'roll_number': ['24-SWT-01', 'bad', '23-ECIT-07', '24-SWT-01'],
+        'valid': [True, False, True, True],
+        'shift': ['Morning', None, 'Evening', 'Morning'],
+        'program': ['SWT', None, 'CIT', 'SWT'],
+        'admission_year': [2024, 0, 2023, 2024],
+        'sequence': [1, 0, 7, 1],
+    }
+    assert roster.students_in_shift('evening') == ['23-ECIT-07']
+    # Each distinct roll number is parsed once
+    assert parses == ['24-SWT-01', 'bad', '23-ECIT-07']
+
+
+def test_batch_parse_keeps_a_series_index(parses):
+    series = pd.Series(['24-SWT-01', '23-ECIT-07'], index=[10, 20])
+
+    frame = roll_cache.parse_roll_numbers(series)
+
+    assert list(frame.index) == [10, 20]
+    assert list(frame['shift']) == ['Morning', 'Evening']
+    assert list(frame['admission_year']) == [2024, 2023]
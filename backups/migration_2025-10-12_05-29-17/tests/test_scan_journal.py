@@ -0,0 +1,76 @@
+"""
+Tests for the offline scan journal and its consumer cursor
+"""
+
+import os
+import pytest
+
+from scan_journal import ScanJournal, FSYNC_ALWAYS
+
+
+def scan(n):
+    return {'ID': f'24-SWT-{n:02d}', 'Timestamp': f'2026-10-12 09:{n:02d}:00', 'Status': 'Check-in'}
+
+
+@pytest.fixture
+def journal(workdir):
+    return ScanJournal('journal.jsonl', legacy_file=None, fsync_policy=FSYNC_ALWAYS)
+
+
+def test_read_pending_respects_limit_and_cursor(journal):
+    journal.append_many([scan(n) for n in range(1, 6)])
+
+    first = journal.read_pending(limit=2)
+    assert [record['ID'] for _, record in first] == ['24-SWT-01', '24-SWT-02']
+
+    journal.ack(first[-1][0])
+    assert journal.pending_count() == 3
+    assert [record['ID'] for _, record in journal.read_pending()] == ['24-SWT-03', '24-SWT-04', '24-SWT-05']
+
+
+def test_cursor_survives_reopen(journal):
+    journal.append_many([scan(n) for n in range(1, 4)])
+    journal.ack(journal.read_pending(limit=1)[-1][0])
+    journal.close()
+
+    reopened = ScanJournal('journal.jsonl', legacy_file=None)
+
+    assert reopened.pending_count() == 2
+    assert [record['ID'] for _, record in reopened.read_pending()] == ['24-SWT-02', '24-SWT-03']
+
+
+def test_ack_is_idempotent_and_never_moves_back(journal):
+    journal.append_many([scan(n) for n in range(1, 4)])
+    entries = journal.read_pending()
+
+    journal.ack(entries[1][0])
+    journal.ack(entries[0][0])
+    journal.ack(entries[1][0])
+
+    assert journal.pending_count() == 1
+    assert [record['ID'] for _, record in journal.read_pending()] == ['24-SWT-03']
+
+
+def test_full_ack_truncates_journal(journal):
+    journal.append_many([scan(n) for n in range(1, 4)])
+
+    journal.ack(journal.read_pending()[-1][0])
+
+    assert journal.pending_count() == 0
+    assert os.path.getsize('journal.jsonl') == 0
+    assert journal.read_pending() == []
+
+    # Appends after the reset start from offset 0 again
+    journal.append(scan(9))
+    assert [record['ID'] for _, record in journal.read_pending()] == ['24-SWT-09']
+
+
+def test_torn_last_line_is_not_read(journal):
+    journal.append(scan(1))
+    journal.close()
+    with open('journal.jsonl', 'ab') as f:
+        f.write(b'{"ID": "24-SWT-02"')
+
+    reopened = ScanJournal('journal.jsonl', legacy_file=None)
+
+    assert [record['ID'] for _, record in reopened.read_pending()] == ['24-SWT-01']
@@ -0,0 +1,87 @@
+"""
+Tests for the background scan pipeline
+"""
+
+import threading
+import pytest
+
+from scan_pipeline import ScanPipeline
+
+
+@pytest.fixture
+def pipeline(workdir):
+    pipeline = ScanPipeline()
+    yield pipeline
+    pipeline.shutdown(wait=True)
+
+
+def test_pool_follows_settings_changes(pipeline, write_settings):
+    assert (pipeline.workers, pipeline.pending_limit) == (4, 100)
+    release = threading.Event()
+    running = pipeline.submit('24-SWT-01', release.wait, 5)
+
+    write_settings(scan_pipeline_workers=2, scan_pipeline_max_pending=10)
+
+    assert (pipeline.max_workers, pipeline.workers, pipeline.pending_limit) == (2, 2, 10)
+    # Scans already running finish on the old pool; new ones use the new pool
+    assert pipeline.submit('24-SWT-02', lambda: 'done').result(timeout=5) == 'done'
+    release.set()
+    assert running.result(timeout=5) is True
+    assert pipeline.pending_count() == 0
+
+
+def test_explicit_sizes_ignore_settings(workdir, write_settings):
+    pipeline = ScanPipeline(max_workers=1, max_pending=3)
+    write_settings(scan_pipeline_workers=8)
+
+    assert (pipeline.workers, pipeline.pending_limit) == (1, 3)
+    pipeline.shutdown()
+
+
+def test_scans_of_one_student_run_in_order(pipeline):
+    release = threading.Event()
+    order = []
+
+    def scan(name, wait=False):
+        if wait:
+            release.wait(5)
+        order.append(name)
+        return name
+
+    check_in = pipeline.submit('24-SWT-01', scan, 'check_in', wait=True)
+    check_out = pipeline.submit('24-SWT-01', scan, 'check_out')
+    # Another student is not held up by the first one
+    assert pipeline.submit('24-SWT-02', scan, 'other').result(timeout=5) == 'other'
+
+    release.set()
+
+    assert check_out.result(timeout=5) == 'check_out' and check_in.result() == 'check_in'
+    assert order == ['other', 'check_in', 'check_out']
+
+
+def test_failed_scan_resolves_to_false(pipeline):
+    def fail():
+        raise ConnectionError('offline')
+
+    assert pipeline.submit('24-SWT-01', fail).result(timeout=5) is False
+    assert pipeline.submit('24-SWT-01', lambda: True).result(timeout=5) is True
+
+
+def test_submit_blocks_when_max_pending_scans_are_in_flight(workdir):
+    pipeline = ScanPipeline(max_workers=2, max_pending=2)
+    release = threading.Event()
+    pipeline.submit('24-SWT-01', release.wait, 5)
+    pipeline.submit('24-SWT-02', release.wait, 5)
+    submitted = threading.Event()
+
+    def submit_third():
+        pipeline.submit('24-SWT-03', lambda: True)
+        submitted.set()
+
+    threading.Thread(target=submit_third, daemon=True).start()
+    assert not submitted.wait(0.2)
+
+    release.set()
+    assert submitted.wait(5)
+    pipeline.shutdown(wait=True)
+    assert pipeline.pending_count() == 0
@@ -0,0 +1,67 @@
+"""
+Tests for the process-wide settings snapshot and its reloads
+"""
+
+import json
+import os
+import pytest
+
+from settings_snapshot import SettingsWatcher
+
+
+def write(values):
+    with open('settings.json', 'w') as f:
+        json.dump(values, f)
+
+
+@pytest.fixture
+def watcher(workdir):
+    write({'late_after_minutes': 10})
+    return SettingsWatcher('settings.json')
+
+
+def test_reload_swaps_in_a_new_snapshot(watcher):
+    old = watcher.get()
+    assert old.get('late_after_minutes') == 10 and old.version == 1
+    assert watcher.get() is old
+
+    write({'late_after_minutes': 20})
+    new = watcher.reload()
+
+    assert watcher.get() is new and new.version == 2
+    assert new.get('late_after_minutes') == 20
+    # Readers holding the old snapshot keep a consistent view
+    assert old.get('late_after_minutes') == 10
+    assert new.get('missing', 'default') == 'default'
+
+
+def test_derived_values_are_built_once_per_version(watcher):
+    builds = []
+
+    def build(snapshot):
+        builds.append(snapshot.version)
+        return snapshot.get('late_after_minutes') * 60
+
+    assert watcher.get().derived('grace', build) == 600
+    assert watcher.get().derived('grace', build) == 600
+
+    write({'late_after_minutes': 20})
+    assert watcher.reload().derived('grace', build) == 1200
+    assert builds == [1, 2]
+
+
+def test_check_reloads_only_when_the_file_changes(watcher):
+    seen = []
+    watcher.add_listener(lambda snapshot: 1 / 0)
+    watcher.add_listener(lambda snapshot: seen.append(snapshot.get('late_after_minutes')))
+    watcher.get()
+
+    assert not watcher.check()
+
+    write({'late_after_minutes': 25})
+    stat = os.stat('settings.json')
+    os.utime('settings.json', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert watcher.check()
+    assert not watcher.check()
+    # A failing listener does not stop the others
+    assert seen == [25]
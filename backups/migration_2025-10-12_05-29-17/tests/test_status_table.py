@@ -0,0 +1,126 @@
+"""
+Tests for the per-day student status table, its warm-up and the scans it decides
+"""
+
+import pytest
+
+from checkin_manager import CheckInManager
+from status_table import StudentStatusTable, NOT_CHECKED_IN, CHECKED_IN, CHECKED_OUT
+
+
+@pytest.fixture
+def table(workdir):
+    return StudentStatusTable('Asia/Karachi')
+
+
+def test_warm_keeps_statuses_seen_today(table):
+    table.set_status('24-SWT-01', CHECKED_OUT)
+
+    loaded = table.warm({'24-SWT-01': CHECKED_IN, '24-SWT-02': CHECKED_IN, '24-SWT-03': 'Unknown'})
+
+    assert loaded == 1
+    assert table.snapshot() == {'24-SWT-01': CHECKED_OUT, '24-SWT-02': CHECKED_IN}
+    # A server 'Not checked in' after a check-out keeps the local state
+    table.set_status('24-SWT-01', NOT_CHECKED_IN)
+    assert table.get_status('24-SWT-01') == CHECKED_OUT
+
+
+def test_table_rolls_over_at_midnight(table, monkeypatch):
+    monkeypatch.setattr(table, '_today', lambda: '2026-10-12')
+    table.warm({'24-SWT-01': CHECKED_IN})
+
+    monkeypatch.setattr(table, '_today', lambda: '2026-10-13')
+
+    assert table.get_status('24-SWT-01') is None
+    assert len(table) == 0
+
+
+def test_warm_up_status_uses_one_bulk_query(workdir, monkeypatch):
+    manager = CheckInManager('http://site')
+    calls = []
+
+    def get_active_sessions():
+        calls.append('active_sessions')
+        return True, {'active': [{'student_id': '24-SWT-01'}], 'checked_out': ['24-SWT-02']}
+
+    monkeypatch.setattr(manager, 'get_active_sessions', get_active_sessions)
+
+    assert manager.warm_up_status(['24-SWT-01', '24-SWT-02', '24-SWT-03']) == 3
+    assert calls == ['active_sessions']
+    assert manager.status_table.snapshot() == {'24-SWT-01': CHECKED_IN, '24-SWT-02': CHECKED_OUT,
+                                               '24-SWT-03': NOT_CHECKED_IN}
+
+
+def test_failed_warm_up_leaves_the_table_empty(workdir, monkeypatch):
+    manager = CheckInManager('http://site')
+    monkeypatch.setattr(manager, 'get_active_sessions', lambda: (False, 'HTTP Error: 500'))
+
+    assert manager.warm_up_status(['24-SWT-01']) == 0
+    assert manager.status_table.snapshot() == {}
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.status_code = 200
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class FakeCheckinApi:
+    """checkin_api.php check_in/check_out/get_status for one day"""
+
+    def __init__(self):
+        self.active = set()
+        self.actions = []
+
+    def post(self, url, endpoint=None, json=None, **kwargs):
+        action, student_id = json['action'], json['student_id']
+        self.actions.append(action)
+        if action == 'get_status':
+            status = CHECKED_IN if student_id in self.active else NOT_CHECKED_IN
+            return FakeResponse({'success': True, 'data': {'status': status}})
+        if action == 'check_in':
+            if student_id in self.active:
+                return FakeResponse({'success': False, 'message': 'Student already checked in. Please check out first.'})
+            self.active.add(student_id)
+            return FakeResponse({'success': True, 'data': {'status': 'Check-in'}})
+        if student_id not in self.active:
+            return FakeResponse({'success': False, 'message': 'No active check-in session found'})
+        self.active.remove(student_id)
+        return FakeResponse({'success': True, 'data': {'status': 'Present'}})
+
+
+@pytest.fixture
+def api(workdir, monkeypatch):
+    import time_validator
+    monkeypatch.setattr(time_validator.TimeValidator, 'validate_checkout_time',
+                        lambda self, student_id, checkin_time, shift: {'valid': True})
+    api = FakeCheckinApi()
+    manager = CheckInManager('http://site')
+    manager.http = api
+    api.manager = manager
+    return api
+
+
+def test_known_status_skips_the_status_request(api):
+    manager = api.manager
+
+    assert manager.process_qr_scan('24-SWT-01')[0]
+    assert manager.process_qr_scan('24-SWT-01')[0]
+
+    assert api.actions == ['get_status', 'check_in', 'check_out']
+    assert manager.status_table.get_status('24-SWT-01') == CHECKED_OUT
+
+
+def test_status_mismatch_refreshes_and_retries_once(api):
+    manager = api.manager
+    # Another scanner checked the student out; this table still says checked in
+    manager.status_table.set_status('24-SWT-01', CHECKED_IN)
+
+    success, data = manager.process_qr_scan('24-SWT-01')
+
+    assert success and data == {'status': 'Check-in'}
+    assert api.actions == ['check_out', 'get_status', 'check_in']
+    assert manager.status_table.get_status('24-SWT-01') == CHECKED_IN
@@ -0,0 +1,78 @@
+"""
+Tests for the resident students.json cache
+"""
+
+import json
+import os
+import pytest
+
+import student_directory
+from student_directory import StudentDirectory, get_student_directory
+
+
+def write_students(students, mtime_offset=0):
+    with open('students.json', 'w') as f:
+        json.dump(students, f)
+    if mtime_offset:
+        stat = os.stat('students.json')
+        os.utime('students.json', ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset * 1_000_000_000))
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Count the times students.json is parsed."""
+    calls = []
+    real_load = json.load
+
+    def load(f):
+        calls.append(f.name)
+        return real_load(f)
+
+    monkeypatch.setattr(student_directory.json, 'load', load)
+    return calls
+
+
+def test_file_is_parsed_once_until_it_changes(workdir, loads):
+    write_students({'24-SWT-01': {'name': 'A'}})
+    directory = StudentDirectory()
+
+    assert directory.get('24-SWT-01') == {'name': 'A'}
+    assert '24-SWT-01' in directory and len(directory) == 1
+    assert len(loads) == 1
+
+    write_students({'24-SWT-01': {'name': 'A'}, '24-SWT-02': {'name': 'B'}}, mtime_offset=1)
+
+    assert sorted(directory.get_all()) == ['24-SWT-01', '24-SWT-02']
+    assert len(loads) == 2
+
+
+def test_save_replaces_the_resident_copy(workdir, loads):
+    directory = StudentDirectory()
+    assert directory.get_all() == {}
+
+    directory.save({'24-SWT-01': {'name': 'A'}})
+
+    assert directory.get('24-SWT-01') == {'name': 'A'}
+    assert loads == []
+    with open('students.json') as f:
+        assert json.load(f) == {'24-SWT-01': {'name': 'A'}}
+    # copy() can be modified without touching the cache
+    students = directory.copy()
+    students['24-SWT-01']['name'] = 'Changed'
+    assert directory.get('24-SWT-01') == {'name': 'A'}
+
+
+def test_unreadable_file_keeps_the_previous_students(workdir):
+    write_students({'24-SWT-01': {'name': 'A'}})
+    directory = StudentDirectory()
+    directory.get_all()
+
+    with open('students.json', 'w') as f:
+        f.write('{"24-SWT-01": ')
+
+    assert directory.get('24-SWT-01') == {'name': 'A'}
+
+
+def test_directories_are_shared_per_file(workdir):
+    assert get_student_directory('students.json') is get_student_directory(str(workdir / 'students.json'))
+    assert get_student_directory('other.json') is not get_student_directory('students.json')
@@ -0,0 +1,126 @@
+"""
+Tests for the incremental website pull and its open-day re-pull
+"""
+
+from datetime import datetime
+import pytest
+import pytz
+
+import sync_manager
+
+TODAY = '2026-10-12'
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = {}
+        self.text = ''
+
+    def json(self):
+        return self._payload
+
+
+class FakeWebsite:
+    """Attendance GET endpoint that may or may not honor since_id/since"""
+
+    def __init__(self, honors_since_id=True, honors_since=True):
+        self.honors_since_id = honors_since_id
+        self.honors_since = honors_since
+        self.rows = []
+        self.requests = []
+
+    def add(self, student_id, timestamp, status):
+        self.rows.append({'id': len(self.rows) + 1, 'student_id': student_id, 'student_name': 'A',
+                          'timestamp': timestamp, 'status': status})
+
+    def request(self, method, url, endpoint=None, params=None, headers=None, **kwargs):
+        params = params or {}
+        self.requests.append(params)
+        rows = self.rows
+        if self.honors_since_id and 'since_id' in params:
+            rows = [row for row in rows if row['id'] > int(params['since_id'])]
+        elif self.honors_since and 'since' in params:
+            rows = [row for row in rows if row['timestamp'] >= params['since']]
+        return FakeResponse(200, {'success': True, 'data': [dict(row) for row in rows]})
+
+
+class OnlineMonitor:
+    def is_website_online(self):
+        return True
+
+
+@pytest.fixture
+def website():
+    return FakeWebsite()
+
+
+@pytest.fixture
+def manager(workdir, website, monkeypatch):
+    monkeypatch.setattr(sync_manager, 'get_connectivity_monitor', lambda: OnlineMonitor())
+    monkeypatch.setattr(sync_manager, 'get_http_client', lambda: website)
+    manager = sync_manager.SyncManager()
+    now = pytz.timezone('Asia/Karachi').localize(datetime(2026, 10, 12, 13, 0))
+    monkeypatch.setattr(manager, 'get_current_time', lambda: now)
+    return manager
+
+
+def statuses(manager):
+    return [(r['ID'], r['Status']) for r in manager.get_store().get_records()]
+
+
+def test_each_cycle_sends_one_request(manager, website):
+    website.add('24-SWT-01', f'{TODAY} 09:05:00', 'Check-in')
+
+    for _ in range(4):
+        assert manager.sync_from_website()
+
+    assert len(website.requests) == 4
+    assert statuses(manager) == [('24-SWT-01', 'Check-in')]
+
+
+def test_open_day_pull_picks_up_in_place_check_outs(manager, website):
+    website.add('24-SWT-01', '2026-10-11 09:00:00', 'Present')
+    website.add('24-SWT-01', f'{TODAY} 09:05:00', 'Check-in')
+    manager.sync_from_website()
+    # A cursor pull shows the website filters by since_id
+    manager.sync_from_website()
+
+    website.rows[1]['status'] = 'Present'
+    assert manager.sync_from_website()
+
+    assert website.requests[-1] == {'since': f'{TODAY} 00:00:00'}
+    assert statuses(manager) == [('24-SWT-01', 'Present'), ('24-SWT-01', 'Present')]
+    assert manager.get_store().status_counts() == {'Present': 2}
+    # The next cycle goes back to the cursor
+    manager.sync_from_website()
+    assert 'since_id' in website.requests[-1]
+
+
+def test_server_ignoring_since_id_never_gets_open_day_pulls(manager, website):
+    website.honors_since_id = False
+    website.honors_since = False
+    website.add('24-SWT-01', f'{TODAY} 09:05:00', 'Check-in')
+
+    for _ in range(4):
+        manager.sync_from_website()
+
+    assert all('since' not in params for params in website.requests)
+    assert len(website.requests) == 4
+    assert statuses(manager) == [('24-SWT-01', 'Check-in')]
+
+
+def test_server_ignoring_since_stops_open_day_pulls(manager, website):
+    website.honors_since = False
+    website.add('24-SWT-01', '2026-10-11 09:00:00', 'Present')
+    website.add('24-SWT-02', f'{TODAY} 09:05:00', 'Check-in')
+    for _ in range(3):
+        manager.sync_from_website()
+    assert website.requests[-1] == {'since': f'{TODAY} 00:00:00'}
+
+    for _ in range(3):
+        manager.sync_from_website()
+
+    assert all('since_id' in params for params in website.requests[3:])
+    assert manager.get_store().count() == 2
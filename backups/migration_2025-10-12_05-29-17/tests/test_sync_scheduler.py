@@ -0,0 +1,107 @@
+"""
+Tests for the event-driven sync scheduler
+"""
+
+import threading
+import pytest
+
+import sync_scheduler
+from sync_scheduler import SyncScheduler
+
+
+class FakeMonitor:
+    def __init__(self):
+        self.online = True
+        self.listeners = []
+
+    def is_website_online(self):
+        return self.online
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+
+class FakeSync:
+    """Sync function with scripted results"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.ran = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.ran.set()
+        result = self.results.pop(0) if self.results else True
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def monitor(workdir, monkeypatch):
+    monitor = FakeMonitor()
+    monkeypatch.setattr(sync_scheduler, 'get_connectivity_monitor', lambda: monitor)
+    return monitor
+
+
+def test_failures_back_off_exponentially_up_to_the_maximum(monitor, write_settings):
+    write_settings(sync_min_backoff_seconds=4, sync_max_backoff_seconds=10, sync_idle_interval_seconds=60)
+    scheduler = SyncScheduler(FakeSync(False, RuntimeError('boom'), False, True))
+
+    delays = []
+    for _ in range(4):
+        scheduler._run_cycle()
+        delays.append(scheduler.get_status()['next_delay_seconds'])
+
+    # Half the backoff plus up to half again as jitter
+    assert 2 <= delays[0] <= 4 and 4 <= delays[1] <= 8 and 5 <= delays[2] <= 10
+    assert delays[3] == 60
+    assert scheduler.get_status()['consecutive_failures'] == 0
+
+
+def test_offline_cycles_do_not_call_sync(monitor):
+    sync = FakeSync()
+    scheduler = SyncScheduler(sync)
+    monitor.online = False
+
+    scheduler._run_cycle()
+
+    assert sync.calls == 0 and scheduler.get_status()['cycles'] == 0
+
+
+def test_pending_backlog_schedules_the_next_cycle(monitor):
+    pending = [5]
+    scheduler = SyncScheduler(FakeSync(), lambda: pending[0])
+
+    scheduler._run_cycle()
+    assert scheduler._wake.is_set()
+
+    scheduler._wake.clear()
+    pending[0] = 0
+    scheduler._run_cycle()
+    assert not scheduler._wake.is_set()
+
+
+def test_reconnect_resets_backoff_and_wakes(monitor):
+    scheduler = SyncScheduler(FakeSync(False))
+    scheduler._run_cycle()
+    assert scheduler._failures == 1
+
+    scheduler._on_connectivity_change(True)
+
+    assert scheduler._failures == 0 and scheduler._wake.is_set()
+
+
+def test_notify_wakes_the_running_scheduler(monitor, write_settings):
+    write_settings(sync_coalesce_ms=0, sync_idle_interval_seconds=3600)
+    sync = FakeSync()
+    scheduler = SyncScheduler(sync)
+    scheduler.start()
+    assert sync.ran.wait(5)
+    assert monitor.listeners == [scheduler._on_connectivity_change]
+
+    sync.ran.clear()
+    scheduler.notify()
+
+    assert sync.ran.wait(5) and sync.calls == 2
@@ -0,0 +1,72 @@
+"""
+Tests that validate_batch agrees with the per-scan validators
+"""
+
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+import pytz
+
+from time_validator import TimeValidator
+
+TIMEZONE = pytz.timezone('Asia/Karachi')
+SHIFTS = ('Morning', 'Evening')
+
+
+def scan_times():
+    """Every 7 minutes 13 seconds across a week, so both windows' edges are crossed."""
+    start = TIMEZONE.localize(datetime(2026, 10, 12, 0, 0, 0))
+    return [start + timedelta(seconds=step * 433) for step in range(7 * 24 * 3600 // 433)]
+
+
+@pytest.fixture
+def validator(workdir):
+    return TimeValidator('Asia/Karachi')
+
+
+@pytest.mark.parametrize('kind', ['checkin', 'checkout'])
+@pytest.mark.parametrize('shift', SHIFTS)
+def test_batch_matches_scalar(validator, shift, kind):
+    times = scan_times()
+    scalar = validator.validate_checkin_time if kind == 'checkin' else validator.validate_checkout_time
+
+    valid, minutes = validator.validate_batch(
+        [t.timestamp() for t in times], np.full(len(times), validator.timetable.shift_code(shift)), kind
+    )
+
+    for i, current_time in enumerate(times):
+        expected = scalar('24-SWT-01', current_time, shift)
+        assert bool(valid[i]) == expected['valid'], current_time
+        if expected['valid']:
+            assert minutes[i] == (expected['time_until_close'] or 0), current_time
+        else:
+            assert minutes[i] == -1
+
+
+def test_batch_honours_per_weekday_timings(write_settings):
+    write_settings(shift_weekday_overrides={
+        'Morning': {'friday': {'checkin_start': '08:00:00', 'checkin_end': '09:30:00'}}
+    })
+    validator = TimeValidator('Asia/Karachi')
+    monday = TIMEZONE.localize(datetime(2026, 10, 12, 8, 30))
+    friday = TIMEZONE.localize(datetime(2026, 10, 16, 8, 30))
+    code = validator.timetable.shift_code('Morning')
+
+    valid, _ = validator.validate_batch([monday.timestamp(), friday.timestamp()], [code, code])
+
+    assert list(valid) == [validator.validate_checkin_time('x', monday, 'Morning')['valid'],
+                           validator.validate_checkin_time('x', friday, 'Morning')['valid']]
+    assert list(valid) == [False, True]
+
+
+def test_unknown_shift_code_is_invalid(validator):
+    morning = TIMEZONE.localize(datetime(2026, 10, 12, 9, 30)).timestamp()
+
+    valid, minutes = validator.validate_batch([morning, morning], [-1, validator.timetable.shift_code('Morning')])
+
+    assert list(valid) == [False, True] and minutes[0] == -1
+
+
+def test_batch_rejects_mismatched_shapes(validator):
+    with pytest.raises(ValueError):
+        validator.validate_batch([0.0, 1.0], [0])
@@ -0,0 +1,66 @@
+"""
+Tests for the single-pass year progression
+"""
+
+from datetime import datetime
+import json
+import pytest
+import pytz
+
+from student_directory import get_student_directory
+from year_progression import YearProgression
+
+SEPTEMBER = pytz.timezone('Asia/Karachi').localize(datetime(2026, 9, 1, 8, 0))
+
+
+@pytest.fixture
+def progression(workdir):
+    return YearProgression('Asia/Karachi')
+
+
+def test_compute_progression_splits_changed_and_unchanged(progression):
+    students = {
+        '24-SWT-01': {'name': 'A', 'admission_year': 2024, 'current_year': 3, 'is_graduated': False},
+        '24-SWT-02': {'name': 'B', 'admission_year': 2024, 'current_year': 2, 'is_graduated': False},
+        '21-ECIT-03': {'name': 'C'},
+        'bad': {'name': 'D'},
+    }
+
+    result = progression.compute_progression(students, SEPTEMBER)
+
+    assert result['changes'] == [('24-SWT-02', 2024, 3, False), ('21-ECIT-03', 2021, 4, False)]
+    assert result['unchanged'] == 1
+    assert [error['student_id'] for error in result['errors']] == ['bad']
+
+
+def test_progression_writes_the_roster_once(progression, monkeypatch):
+    directory = get_student_directory()
+    directory.save({
+        '24-SWT-01': {'name': 'A', 'admission_year': 2024, 'current_year': 2, 'is_graduated': False},
+        '25-SWT-02': {'name': 'B'},
+    })
+    saves = []
+    real_save = directory.save
+    monkeypatch.setattr(directory, 'save', lambda students: saves.append(1) or real_save(students))
+
+    result = progression.check_and_update_years(SEPTEMBER)
+
+    assert result['success'] and result['updated_students'] == 2 and result['unchanged_students'] == 0
+    assert len(saves) == 1
+    with open('students.json') as f:
+        students = json.load(f)
+    assert students['24-SWT-01']['current_year'] == 3 and students['25-SWT-02']['current_year'] == 2
+    assert students['25-SWT-02']['last_year_update'] == '2026-09-01'
+
+    # A second run finds nothing to change and does not rewrite the file
+    result = progression.check_and_update_years(SEPTEMBER)
+    assert result['updated_students'] == 0 and result['unchanged_students'] == 2
+    assert len(saves) == 1
+
+
+def test_progression_only_runs_in_september(progression):
+    october = SEPTEMBER.replace(month=10)
+
+    result = progression.check_and_update_years(october)
+
+    assert result['message'] == 'Year progression not needed'
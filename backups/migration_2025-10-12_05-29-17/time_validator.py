@@ -3,10 +3,194 @@ Time Validator Module for College Attendance System
 Validates check-in times based on shift timings
 """
 
-from datetime import datetime, time
+from collections import namedtuple
+from datetime import datetime, time, timedelta
 from typing import Dict, Optional, Tuple
+import numpy as np
 import pytz
-from settings import SettingsManager
+from settings_snapshot import get_settings
+
+# Boundaries of a shift, in this order, as seconds since midnight
+SHIFT_FIELDS = ('checkin_start', 'checkin_end', 'checkout_start', 'checkout_end', 'class_end')
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+# 1970-01-01 (epoch day 0) was a Thursday
+EPOCH_WEEKDAY = 3
+
+# Index of (start, end) in the compiled boundaries for each window kind
+WINDOW_BOUNDS = {
+    'checkin': (0, 1),
+    'checkout': (2, 3),
+}
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Result of a window lookup. seconds_remaining is None outside the window;
+# next_transition is when the answer next changes, in seconds from the
+# midnight of the checked day (may be past 86400 for tomorrow).
+WindowCheck = namedtuple('WindowCheck', ['valid', 'seconds_remaining', 'next_transition'])
+
+
+def _to_seconds(value) -> int:
+    """Convert 'HH:MM[:SS]' or a time object to seconds since midnight"""
+    if isinstance(value, time):
+        return value.hour * 3600 + value.minute * 60 + value.second
+    parts = [int(part) for part in str(value).split(':')]
+    while len(parts) < 3:
+        parts.append(0)
+    return parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+def _to_time(seconds: int) -> time:
+    return time(seconds // 3600, (seconds % 3600) // 60, seconds % 60)
+
+
+def _default_shift_definitions(settings) -> Dict:
+    """Morning and Evening shifts from the per-field timing settings"""
+    evening_start = settings.get('evening_checkin_start', '15:00:00')
+    evening_class_end = settings.get('evening_class_end', '18:00:00')
+    return {
+        'Morning': {
+            'checkin_start': settings.get('morning_checkin_start', '09:00:00'),
+            'checkin_end': settings.get('morning_checkin_end', '11:00:00'),
+            'checkout_start': settings.get('morning_checkout_start', '12:00:00'),
+            'checkout_end': settings.get('morning_checkout_end', '13:40:00'),
+            'class_end': settings.get('morning_class_end', '13:40:00'),
+            'checkin_window_hours': 2,
+            'total_class_hours': 4.67  # 4 hours 40 minutes
+        },
+        'Evening': {
+            'checkin_start': evening_start,
+            'checkin_end': settings.get('evening_checkin_end', '18:00:00'),
+            'checkout_start': evening_start,  # Same as checkin for free access
+            'checkout_end': evening_class_end,
+            'class_end': evening_class_end,
+            'checkin_window_hours': 3,  # Extended to 3 hours
+            'total_class_hours': 3
+        }
+    }
+
+
+class ShiftTimetable:
+    """
+    Shift windows compiled to seconds-of-day boundaries per weekday.
+
+    Shifts come from the morning_*/evening_* settings plus any named shifts
+    in 'shift_definitions' ({name: {checkin_start: 'HH:MM:SS', ...}}).
+    'shift_weekday_overrides' ({name: {weekday: {field: 'HH:MM:SS'}}})
+    changes fields on specific weekdays (0=Monday or 'monday').
+    """
+
+    def __init__(self, definitions: Dict, weekday_overrides: Optional[Dict] = None):
+        weekday_overrides = weekday_overrides or {}
+        self.shifts = tuple(definitions.keys())
+        self._codes = {name.lower(): code for code, name in enumerate(self.shifts)}
+
+        # _bounds[code][weekday] is a tuple of SHIFT_FIELDS seconds
+        self._bounds = []
+        # _timings[code][weekday] is the get_shift_timings() dict
+        self._timings = []
+
+        for name in self.shifts:
+            definition = definitions[name]
+            overrides = {}
+            for weekday, fields in (weekday_overrides.get(name) or {}).items():
+                overrides[self._weekday_index(weekday)] = fields
+
+            shift_bounds = []
+            shift_timings = []
+            for weekday in range(7):
+                merged = dict(definition)
+                merged.update(overrides.get(weekday, {}))
+                bounds = tuple(_to_seconds(merged[field]) for field in SHIFT_FIELDS)
+                shift_bounds.append(bounds)
+                shift_timings.append(self._build_timings(name, merged, bounds))
+            self._bounds.append(tuple(shift_bounds))
+            self._timings.append(tuple(shift_timings))
+
+    @staticmethod
+    def _weekday_index(weekday) -> int:
+        if isinstance(weekday, int) or str(weekday).isdigit():
+            return int(weekday) % 7
+        return WEEKDAYS.index(str(weekday).lower())
+
+    @staticmethod
+    def _build_timings(name: str, definition: Dict, bounds: Tuple) -> Dict:
+        timings = {'shift': name}
+        for field, seconds in zip(SHIFT_FIELDS, bounds):
+            timings[field] = _to_time(seconds)
+        timings['checkin_window_hours'] = definition.get(
+            'checkin_window_hours', round((bounds[1] - bounds[0]) / 3600, 2))
+        timings['total_class_hours'] = definition.get(
+            'total_class_hours', round((bounds[4] - bounds[0]) / 3600, 2))
+        return timings
+
+    def shift_code(self, shift: str) -> int:
+        """
+        Get the integer code of a shift name (case-insensitive).
+
+        Raises:
+            ValueError: If the shift is not defined
+        """
+        try:
+            return self._codes[shift.lower()]
+        except KeyError:
+            raise ValueError(f"Invalid shift: {shift}. Must be one of: {', '.join(self.shifts)}")
+
+    def get_timings(self, shift: str, weekday: int = 0) -> Dict:
+        """Get the (shared, read-only) timings dict of a shift on a weekday."""
+        return self._timings[self.shift_code(shift)][weekday]
+
+    def shift_codes(self, shifts) -> np.ndarray:
+        """Map shift names to codes; unknown names map to -1."""
+        return np.array([self._codes.get(str(shift).lower(), -1) for shift in shifts], dtype=np.int16)
+    
+    def as_array(self) -> np.ndarray:
+        """Boundaries as an int32 array of shape (shifts, 7 weekdays, SHIFT_FIELDS)."""
+        array = getattr(self, '_array', None)
+        if array is None:
+            array = np.array(self._bounds, dtype=np.int32).reshape(len(self.shifts), 7, len(SHIFT_FIELDS))
+            self._array = array
+        return array
+    
+    def get_bounds(self, code: int, weekday: int) -> Tuple:
+        """Get the SHIFT_FIELDS seconds of a shift code on a weekday."""
+        return self._bounds[code][weekday]
+
+    def check(self, code: int, kind: str, weekday: int, seconds: int) -> WindowCheck:
+        """
+        Check if a time of day falls in a shift's check-in or check-out window.
+
+        Args:
+            code (int): Shift code from shift_code()
+            kind (str): 'checkin' or 'checkout'
+            weekday (int): 0=Monday
+            seconds (int): Seconds since midnight
+
+        Returns:
+            WindowCheck: (valid, seconds_remaining, next_transition)
+        """
+        start_index, end_index = WINDOW_BOUNDS[kind]
+        bounds = self._bounds[code][weekday]
+        start, end = bounds[start_index], bounds[end_index]
+
+        if start <= seconds <= end:
+            return WindowCheck(True, end - seconds, end + 1)
+        if seconds < start:
+            return WindowCheck(False, None, start)
+        # Past today's window: the next one opens on the following day
+        next_start = self._bounds[code][(weekday + 1) % 7][start_index]
+        return WindowCheck(False, None, SECONDS_PER_DAY + next_start)
+
+
+def compile_timetable(settings) -> ShiftTimetable:
+    """Compile the shift timetable from a settings snapshot"""
+    definitions = _default_shift_definitions(settings)
+    for name, definition in (settings.get('shift_definitions', {}) or {}).items():
+        merged = dict(definitions.get(name, {}))
+        merged.update(definition)
+        definitions[name] = merged
+    return ShiftTimetable(definitions, settings.get('shift_weekday_overrides', {}))
 
 
 class TimeValidator:
@@ -15,77 +199,54 @@ class TimeValidator:
     def __init__(self, timezone='Asia/Karachi'):
         """Initialize time validator with timezone"""
         self.timezone = pytz.timezone(timezone)
-        self.settings = SettingsManager()
+        self.settings = get_settings()
         
-        # Load timing settings from settings manager
-        self._load_timing_constants()
-    
-    def _load_timing_constants(self):
-        """Load timing constants from settings"""
-        # Morning shift timings
-        morning_start = self.settings.get('morning_checkin_start', '09:00:00')
-        morning_end = self.settings.get('morning_checkin_end', '11:00:00')
-        morning_checkout_start = self.settings.get('morning_checkout_start', '12:00:00')
-        morning_checkout_end = self.settings.get('morning_checkout_end', '13:40:00')
-        morning_class_end = self.settings.get('morning_class_end', '13:40:00')
-        
-        # Evening shift timings
-        evening_start = self.settings.get('evening_checkin_start', '15:00:00')
-        evening_end = self.settings.get('evening_checkin_end', '18:00:00')
-        evening_checkout_start = self.settings.get('evening_checkout_start', '15:00:00')
-        evening_checkout_end = self.settings.get('evening_checkout_end', '18:00:00')
-        evening_class_end = self.settings.get('evening_class_end', '18:00:00')
-        
-        # Convert to time objects
-        self.MORNING_CHECKIN_START = datetime.strptime(morning_start, '%H:%M:%S').time()
-        self.MORNING_CHECKIN_END = datetime.strptime(morning_end, '%H:%M:%S').time()
-        self.MORNING_CLASS_END = datetime.strptime(morning_class_end, '%H:%M:%S').time()
-        self.MORNING_CHECKOUT_START = datetime.strptime(morning_checkout_start, '%H:%M:%S').time()
-        self.MORNING_CHECKOUT_END = datetime.strptime(morning_checkout_end, '%H:%M:%S').time()
-        
-        self.EVENING_CHECKIN_START = datetime.strptime(evening_start, '%H:%M:%S').time()
-        self.EVENING_CHECKIN_END = datetime.strptime(evening_end, '%H:%M:%S').time()
-        self.EVENING_CLASS_END = datetime.strptime(evening_class_end, '%H:%M:%S').time()
-        self.EVENING_CHECKOUT_START = datetime.strptime(evening_checkout_start, '%H:%M:%S').time()
-        self.EVENING_CHECKOUT_END = datetime.strptime(evening_checkout_end, '%H:%M:%S').time()
-        
-        # Minimum duration from settings
+        # Compiled once per settings version and shared by all validators
+        self.timetable = self.settings.derived('shift_timetable', compile_timetable)
         self.MINIMUM_DURATION_MINUTES = self.settings.get('minimum_duration_minutes', 120)
     
-    def get_shift_timings(self, shift: str) -> Dict:
+    def _local(self, current_time: datetime) -> datetime:
+        """Get the local wall-clock time (naive times are already local)"""
+        if current_time.tzinfo is None or getattr(current_time.tzinfo, 'zone', None) == self.timezone.zone:
+            return current_time
+        return current_time.astimezone(self.timezone)
+    
+    def check_window(self, current_time: datetime, shift: str, kind: str) -> WindowCheck:
+        """
+        Look up a check-in or check-out window.
+        
+        Args:
+            current_time (datetime): Time to check
+            shift (str): Shift name
+            kind (str): 'checkin' or 'checkout'
+        
+        Returns:
+            WindowCheck: (valid, seconds_remaining, next_transition)
+        """
+        local_time = self._local(current_time)
+        seconds = local_time.hour * 3600 + local_time.minute * 60 + local_time.second
+        return self.timetable.check(self.timetable.shift_code(shift), kind, local_time.weekday(), seconds)
+    
+    def next_transition_time(self, current_time: datetime, check: WindowCheck) -> datetime:
+        """Convert a WindowCheck's next_transition to a datetime."""
+        local_time = self._local(current_time)
+        midnight = local_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        return midnight + timedelta(seconds=check.next_transition)
+    
+    def get_shift_timings(self, shift: str, weekday: Optional[int] = None) -> Dict:
         """
         Get timing information for a specific shift.
         
         Args:
-            shift (str): 'Morning' or 'Evening'
+            shift (str): Shift name, e.g. 'Morning' or 'Evening'
+            weekday (int, optional): 0=Monday. Defaults to today.
         
         Returns:
-            Dict: Timing information for the shift
+            Dict: Timing information for the shift (shared; do not modify)
         """
-        if shift.lower() == 'morning':
-            return {
-                'shift': 'Morning',
-                'checkin_start': self.MORNING_CHECKIN_START,
-                'checkin_end': self.MORNING_CHECKIN_END,
-                'checkout_start': self.MORNING_CHECKOUT_START,
-                'checkout_end': self.MORNING_CHECKOUT_END,
-                'class_end': self.MORNING_CLASS_END,
-                'checkin_window_hours': 2,
-                'total_class_hours': 4.67  # 4 hours 40 minutes
-            }
-        elif shift.lower() == 'evening':
-            return {
-                'shift': 'Evening',
-                'checkin_start': self.EVENING_CHECKIN_START,
-                'checkin_end': self.EVENING_CHECKIN_END,
-                'checkout_start': self.EVENING_CHECKIN_START,  # Same as checkin for free access
-                'checkout_end': self.EVENING_CLASS_END,
-                'class_end': self.EVENING_CLASS_END,
-                'checkin_window_hours': 3,  # Extended to 3 hours
-                'total_class_hours': 3
-            }
-        else:
-            raise ValueError(f"Invalid shift: {shift}. Must be 'Morning' or 'Evening'")
+        if weekday is None:
+            weekday = datetime.now(self.timezone).weekday()
+        return self.timetable.get_timings(shift, weekday)
     
     def is_within_checkin_window(self, current_time: datetime, shift: str) -> bool:
         """
@@ -93,21 +254,12 @@ class TimeValidator:
         
         Args:
             current_time (datetime): Current time to check
-            shift (str): 'Morning' or 'Evening'
+            shift (str): Shift name
         
         Returns:
             bool: True if within check-in window
         """
-        # Convert to timezone if needed
-        if current_time.tzinfo is None:
-            current_time = self.timezone.localize(current_time)
-        elif current_time.tzinfo != self.timezone:
-            current_time = current_time.astimezone(self.timezone)
-        
-        current_time_only = current_time.time()
-        timings = self.get_shift_timings(shift)
-        
-        return timings['checkin_start'] <= current_time_only <= timings['checkin_end']
+        return self.check_window(current_time, shift, 'checkin').valid
     
     def is_within_checkout_window(self, current_time: datetime, shift: str) -> bool:
         """
@@ -115,50 +267,30 @@ class TimeValidator:
         
         Args:
             current_time (datetime): Current time to check
-            shift (str): 'Morning' or 'Evening'
+            shift (str): Shift name
         
         Returns:
             bool: True if within check-out window
         """
-        # Convert to timezone if needed
-        if current_time.tzinfo is None:
-            current_time = self.timezone.localize(current_time)
-        elif current_time.tzinfo != self.timezone:
-            current_time = current_time.astimezone(self.timezone)
-        
-        current_time_only = current_time.time()
-        timings = self.get_shift_timings(shift)
-        
-        return timings['checkout_start'] <= current_time_only <= timings['checkout_end']
+        return self.check_window(current_time, shift, 'checkout').valid
     
-    def validate_checkin_time(self, student_id: str, current_time: Optional[datetime] = None, 
-                            shift: Optional[str] = None) -> Dict:
-        """
-        Validate if a student can check in at the current time.
-        
-        Args:
-            student_id (str): Student ID
-            current_time (datetime, optional): Current time. Defaults to now.
-            shift (str, optional): Student's shift. If not provided, will be determined from roll number.
-        
-        Returns:
-            Dict: Validation result with timing information
-        """
+    def _validate_window(self, kind: str, label: str, student_id: str,
+                         current_time: Optional[datetime], shift: Optional[str]) -> Dict:
+        """Shared implementation of validate_checkin_time/validate_checkout_time"""
         if current_time is None:
             current_time = datetime.now(self.timezone)
         
         # If shift not provided, try to determine from roll number
         if shift is None:
             try:
-                from roll_parser import get_shift
+                from roll_cache import get_shift
                 shift = get_shift(student_id)
             except ImportError:
                 # Fallback to morning if roll parser not available
                 shift = 'Morning'
         
-        # Get shift timings
         try:
-            timings = self.get_shift_timings(shift)
+            check = self.check_window(current_time, shift, kind)
         except ValueError as e:
             return {
                 'valid': False,
@@ -167,35 +299,45 @@ class TimeValidator:
                 'current_time': current_time.isoformat()
             }
         
-        # Check if within check-in window
-        is_within_window = self.is_within_checkin_window(current_time, shift)
+        local_time = self._local(current_time)
+        timings = self.timetable.get_timings(shift, local_time.weekday())
+        start = timings[f'{kind}_start'].strftime('%H:%M')
+        end = timings[f'{kind}_end'].strftime('%H:%M')
         
-        # Calculate time until window closes
-        current_time_only = current_time.time()
+        # Minutes until window closes
         time_until_close = None
-        if is_within_window:
-            # Calculate minutes until window closes
-            checkin_end = timings['checkin_end']
-            if current_time_only < checkin_end:
-                end_datetime = datetime.combine(current_time.date(), checkin_end)
-                if current_time.tzinfo:
-                    end_datetime = self.timezone.localize(end_datetime)
-                time_diff = end_datetime - current_time
-                time_until_close = int(time_diff.total_seconds() / 60)
+        if check.valid and check.seconds_remaining > 0:
+            time_until_close = int((check.seconds_remaining - local_time.microsecond / 1e6) / 60)
         
         return {
-            'valid': is_within_window,
+            'valid': check.valid,
             'student_id': student_id,
-            'shift': shift,
+            'shift': timings['shift'],
             'current_time': current_time.isoformat(),
-            'checkin_start': timings['checkin_start'].strftime('%H:%M'),
-            'checkin_end': timings['checkin_end'].strftime('%H:%M'),
+            f'{kind}_start': start,
+            f'{kind}_end': end,
             'class_end': timings['class_end'].strftime('%H:%M'),
-            'is_within_window': is_within_window,
+            'is_within_window': check.valid,
             'time_until_close': time_until_close,
-            'error': None if is_within_window else f"Check-in not allowed. Window: {timings['checkin_start'].strftime('%H:%M')} - {timings['checkin_end'].strftime('%H:%M')}"
+            'next_transition': self.next_transition_time(current_time, check).isoformat(),
+            'error': None if check.valid else f"{label} not allowed. Window: {start} - {end}"
         }
     
+    def validate_checkin_time(self, student_id: str, current_time: Optional[datetime] = None, 
+                            shift: Optional[str] = None) -> Dict:
+        """
+        Validate if a student can check in at the current time.
+        
+        Args:
+            student_id (str): Student ID
+            current_time (datetime, optional): Current time. Defaults to now.
+            shift (str, optional): Student's shift. If not provided, will be determined from roll number.
+        
+        Returns:
+            Dict: Validation result with timing information
+        """
+        return self._validate_window('checkin', 'Check-in', student_id, current_time, shift)
+    
     def validate_checkout_time(self, student_id: str, current_time: Optional[datetime] = None, 
                              shift: Optional[str] = None) -> Dict:
         """
@@ -209,57 +351,55 @@ class TimeValidator:
         Returns:
             Dict: Validation result with timing information
         """
-        if current_time is None:
-            current_time = datetime.now(self.timezone)
-        
-        # If shift not provided, try to determine from roll number
-        if shift is None:
-            try:
-                from roll_parser import get_shift
-                shift = get_shift(student_id)
-            except ImportError:
-                # Fallback to morning if roll parser not available
-                shift = 'Morning'
-        
-        # Get shift timings
-        try:
-            timings = self.get_shift_timings(shift)
-        except ValueError as e:
-            return {
-                'valid': False,
-                'error': str(e),
-                'student_id': student_id,
-                'current_time': current_time.isoformat()
-            }
-        
-        # Check if within check-out window
-        is_within_window = self.is_within_checkout_window(current_time, shift)
+        return self._validate_window('checkout', 'Check-out', student_id, current_time, shift)
+    
+    def _utc_offsets(self, days: np.ndarray) -> np.ndarray:
+        """UTC offset in seconds for each epoch day, taken at local noon"""
+        unique_days, inverse = np.unique(days, return_inverse=True)
+        offsets = np.empty(len(unique_days), dtype=np.int64)
+        for i, day in enumerate(unique_days):
+            noon = datetime(1970, 1, 1, 12) + timedelta(days=int(day))
+            offsets[i] = int(self.timezone.utcoffset(noon).total_seconds())
+        return offsets[inverse]
+    
+    def validate_batch(self, timestamps, shift_codes, kind: str = 'checkin') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Validate many scan times against the timetable at once.
         
-        # Calculate time until window closes
-        current_time_only = current_time.time()
-        time_until_close = None
-        if is_within_window:
-            # Calculate minutes until window closes
-            checkout_end = timings['checkout_end']
-            if current_time_only < checkout_end:
-                end_datetime = datetime.combine(current_time.date(), checkout_end)
-                if current_time.tzinfo:
-                    end_datetime = self.timezone.localize(end_datetime)
-                time_diff = end_datetime - current_time
-                time_until_close = int(time_diff.total_seconds() / 60)
+        Args:
+            timestamps: Array of epoch seconds (UTC)
+            shift_codes: Array of shift codes from timetable.shift_codes();
+                -1 is always invalid
+            kind (str): 'checkin' or 'checkout'
         
-        return {
-            'valid': is_within_window,
-            'student_id': student_id,
-            'shift': shift,
-            'current_time': current_time.isoformat(),
-            'checkout_start': timings['checkout_start'].strftime('%H:%M'),
-            'checkout_end': timings['checkout_end'].strftime('%H:%M'),
-            'class_end': timings['class_end'].strftime('%H:%M'),
-            'is_within_window': is_within_window,
-            'time_until_close': time_until_close,
-            'error': None if is_within_window else f"Check-out not allowed. Window: {timings['checkout_start'].strftime('%H:%M')} - {timings['checkout_end'].strftime('%H:%M')}"
-        }
+        Returns:
+            tuple: (valid bool array, minutes until the window closes as an
+            int32 array, -1 where not valid)
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        codes = np.asarray(shift_codes, dtype=np.int64)
+        if timestamps.shape != codes.shape:
+            raise ValueError("timestamps and shift_codes must have the same shape")
+        
+        utc_days = np.floor_divide(timestamps, SECONDS_PER_DAY).astype(np.int64)
+        local = timestamps + self._utc_offsets(utc_days)
+        local_days = np.floor_divide(local, SECONDS_PER_DAY).astype(np.int64)
+        seconds = local - local_days * SECONDS_PER_DAY
+        weekdays = (local_days + EPOCH_WEEKDAY) % 7
+        
+        start_index, end_index = WINDOW_BOUNDS[kind]
+        known = codes >= 0
+        table = self.timetable.as_array()
+        rows = table[np.where(known, codes, 0), weekdays]
+        starts = rows[:, start_index]
+        ends = rows[:, end_index]
+        
+        # Same comparison as check(): whole seconds of the time of day
+        whole_seconds = np.floor(seconds)
+        valid = known & (whole_seconds >= starts) & (whole_seconds <= ends)
+        minutes = np.floor((ends - seconds) / 60).astype(np.int32)
+        minutes_remaining = np.where(valid, np.maximum(minutes, 0), -1).astype(np.int32)
+        return valid, minutes_remaining
     
     def get_next_checkin_window(self, shift: str, current_time: Optional[datetime] = None) -> Dict:
         """
@@ -275,45 +415,35 @@ class TimeValidator:
         if current_time is None:
             current_time = datetime.now(self.timezone)
         
-        timings = self.get_shift_timings(shift)
-        current_time_only = current_time.time()
+        check = self.check_window(current_time, shift, 'checkin')
+        next_change = self.next_transition_time(current_time, check)
         
         # Check if we're in today's window
-        if timings['checkin_start'] <= current_time_only <= timings['checkin_end']:
+        if check.valid:
+            timings = self.get_shift_timings(shift, current_time.weekday())
             return {
                 'is_current_window': True,
                 'window_start': timings['checkin_start'].strftime('%H:%M'),
                 'window_end': timings['checkin_end'].strftime('%H:%M'),
-                'time_remaining': self._calculate_time_remaining(current_time, timings['checkin_end']),
+                'time_remaining': self._calculate_time_until(current_time, next_change),
                 'message': 'Currently in check-in window'
             }
         
-        # Check if we're before today's window
-        if current_time_only < timings['checkin_start']:
-            time_until_start = self._calculate_time_until(current_time, timings['checkin_start'])
-            return {
-                'is_current_window': False,
-                'window_start': timings['checkin_start'].strftime('%H:%M'),
-                'window_end': timings['checkin_end'].strftime('%H:%M'),
-                'time_until_start': time_until_start,
-                'message': f'Check-in window starts in {time_until_start} minutes'
-            }
-        
-        # We're after today's window, next window is tomorrow
-        tomorrow = current_time.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-        next_window_start = tomorrow.replace(
-            hour=timings['checkin_start'].hour,
-            minute=timings['checkin_start'].minute
-        )
-        
-        time_until_tomorrow = self._calculate_time_until(current_time, next_window_start)
+        # Otherwise the next transition is the start of the next window,
+        # either later today or on the following day
+        timings = self.get_shift_timings(shift, next_change.weekday())
+        time_until_start = self._calculate_time_until(current_time, next_change)
+        if next_change.date() == self._local(current_time).date():
+            message = f'Check-in window starts in {time_until_start} minutes'
+        else:
+            message = f'Next check-in window is tomorrow at {timings["checkin_start"].strftime("%H:%M")}'
         
         return {
             'is_current_window': False,
             'window_start': timings['checkin_start'].strftime('%H:%M'),
             'window_end': timings['checkin_end'].strftime('%H:%M'),
-            'time_until_start': time_until_tomorrow,
-            'message': f'Next check-in window is tomorrow at {timings["checkin_start"].strftime("%H:%M")}'
+            'time_until_start': time_until_start,
+            'message': message
         }
     
     def _calculate_time_remaining(self, current_time: datetime, end_time: time) -> int:
@@ -326,7 +456,7 @@ class TimeValidator:
     
     def _calculate_time_until(self, current_time: datetime, target_time: datetime) -> int:
         """Calculate minutes until target time"""
-        time_diff = target_time - current_time
+        time_diff = target_time - self._local(current_time)
         return max(0, int(time_diff.total_seconds() / 60))
     
     def get_shift_schedule(self, shift: str) -> Dict:
@@ -394,6 +524,12 @@ def validate_checkout_time(student_id: str, current_time: Optional[datetime] = N
     return validator.validate_checkout_time(student_id, current_time, shift)
 
 
+def validate_batch(timestamps, shifts, kind: str = 'checkin') -> Tuple[np.ndarray, np.ndarray]:
+    """Validate many (epoch timestamp, shift name) pairs at once"""
+    validator = TimeValidator()
+    return validator.validate_batch(timestamps, validator.timetable.shift_codes(shifts), kind)
+
+
 # Example usage and testing
 if __name__ == "__main__":
     from datetime import datetime, timedelta
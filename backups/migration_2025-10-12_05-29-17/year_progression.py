@@ -6,23 +6,28 @@ Handles automatic year updates and graduation management
 import os
 import json
 import sqlite3
-import requests
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+import numpy as np
 import pytz
-from settings import SettingsManager
+from settings_snapshot import get_settings
+from student_directory import get_student_directory
+from roll_cache import parse_roll_number, parse_roll_numbers
+from connectivity import get_connectivity_monitor
+from http_client import get_http_client
 
 
 class YearProgression:
     """Handles academic year progression and graduation management"""
     
     def __init__(self, timezone=None):
-        # Initialize settings manager
-        self.settings = SettingsManager()
+        # Shared settings snapshot
+        self.settings = get_settings()
         
         # Load configuration from settings
         self.timezone = pytz.timezone(timezone or self.settings.get('timezone', 'Asia/Karachi'))
         self.students_file = "students.json"
+        self.directory = get_student_directory(self.students_file)
         self.offline_file = "offline_data.json"
         self.website_url = self.settings.get('website_url', 'http://localhost/qr_attendance/public')
         self.api_key = self.settings.get('api_key', 'attendance_2025_xyz789_secure')
@@ -105,8 +110,7 @@ class YearProgression:
             if not os.path.exists(self.students_file):
                 return {'success': False, 'error': 'Students file not found'}
             
-            with open(self.students_file, 'r') as f:
-                students = json.load(f)
+            students = self.directory.copy()
             
             if student_id not in students:
                 return {'success': False, 'error': 'Student not found'}
@@ -115,7 +119,6 @@ class YearProgression:
             
             # Parse roll number to get admission year
             try:
-                from roll_parser import parse_roll_number
                 roll_data = parse_roll_number(student_id)
                 
                 if not roll_data['valid']:
@@ -133,8 +136,7 @@ class YearProgression:
                 
                 # Update students file
                 students[student_id] = student
-                with open(self.students_file, 'w') as f:
-                    json.dump(students, f, indent=2)
+                self.directory.save(students)
                 
                 return {
                     'success': True,
@@ -151,6 +153,51 @@ class YearProgression:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def compute_progression(self, students: Dict, current_date: Optional[datetime] = None) -> Dict:
+        """
+        Compute the year of every student in one pass over the roster.
+        
+        Args:
+            students (Dict): Student roster keyed by roll number
+            current_date (datetime, optional): Current date. Defaults to now.
+        
+        Returns:
+            Dict: 'changes' as (student_id, admission_year, current_year,
+            is_graduated) for students whose stored values differ,
+            'unchanged' count and 'errors' for invalid roll numbers
+        """
+        if current_date is None:
+            current_date = datetime.now(self.timezone)
+        
+        student_ids = list(students.keys())
+        roster = parse_roll_numbers(student_ids)
+        
+        academic_year = self.get_academic_year(current_date)
+        current_years = np.clip(academic_year - roster.admission_year.astype(np.int32) + 1, 1, 4)
+        graduated = current_years > 4
+        
+        changes = []
+        errors = []
+        unchanged = 0
+        for i, student_id in enumerate(student_ids):
+            if not roster.valid[i]:
+                roll_data = parse_roll_number(student_id)
+                errors.append({
+                    'student_id': student_id,
+                    'error': f'Invalid roll number: {roll_data["error"]}'
+                })
+                continue
+            
+            values = (int(roster.admission_year[i]), int(current_years[i]), bool(graduated[i]))
+            student = students[student_id]
+            stored = (student.get('admission_year'), student.get('current_year'), student.get('is_graduated'))
+            if stored == values:
+                unchanged += 1
+            else:
+                changes.append((student_id,) + values)
+        
+        return {'changes': changes, 'unchanged': unchanged, 'errors': errors}
+    
     def check_and_update_years(self, current_date: Optional[datetime] = None) -> Dict:
         """
         Check if year progression should happen and update all students.
@@ -177,30 +224,32 @@ class YearProgression:
             if not os.path.exists(self.students_file):
                 return {'success': False, 'error': 'Students file not found'}
             
-            with open(self.students_file, 'r') as f:
-                students = json.load(f)
+            # Work on one copy of the roster and write it back once
+            students = self.directory.copy()
+            progression = self.compute_progression(students, current_date)
             
             updated_students = []
             graduated_students = []
-            errors = []
+            errors = progression['errors']
+            last_year_update = current_date.strftime('%Y-%m-%d')
             
-            for student_id in students.keys():
-                result = self.update_student_year(student_id, current_date)
+            for student_id, admission_year, current_year, is_graduated in progression['changes']:
+                student = students[student_id]
+                student['admission_year'] = admission_year
+                student['current_year'] = current_year
+                student['is_graduated'] = is_graduated
+                student['last_year_update'] = last_year_update
                 
-                if result['success']:
-                    updated_students.append({
-                        'student_id': student_id,
-                        'current_year': result['current_year'],
-                        'is_graduated': result['is_graduated']
-                    })
-                    
-                    if result['is_graduated']:
-                        graduated_students.append(student_id)
-                else:
-                    errors.append({
-                        'student_id': student_id,
-                        'error': result['error']
-                    })
+                updated_students.append({
+                    'student_id': student_id,
+                    'current_year': current_year,
+                    'is_graduated': is_graduated
+                })
+                if is_graduated:
+                    graduated_students.append(student_id)
+            
+            if updated_students:
+                self.directory.save(students)
             
             # Log progression
             progression_log = {
@@ -208,6 +257,7 @@ class YearProgression:
                 'academic_year': self.get_academic_year(current_date),
                 'total_students': len(students),
                 'updated_students': len(updated_students),
+                'unchanged_students': progression['unchanged'],
                 'graduated_students': len(graduated_students),
                 'errors': len(errors),
                 'details': {
@@ -228,6 +278,7 @@ class YearProgression:
                 'academic_year': self.get_academic_year(current_date),
                 'total_students': len(students),
                 'updated_students': len(updated_students),
+                'unchanged_students': progression['unchanged'],
                 'graduated_students': len(graduated_students),
                 'errors': len(errors),
                 'log_file': log_file
@@ -245,16 +296,14 @@ class YearProgression:
         """
         try:
             # Check if website is accessible
-            response = requests.get(self.website_url, timeout=5, verify=False)
-            if response.status_code != 200:
+            if not get_connectivity_monitor().is_website_online():
                 return False
             
             # Prepare sync data
             if not os.path.exists(self.students_file):
                 return False
             
-            with open(self.students_file, 'r') as f:
-                students = json.load(f)
+            students = self.directory.get_all()
             
             # Filter students with updated year data
             updated_students = []
@@ -279,11 +328,10 @@ class YearProgression:
                 'students': updated_students
             }
             
-            response = requests.post(
+            response = get_http_client().post(
                 f"{self.website_url}/sync_api.php",
-                json=sync_data,
-                timeout=10,
-                verify=False
+                endpoint='year_sync',
+                json=sync_data
             )
             
             return response.status_code == 200
@@ -307,8 +355,7 @@ class YearProgression:
             if not os.path.exists(self.students_file):
                 return {'success': False, 'error': 'Students file not found'}
             
-            with open(self.students_file, 'r') as f:
-                students = json.load(f)
+            students = self.directory.get_all()
             
             # Analyze student years
             year_distribution = {}
@@ -359,8 +406,7 @@ class YearProgression:
             if not os.path.exists(self.students_file):
                 return {'success': False, 'error': 'Students file not found'}
             
-            with open(self.students_file, 'r') as f:
-                students = json.load(f)
+            students = self.directory.copy()
             
             if student_id not in students:
                 return {'success': False, 'error': 'Student not found'}
@@ -378,8 +424,7 @@ class YearProgression:
             }
             
             # Save updated data
-            with open(self.students_file, 'w') as f:
-                json.dump(students, f, indent=2)
+            self.directory.save(students)
             
             return {
                 'success': True,
@@ -806,11 +806,12 @@ function pushToOffline($pdo) {
 
 function pullFromOffline($pdo) {
     try {
-        // This would typically read from offline system files
-        // For now, we'll simulate by reading from sync_data.json if it exists
+        // Offline systems export to offline_sync_data.json; sync_data.json is
+        // only written by the admin panel (inbound to the offline systems)
+        $export_file = 'offline_sync_data.json';
         
-        if (file_exists('sync_data.json')) {
-            $syncData = json_decode(file_get_contents('sync_data.json'), true);
+        if (file_exists($export_file)) {
+            $syncData = json_decode(file_get_contents($export_file), true);
             
             if ($syncData && isset($syncData['students']) && isset($syncData['attendance'])) {
                 $pdo->beginTransaction();
@@ -835,7 +836,7 @@ function pullFromOffline($pdo) {
                         ]);
                     }
                     
-                    // Update attendance
+                    // Update attendance (offline exports use ID/Name/Timestamp/Status keys)
                     foreach ($syncData['attendance'] as $record) {
                         $stmt = $pdo->prepare("
                             INSERT INTO attendance (student_id, student_name, timestamp, status, created_at) 
@@ -845,20 +846,31 @@ function pullFromOffline($pdo) {
                             status = VALUES(status)
                         ");
                         $stmt->execute([
-                            $record['student_id'],
-                            $record['student_name'],
-                            $record['timestamp'],
-                            $record['status'],
+                            $record['student_id'] ?? $record['ID'],
+                            $record['student_name'] ?? $record['Name'] ?? null,
+                            $record['timestamp'] ?? $record['Timestamp'],
+                            $record['status'] ?? $record['Status'],
                             $record['created_at'] ?? date('Y-m-d H:i:s')
                         ]);
                     }
                     
                     $pdo->commit();
                     
+                    // Acknowledge the export so the offline system stops resending it
+                    if (isset($syncData['version'])) {
+                        $ack = [
+                            'version' => $syncData['version'],
+                            'timestamp' => date('Y-m-d H:i:s')
+                        ];
+                        file_put_contents('admin_ack.json.tmp', json_encode($ack, JSON_PRETTY_PRINT));
+                        rename('admin_ack.json.tmp', 'admin_ack.json');
+                    }
+                    
                     echo json_encode([
                         'success' => true,
                         'message' => 'Data pulled from offline systems successfully',
                         'data' => [
+                            'version' => $syncData['version'] ?? null,
                             'students_updated' => count($syncData['students']),
                             'attendance_updated' => count($syncData['attendance'])
                         ]
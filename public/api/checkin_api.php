@@ -44,6 +44,14 @@ try {
                 handleBulkCheckIn($pdo);
                 break;
                 
+            case 'active_sessions':
+                getActiveSessions($pdo);
+                break;
+                
+            case 'offline_replay':
+                handleOfflineReplay($pdo);
+                break;
+                
             default:
                 http_response_code(400);
                 echo json_encode(['success' => false, 'message' => 'Invalid action: ' . $action]);
@@ -436,6 +444,241 @@ function getStudentStatus($pdo) {
     }
 }
 
+/**
+ * Replay a check-in or check-out decided by an offline system, at the time it was decided
+ *
+ * Applies the same rules and writes the same rows and sessions as check_in and
+ * check_out, using the original timestamp. Rejections carry a 'reason' code.
+ */
+function handleOfflineReplay($pdo) {
+    $input = json_decode(file_get_contents('php://input'), true);
+    
+    // Validate API key from env-driven config
+    $api_key = $input['api_key'] ?? '';
+    if (!hash_equals(API_KEY, $api_key)) {
+        echo json_encode(['success' => false, 'reason' => 'invalid_api_key', 'message' => 'Invalid API key']);
+        return;
+    }
+    
+    $student_id = $input['student_id'] ?? '';
+    $type = $input['type'] ?? '';
+    $timestamp = $input['timestamp'] ?? '';
+    
+    if (empty($student_id) || !in_array($type, ['check_in', 'check_out'], true) || empty($timestamp)) {
+        http_response_code(400);
+        echo json_encode(['success' => false, 'reason' => 'invalid_request', 'message' => 'student_id, type and timestamp are required']);
+        return;
+    }
+    
+    $timezone = new DateTimeZone('Asia/Karachi');
+    $event_time = DateTime::createFromFormat('Y-m-d H:i:s', $timestamp, $timezone);
+    if (!$event_time || $event_time > new DateTime('now', $timezone)) {
+        echo json_encode(['success' => false, 'reason' => 'invalid_timestamp', 'message' => 'Invalid or future timestamp: ' . $timestamp]);
+        return;
+    }
+    $event_time_str = $event_time->format('Y-m-d H:i:s');
+    
+    try {
+        $roll_data = RollParser::parseRollNumber($student_id);
+        if (!$roll_data['valid']) {
+            echo json_encode(['success' => false, 'reason' => 'unknown_student', 'message' => 'Invalid roll number format: ' . $roll_data['error']]);
+            return;
+        }
+        
+        $stmt = $pdo->prepare("
+            SELECT name, is_graduated 
+            FROM students 
+            WHERE student_id = ? AND is_active = 1
+        ");
+        $stmt->execute([$student_id]);
+        $student = $stmt->fetch(PDO::FETCH_ASSOC);
+        
+        if (!$student) {
+            echo json_encode(['success' => false, 'reason' => 'unknown_student', 'message' => 'Student not found or inactive']);
+            return;
+        }
+        
+        $stmt = $pdo->prepare("
+            SELECT id, check_in_time, student_name 
+            FROM check_in_sessions 
+            WHERE student_id = ? AND is_active = 1
+        ");
+        $stmt->execute([$student_id]);
+        $session = $stmt->fetch(PDO::FETCH_ASSOC);
+        
+        $time_validator = new TimeValidator();
+        
+        if ($type === 'check_in') {
+            if ($session) {
+                echo json_encode(['success' => false, 'reason' => 'already_checked_in', 'message' => 'Student already checked in. Please check out first.']);
+                return;
+            }
+            if ($student['is_graduated']) {
+                echo json_encode(['success' => false, 'reason' => 'graduated', 'message' => 'Student has graduated and cannot check in']);
+                return;
+            }
+            
+            $time_validation = $time_validator->validateCheckinTime($student_id, $event_time, $roll_data['shift']);
+            if (!$time_validation['valid']) {
+                echo json_encode(['success' => false, 'reason' => 'outside_window', 'message' => $time_validation['error']]);
+                return;
+            }
+            
+            $pdo->beginTransaction();
+            try {
+                $stmt = $pdo->prepare("
+                    INSERT INTO check_in_sessions (student_id, student_name, check_in_time, is_active) 
+                    VALUES (?, ?, ?, 1)
+                ");
+                $stmt->execute([$student_id, $student['name'], $event_time_str]);
+                
+                $stmt = $pdo->prepare("
+                    INSERT INTO attendance (student_id, student_name, timestamp, status, check_in_time, shift, program, current_year, admission_year) 
+                    VALUES (?, ?, ?, 'Check-in', ?, ?, ?, ?, ?)
+                ");
+                $stmt->execute([
+                    $student_id,
+                    $student['name'],
+                    $event_time_str,
+                    $event_time_str,
+                    $roll_data['shift'],
+                    $roll_data['program'],
+                    $roll_data['current_year'],
+                    $roll_data['admission_year']
+                ]);
+                
+                $pdo->commit();
+            } catch (Exception $e) {
+                $pdo->rollback();
+                throw $e;
+            }
+            
+            echo json_encode([
+                'success' => true,
+                'message' => 'Offline check-in recorded',
+                'data' => [
+                    'student_id' => $student_id,
+                    'student_name' => $student['name'],
+                    'check_in_time' => $event_time_str,
+                    'status' => 'Check-in'
+                ]
+            ]);
+            return;
+        }
+        
+        // check_out
+        if (!$session) {
+            echo json_encode(['success' => false, 'reason' => 'no_active_session', 'message' => 'No active check-in session found']);
+            return;
+        }
+        
+        $check_in_time = new DateTime($session['check_in_time'], $timezone);
+        if ($check_in_time->format('Y-m-d') !== $event_time->format('Y-m-d')) {
+            echo json_encode(['success' => false, 'reason' => 'session_left_open', 'message' => 'Active check-in session is from ' . $check_in_time->format('Y-m-d')]);
+            return;
+        }
+        if ($check_in_time > $event_time) {
+            echo json_encode(['success' => false, 'reason' => 'checkout_before_checkin', 'message' => 'Check-out is earlier than the active check-in']);
+            return;
+        }
+        
+        $checkout_validation = $time_validator->validateCheckoutTime($student_id, $event_time, $roll_data['shift']);
+        if (!$checkout_validation['valid']) {
+            echo json_encode(['success' => false, 'reason' => 'outside_window', 'message' => $checkout_validation['error']]);
+            return;
+        }
+        
+        $time_diff = $event_time->diff($check_in_time);
+        $total_minutes = ($time_diff->h * 60) + $time_diff->i;
+        
+        $pdo->beginTransaction();
+        try {
+            $stmt = $pdo->prepare("
+                UPDATE attendance 
+                SET status = 'Present', check_out_time = ?, session_duration = ?
+                WHERE student_id = ? AND DATE(timestamp) = DATE(?) AND status = 'Check-in'
+            ");
+            $stmt->execute([$event_time_str, $total_minutes, $student_id, $event_time_str]);
+            
+            $stmt = $pdo->prepare("
+                UPDATE check_in_sessions 
+                SET is_active = 0 
+                WHERE id = ?
+            ");
+            $stmt->execute([$session['id']]);
+            
+            $pdo->commit();
+        } catch (Exception $e) {
+            $pdo->rollback();
+            throw $e;
+        }
+        
+        echo json_encode([
+            'success' => true,
+            'message' => 'Offline check-out recorded',
+            'data' => [
+                'student_id' => $student_id,
+                'student_name' => $session['student_name'],
+                'check_in_time' => $session['check_in_time'],
+                'check_out_time' => $event_time_str,
+                'session_duration' => $total_minutes,
+                'status' => 'Present'
+            ]
+        ]);
+        
+    } catch (Exception $e) {
+        http_response_code(500);
+        echo json_encode(['success' => false, 'reason' => 'server_error', 'message' => 'Offline replay failed: ' . $e->getMessage()]);
+    }
+}
+
+/**
+ * Get every student's check-in state in one call (status table warm-up)
+ */
+function getActiveSessions($pdo) {
+    $input = json_decode(file_get_contents('php://input'), true);
+    
+    // Validate API key from env-driven config
+    $api_key = $input['api_key'] ?? '';
+    if (!hash_equals(API_KEY, $api_key)) {
+        echo json_encode(['success' => false, 'message' => 'Invalid API key']);
+        return;
+    }
+    
+    try {
+        $today = (new DateTime('now', new DateTimeZone('Asia/Karachi')))->format('Y-m-d');
+        
+        // Students with an open session
+        $stmt = $pdo->query("
+            SELECT student_id, check_in_time 
+            FROM check_in_sessions 
+            WHERE is_active = 1
+        ");
+        $active = $stmt->fetchAll(PDO::FETCH_ASSOC);
+        
+        // Students who already checked out today
+        $stmt = $pdo->prepare("
+            SELECT DISTINCT student_id 
+            FROM attendance 
+            WHERE DATE(timestamp) = ? AND status = 'Present' AND check_out_time IS NOT NULL
+        ");
+        $stmt->execute([$today]);
+        $checked_out = $stmt->fetchAll(PDO::FETCH_COLUMN);
+        
+        echo json_encode([
+            'success' => true,
+            'data' => [
+                'date' => $today,
+                'active' => $active,
+                'checked_out' => $checked_out
+            ]
+        ]);
+        
+    } catch (Exception $e) {
+        echo json_encode(['success' => false, 'message' => 'Failed to get active sessions: ' . $e->getMessage()]);
+    }
+}
+
 /**
  * Handle bulk check-in from external systems
  */